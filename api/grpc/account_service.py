@@ -1,6 +1,4 @@
 import grpc
-from concurrent import futures
-import time
 import logging
 from decimal import Decimal
 import datetime
@@ -13,9 +11,9 @@ from proto import account_service_pb2, account_service_pb2_grpc
 
 # Import database models and services
 from utils.extensions import db
-from database.repositories.account_repo import get_account_details, get_account_statement
-from database.repositories.balancecheck_repo import get_user_balance
 from core.models import Account, User, Transaction
+from sqlalchemy import false, or_
+from grpc_utils.field_mask import FieldProjection
 
 # Update model names to match the actual models
 # AccountModel -> Account, UserModel -> User, TransactionModel -> Transaction
@@ -31,6 +29,16 @@ ACCOUNT_TYPE_MAP = {
 
 ACCOUNT_TYPE_REVERSE_MAP = {v: k for k, v in ACCOUNT_TYPE_MAP.items()}
 
+# Upper bound on account IDs accepted by GetBalances in one call
+MAX_BATCH_BALANCE_ACCOUNTS = 1000
+
+# Page size limits for ListAllAccounts
+DEFAULT_LIST_ACCOUNTS_LIMIT = 50
+MAX_LIST_ACCOUNTS_LIMIT = 1000
+
+# Rows fetched per round trip while streaming all accounts
+STREAM_ACCOUNTS_BATCH_SIZE = 1000
+
 ACCOUNT_STATUS_MAP = {
     0: True,   # ACTIVE
     1: False,  # INACTIVE
@@ -38,6 +46,39 @@ ACCOUNT_STATUS_MAP = {
     3: False   # CLOSED
 }
 
+# Map database status to proto enum
+ACCOUNT_STATUS_REVERSE_MAP = {
+    'active': 0,    # ACTIVE
+    'inactive': 1,  # INACTIVE
+    'locked': 2,    # LOCKED
+    'closed': 3     # CLOSED
+}
+
+# Columns and values behind each Account field, so a read_mask can limit
+# both what is loaded and what is serialized. Fields the model has no
+# column for are filled from attributes when present
+ACCOUNT_PROJECTION = FieldProjection(
+    account_service_pb2.Account,
+    {
+        'account_id': ((Account.account_id,), lambda account: str(account.account_id)),
+        'user_id': ((Account.user_id,), lambda account: account.user_id),
+        'account_type': ((Account.account_type,),
+                         lambda account: ACCOUNT_TYPE_REVERSE_MAP.get(account.account_type or 'checking', 0)),
+        'status': ((), lambda account: ACCOUNT_STATUS_REVERSE_MAP.get(getattr(account, 'status', 'active'), 0)),
+        'currency': ((Account.currency_code,), lambda account: account.currency_code or ''),
+        'balance': ((Account.balance,), lambda account: float(account.balance or 0)),
+        'available_balance': ((Account.balance,),
+                              lambda account: float(getattr(account, 'available_balance', account.balance) or 0)),
+        'name': ((), lambda account: getattr(account, 'name', '')),
+        'created_at': ((), lambda account: str(getattr(account, 'date_created', ''))),
+        'updated_at': ((), lambda account: str(getattr(account, 'last_updated', ''))),
+        'iban': ((), lambda account: getattr(account, 'iban', '')),
+        'swift_bic': ((), lambda account: getattr(account, 'swift_bic', '')),
+    },
+    # The primary key is always loaded, and load_only needs at least one column
+    always=(Account.account_id,)
+)
+
 
 class AccountServicer(account_service_pb2_grpc.AccountServiceServicer):
     """Implementation of AccountService service."""
@@ -151,11 +192,18 @@ class AccountServicer(account_service_pb2_grpc.AccountServiceServicer):
                 else:
                     conditions["status"] = "active"
             
-            # Use db.session.query instead of Account.query
-            accounts = db.session.query(Account).filter_by(**conditions).all()
+            fields = ACCOUNT_PROJECTION.resolve(request.read_mask)
+            
+            # Only load the columns behind the requested fields
+            accounts = (
+                db.session.query(Account)
+                .options(ACCOUNT_PROJECTION.load_only(fields))
+                .filter_by(**conditions)
+                .all()
+            )
             
             # Convert accounts to proto format
-            account_protos = [self._account_to_proto(account) for account in accounts]
+            account_protos = [self._account_to_proto(account, fields) for account in accounts]
             
             return account_service_pb2.GetAccountsResponse(
                 success=True,
@@ -164,6 +212,14 @@ class AccountServicer(account_service_pb2_grpc.AccountServiceServicer):
                 total_count=len(accounts)
             )
             
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+            return account_service_pb2.GetAccountsResponse(
+                success=False,
+                message=str(e),
+                total_count=0
+            )
         except Exception as e:
             logging.error(f"Error retrieving accounts: {str(e)}")
             context.set_code(grpc.StatusCode.INTERNAL)
@@ -358,6 +414,84 @@ class AccountServicer(account_service_pb2_grpc.AccountServiceServicer):
                 message=f"Failed to retrieve balance: {str(e)}"
             )
 
+    def GetBalances(self, request, context):
+        """Gets the current balances of many accounts with a single query."""
+        try:
+            user_id = request.user_id
+            requested_ids = list(request.account_ids)
+            
+            if len(requested_ids) > MAX_BATCH_BALANCE_ACCOUNTS:
+                message = f"At most {MAX_BATCH_BALANCE_ACCOUNTS} accounts per request"
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details(message)
+                return account_service_pb2.GetBalancesResponse(
+                    success=False,
+                    message=message
+                )
+            
+            # Parse each ID once; results are still reported under the ID as sent,
+            # so "01" finds account 1. Anything else is simply not found
+            numeric_ids = {
+                account_id: int(account_id) for account_id in requested_ids if account_id.isdecimal()
+            }
+            
+            # Resolve every account in one IN query, projecting only what the response needs
+            accounts = {}
+            if numeric_ids:
+                rows = db.session.query(
+                    Account.account_id,
+                    Account.user_id,
+                    Account.balance,
+                    Account.currency_code
+                ).filter(Account.account_id.in_(set(numeric_ids.values())))
+                accounts = {row.account_id: row for row in rows}
+            
+            current_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            
+            # Build one result per requested ID, in request order
+            balances = []
+            found = 0
+            for account_id in requested_ids:
+                account = accounts.get(numeric_ids.get(account_id))
+                if not account:
+                    balances.append(account_service_pb2.BalanceResponse(
+                        success=False,
+                        message="Account not found",
+                        account_id=account_id
+                    ))
+                elif account.user_id != user_id:
+                    balances.append(account_service_pb2.BalanceResponse(
+                        success=False,
+                        message="Permission denied",
+                        account_id=account_id
+                    ))
+                else:
+                    found += 1
+                    balances.append(account_service_pb2.BalanceResponse(
+                        success=True,
+                        message="Balance retrieved successfully",
+                        account_id=account_id,
+                        balance=float(account.balance or 0),
+                        available_balance=float(account.balance or 0),
+                        currency=account.currency_code or '',
+                        as_of_date=current_date
+                    ))
+            
+            return account_service_pb2.GetBalancesResponse(
+                success=True,
+                message=f"Retrieved {found} of {len(requested_ids)} balances",
+                balances=balances
+            )
+            
+        except Exception as e:
+            logging.error(f"Error retrieving balances: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error retrieving balances: {str(e)}")
+            return account_service_pb2.GetBalancesResponse(
+                success=False,
+                message=f"Failed to retrieve balances: {str(e)}"
+            )
+
     def GetBalanceHistory(self, request, context):
         """Gets the balance history of an account over time."""
         # This is a placeholder implementation
@@ -404,17 +538,15 @@ class AccountServicer(account_service_pb2_grpc.AccountServiceServicer):
                     message="Permission denied"
                 )
             
-            # Get account details - updated to use get_account_details from repository
-            try:
-                account_details = get_account_details(account_id)
-                account_holder_name = account_details.get('account_holder_name', "John Doe")
-                bank_name = account_details.get('bank_name', "Bankarstvo Bank")
-                bank_address = account_details.get('bank_address', "123 Banking St, Finance City")
-            except:
-                # Fallback to placeholder values
-                account_holder_name = "John Doe"  # Placeholder
-                bank_name = "Bankarstvo Bank"     # Placeholder
-                bank_address = "123 Banking St, Finance City"  # Placeholder
+            # The holder is the owning user; the bank details are not stored yet
+            holder = (
+                db.session.query(User.full_name, User.username)
+                .filter(User.user_id == account.user_id)
+                .first()
+            )
+            account_holder_name = (holder.full_name or holder.username) if holder else ""
+            bank_name = "Bankarstvo Bank"     # Placeholder
+            bank_address = "123 Banking St, Finance City"  # Placeholder
             
             # Prepare response
             account_proto = self._account_to_proto(account)
@@ -458,61 +590,147 @@ class AccountServicer(account_service_pb2_grpc.AccountServiceServicer):
         )
 
     def ListAllAccounts(self, request, context):
-        """Lists all accounts (admin operation)."""
-        # This is a placeholder implementation
-        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
-        context.set_details("Method not yet implemented")
-        return account_service_pb2.ListAllAccountsResponse(
-            success=False,
-            message="Method not yet implemented"
-        )
+        """Lists all accounts (admin operation), one keyset-paginated page at a time."""
+        try:
+            limit = min(request.limit or DEFAULT_LIST_ACCOUNTS_LIMIT, MAX_LIST_ACCOUNTS_LIMIT)
+            fields = ACCOUNT_PROJECTION.resolve(request.read_mask)
+            query = _all_accounts_query(request)
+            
+            total_count = query.count() if request.include_total_count else 0
+            
+            if request.page_token:
+                # Continue after the last account of the previous page
+                last_id = int(request.page_token)
+                query = query.filter(
+                    Account.account_id > last_id if request.ascending else Account.account_id < last_id
+                )
+            elif request.page > 1:
+                # Legacy page numbers, the database still has to skip the earlier rows
+                query = query.offset((request.page - 1) * limit)
+            
+            # Fetch one extra row to find out whether another page exists
+            accounts = query.options(ACCOUNT_PROJECTION.load_only(fields)).limit(limit + 1).all()
+            next_page_token = str(accounts[limit - 1].account_id) if len(accounts) > limit else ""
+            accounts = accounts[:limit]
+            
+            return account_service_pb2.ListAllAccountsResponse(
+                success=True,
+                message=f"Retrieved {len(accounts)} accounts",
+                accounts=[self._account_to_proto(account, fields) for account in accounts],
+                total_count=total_count,
+                page=request.page or 1,
+                limit=limit,
+                next_page_token=next_page_token
+            )
+            
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+            return account_service_pb2.ListAllAccountsResponse(
+                success=False,
+                message=str(e)
+            )
+        except Exception as e:
+            logging.error(f"Error listing accounts: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error listing accounts: {str(e)}")
+            return account_service_pb2.ListAllAccountsResponse(
+                success=False,
+                message=f"Failed to list accounts: {str(e)}"
+            )
+
+    def StreamAllAccounts(self, request, context):
+        """Streams every matching account (admin export) straight from a database cursor."""
+        try:
+            fields = ACCOUNT_PROJECTION.resolve(request.read_mask)
+            query = _all_accounts_query(request).options(ACCOUNT_PROJECTION.load_only(fields))
+            if request.page_token:
+                # Resume an interrupted export after the last account received
+                last_id = int(request.page_token)
+                query = query.filter(
+                    Account.account_id > last_id if request.ascending else Account.account_id < last_id
+                )
+            
+            for count, account in enumerate(query.yield_per(STREAM_ACCOUNTS_BATCH_SIZE), 1):
+                if count % STREAM_ACCOUNTS_BATCH_SIZE == 0 and not context.is_active():
+                    logging.info("Client cancelled account export")
+                    return
+                yield self._account_to_proto(account, fields)
+                
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+        except Exception as e:
+            logging.error(f"Error streaming accounts: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error streaming accounts: {str(e)}")
+
+    def _account_to_proto(self, account, fields=None):
+        """Helper method to convert an account model to a proto message.
+
+        Args:
+            account: The Account model, possibly loaded with load_only
+            fields: Account field names to populate, see ACCOUNT_PROJECTION.resolve
+        """
+        return ACCOUNT_PROJECTION.to_proto(account, fields)
 
-    def _account_to_proto(self, account):
-        """Helper method to convert an account model to a proto message."""
-        # Map database status to proto enum - updated to check status string
-        # status = 0 if account.is_active else 1  # ACTIVE or INACTIVE
-        status_map = {
-            'active': 0,    # ACTIVE
-            'inactive': 1,  # INACTIVE
-            'locked': 2,    # LOCKED
-            'closed': 3     # CLOSED
-        }
-        status = status_map.get(getattr(account, 'status', 'active'), 0)
-        
-        # Map account type to proto enum - add null handling
-        account_type = ACCOUNT_TYPE_REVERSE_MAP.get(account.account_type or 'checking', 0)
-        
-        # Create and return the proto message - added null handling throughout
-        return account_service_pb2.Account(
-            account_id=str(account.account_id),
-            user_id=account.user_id,
-            account_type=account_type,
-            status=status,
-            currency=account.currency_code or '',
-            balance=float(account.balance or 0),
-            available_balance=float(getattr(account, 'available_balance', account.balance) or 0),
-            name=getattr(account, 'name', ''),
-            created_at=str(getattr(account, 'date_created', '')),
-            updated_at=str(getattr(account, 'last_updated', '')),
-            iban=getattr(account, 'iban', ''),
-            swift_bic=getattr(account, 'swift_bic', '')
-        )
+
+def _all_accounts_query(request):
+    """Build the filtered, ordered query shared by ListAllAccounts and StreamAllAccounts.
+
+    Raises:
+        ValueError: If the request asks for an unsupported sort order
+    """
+    if request.sort_by and request.sort_by != 'account_id':
+        raise ValueError("Only sort_by=account_id is supported")
+    
+    query = db.session.query(Account)
+    
+    if request.type_filter != 0:  # If not default (unspecified)
+        query = query.filter(Account.account_type == ACCOUNT_TYPE_MAP.get(request.type_filter))
+    
+    if request.status_filter != 0:  # If not default (unspecified)
+        # Accounts without a status column are all active, so any other
+        # status matches nothing
+        status_column = getattr(Account, 'status', None)
+        if status_column is not None:
+            status_names = {1: 'inactive', 2: 'locked', 3: 'closed', 4: 'pending'}
+            query = query.filter(status_column == status_names.get(request.status_filter))
+        else:
+            query = query.filter(false())
+    
+    if request.currency_filter:
+        query = query.filter(Account.currency_code == request.currency_filter.upper())
+    if request.HasField('min_balance'):
+        query = query.filter(Account.balance >= request.min_balance)
+    if request.HasField('max_balance'):
+        query = query.filter(Account.balance <= request.max_balance)
+    
+    if request.search:
+        if request.search.isdigit():
+            search_id = int(request.search)
+            query = query.filter(or_(Account.account_id == search_id, Account.user_id == search_id))
+        else:
+            query = query.filter(false())
+    
+    order = Account.account_id.asc() if request.ascending else Account.account_id.desc()
+    return query.order_by(order)
 
 
 def serve():
-    """Start the gRPC server."""
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    account_service_pb2_grpc.add_AccountServiceServicer_to_server(
-        AccountServicer(), server)
-    server.add_insecure_port('[::]:50051')
-    server.start()
-    print("Account gRPC server started on port 50051")
-    try:
-        while True:
-            time.sleep(86400)  # One day in seconds
-    except KeyboardInterrupt:
-        server.stop(0)
-        print("Server stopped")
+    """Start a gRPC server hosting only the account service.
+
+    Kept for running the service on its own; grpc_utils.server hosts every
+    service on one port with a shared worker pool and database engine.
+    """
+    from grpc_utils.server import GrpcServer
+    server = GrpcServer(address='[::]:50051')
+    server.add_service(
+        account_service_pb2.DESCRIPTOR.services_by_name['AccountService'].full_name,
+        AccountServicer(),
+        account_service_pb2_grpc.add_AccountServiceServicer_to_server
+    )
+    server.serve_forever()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,582 @@
+import grpc
+import logging
+from decimal import Decimal, InvalidOperation
+from datetime import datetime, timedelta
+
+# Import generated protobuf code
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from proto import marketplace_service_pb2, marketplace_service_pb2_grpc
+
+# Import database models and handlers
+from utils.extensions import db
+from core.models import Account, MarketplaceItem, MarketplaceTransaction
+from core.services.marketplace_search import catalog_search
+from sqlalchemy import false, update
+
+# Page size limits for ListProducts and ListOrders
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# Rows fetched per round trip while streaming the catalog
+STREAM_PRODUCTS_BATCH_SIZE = 1000
+
+# Ranked search results can be paged this deep
+MAX_SEARCH_RESULTS = 10000
+
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 50
+
+# Listing statuses, shared with the Django marketplace app
+AVAILABLE = 'available'
+SOLD = 'sold'
+CANCELLED = 'cancelled'
+
+# Only the columns a Product message needs
+PRODUCT_COLUMNS = (
+    MarketplaceItem.item_id,
+    MarketplaceItem.name,
+    MarketplaceItem.description,
+    MarketplaceItem.price,
+    MarketplaceItem.seller_id,
+    MarketplaceItem.status,
+)
+
+
+class OrderError(Exception):
+    """An order that cannot be placed, with the status code to report."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class MarketplaceServicer(marketplace_service_pb2_grpc.MarketplaceServiceServicer):
+    """Implementation of MarketplaceService over the marketplace_items and
+    marketplace_transactions tables shared with the Django app.
+
+    A product is a marketplace item and an order is the marketplace
+    transaction recording its sale. Items have no category, image or
+    creation date columns, so those fields are left empty.
+    """
+
+    def __init__(self, search=None):
+        # Keyword search index, kept current by the writes below
+        self.search = search or catalog_search
+
+    def GetProduct(self, request, context):
+        """Get a single product."""
+        try:
+            row = db.session.query(*PRODUCT_COLUMNS).filter(
+                MarketplaceItem.item_id == int(request.product_id)).first()
+
+            if not row:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details("Product not found")
+                return marketplace_service_pb2.Product()
+
+            return _product_to_proto(row)
+
+        except ValueError:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details("Invalid product_id")
+            return marketplace_service_pb2.Product()
+        except Exception as e:
+            logging.error(f"Error retrieving product: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error retrieving product: {str(e)}")
+            return marketplace_service_pb2.Product()
+
+    def ListProducts(self, request, context):
+        """List products one keyset-paginated page at a time, in item ID order.
+
+        With a query, list the available products matching it instead, best
+        match first; page_token is then the rank to continue from.
+        """
+        try:
+            page_size = min(request.page_size or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+            if request.query:
+                return self._search_products(request, page_size)
+
+            query = _products_query(request)
+
+            total_count = query.count() if request.include_total_count else 0
+
+            if request.page_token:
+                # Continue after the last product of the previous page
+                query = query.filter(MarketplaceItem.item_id > _parse_page_token(request.page_token))
+            elif request.page > 1:
+                # Legacy page numbers, the database still has to skip the earlier rows
+                query = query.offset((request.page - 1) * page_size)
+
+            # Fetch one extra row to find out whether another page exists
+            rows = query.limit(page_size + 1).all()
+            next_page_token = str(rows[page_size - 1].item_id) if len(rows) > page_size else ""
+
+            return marketplace_service_pb2.ListProductsResponse(
+                products=[_product_to_proto(row) for row in rows[:page_size]],
+                total_count=total_count,
+                next_page_token=next_page_token
+            )
+
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+            return marketplace_service_pb2.ListProductsResponse()
+        except Exception as e:
+            logging.error(f"Error listing products: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error listing products: {str(e)}")
+            return marketplace_service_pb2.ListProductsResponse()
+
+    def _search_products(self, request, page_size):
+        if request.page_token:
+            offset = _parse_page_token(request.page_token)
+        else:
+            offset = max(request.page - 1, 0) * page_size
+        if offset >= MAX_SEARCH_RESULTS:
+            raise ValueError(f"Search results can only be paged {MAX_SEARCH_RESULTS} deep")
+        limit = min(page_size, MAX_SEARCH_RESULTS - offset)
+
+        if request.category:
+            # Items have no category column, so no item is in any category
+            items = []
+        else:
+            # One extra hit tells whether another page exists
+            items = self.search.search(
+                request.query,
+                limit=limit + 1,
+                offset=offset,
+                min_price=_parse_price_filter(request.min_price),
+                max_price=_parse_price_filter(request.max_price)
+            )
+        next_page_token = str(offset + limit) if len(items) > limit else ""
+
+        return marketplace_service_pb2.ListProductsResponse(
+            products=[_product_to_proto(item) for item in items[:limit]],
+            next_page_token=next_page_token
+        )
+
+    def SuggestProducts(self, request, context):
+        """Complete the last word typed into a product search box."""
+        try:
+            limit = min(request.limit or DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS)
+            return marketplace_service_pb2.SuggestProductsResponse(
+                suggestions=self.search.suggest(request.prefix, limit=limit)
+            )
+
+        except Exception as e:
+            logging.error(f"Error suggesting products: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error suggesting products: {str(e)}")
+            return marketplace_service_pb2.SuggestProductsResponse()
+
+    def StreamProducts(self, request, context):
+        """Stream every matching product straight from a database cursor.
+
+        Meant for storefronts syncing the whole catalog; page_token resumes
+        an interrupted sync after the last product received.
+        """
+        try:
+            query = _products_query(request)
+            if request.page_token:
+                query = query.filter(MarketplaceItem.item_id > _parse_page_token(request.page_token))
+
+            for count, row in enumerate(query.yield_per(STREAM_PRODUCTS_BATCH_SIZE), 1):
+                if count % STREAM_PRODUCTS_BATCH_SIZE == 0 and not context.is_active():
+                    logging.info("Client cancelled product stream")
+                    return
+                yield _product_to_proto(row)
+
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+        except Exception as e:
+            logging.error(f"Error streaming products: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error streaming products: {str(e)}")
+
+    def CreateProduct(self, request, context):
+        """List a new item for sale."""
+        try:
+            item = MarketplaceItem(
+                name=request.name,
+                description=request.description or None,
+                price=_parse_price(request.price),
+                seller_id=int(request.created_by),
+                status=AVAILABLE
+            )
+            db.session.add(item)
+            db.session.commit()
+            self.search.item_changed(item)
+            return _product_to_proto(item)
+
+        except ValueError as e:
+            db.session.rollback()
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+            return marketplace_service_pb2.Product()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error creating product: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error creating product: {str(e)}")
+            return marketplace_service_pb2.Product()
+
+    def UpdateProduct(self, request, context):
+        """Update a listing that has not been sold."""
+        try:
+            item = db.session.query(MarketplaceItem).filter(
+                MarketplaceItem.item_id == int(request.product_id)).with_for_update().first()
+
+            if not item:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details("Product not found")
+                return marketplace_service_pb2.Product()
+
+            if item.status == SOLD:
+                context.set_code(grpc.StatusCode.FAILED_PRECONDITION)
+                context.set_details("Sold products cannot be changed")
+                return marketplace_service_pb2.Product()
+
+            if request.name:
+                item.name = request.name
+            if request.description:
+                item.description = request.description
+            if request.price:
+                item.price = _parse_price(request.price)
+            item.status = AVAILABLE if request.is_active else CANCELLED
+
+            db.session.commit()
+            self.search.item_changed(item)
+            return _product_to_proto(item)
+
+        except ValueError as e:
+            db.session.rollback()
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+            return marketplace_service_pb2.Product()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error updating product: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error updating product: {str(e)}")
+            return marketplace_service_pb2.Product()
+
+    def DeleteProduct(self, request, context):
+        """Withdraw a listing; sold items are kept for the order history."""
+        try:
+            # Conditional update, so a listing sold concurrently is not withdrawn
+            result = db.session.execute(
+                update(MarketplaceItem)
+                .where(MarketplaceItem.item_id == int(request.product_id))
+                .where(MarketplaceItem.status != SOLD)
+                .values(status=CANCELLED)
+            )
+            db.session.commit()
+            self.search.item_removed(int(request.product_id))
+
+            if result.rowcount == 0:
+                context.set_code(grpc.StatusCode.FAILED_PRECONDITION)
+                context.set_details("Product not found or already sold")
+                return marketplace_service_pb2.DeleteProductResponse(
+                    success=False,
+                    message="Product not found or already sold"
+                )
+
+            return marketplace_service_pb2.DeleteProductResponse(
+                success=True,
+                message="Product withdrawn"
+            )
+
+        except ValueError:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details("Invalid product_id")
+            return marketplace_service_pb2.DeleteProductResponse(success=False, message="Invalid product_id")
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error deleting product: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error deleting product: {str(e)}")
+            return marketplace_service_pb2.DeleteProductResponse(
+                success=False,
+                message=f"Failed to delete product: {str(e)}"
+            )
+
+    def CreateOrder(self, request, context):
+        """Buy a listed item, paying from one of the buyer's accounts.
+
+        Safe under contention without holding locks across round trips: the
+        item is claimed with a conditional UPDATE that only matches while it
+        is still available, and the account is debited with one that only
+        matches while the balance covers the price. Of two buyers racing for
+        an item the second blocks on the row until the first commits, then
+        matches nothing. Rows are always taken item first, then account, so
+        concurrent orders cannot deadlock.
+        """
+        try:
+            order = place_order(request)
+            self.search.item_removed(order.item_id)
+            return _order_to_proto(order, request.payment_method)
+
+        except OrderError as e:
+            context.set_code(e.code)
+            context.set_details(str(e))
+            return marketplace_service_pb2.Order()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error creating order: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error creating order: {str(e)}")
+            return marketplace_service_pb2.Order()
+
+    def GetOrder(self, request, context):
+        """Get a single order."""
+        try:
+            order = db.session.get(MarketplaceTransaction, int(request.order_id))
+
+            if not order:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details("Order not found")
+                return marketplace_service_pb2.Order()
+
+            return _order_to_proto(order)
+
+        except ValueError:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details("Invalid order_id")
+            return marketplace_service_pb2.Order()
+        except Exception as e:
+            logging.error(f"Error retrieving order: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error retrieving order: {str(e)}")
+            return marketplace_service_pb2.Order()
+
+    def ListOrders(self, request, context):
+        """List a buyer's orders newest first, one keyset-paginated page at a time."""
+        try:
+            page_size = min(request.page_size or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+            query = db.session.query(MarketplaceTransaction).filter(
+                MarketplaceTransaction.buyer_id == int(request.user_id))
+
+            # Every recorded sale is complete
+            if request.status and request.status != 'completed':
+                query = query.filter(false())
+            if request.start_date:
+                query = query.filter(
+                    MarketplaceTransaction.timestamp >= datetime.strptime(request.start_date, "%Y-%m-%d"))
+            if request.end_date:
+                # Include the whole end day
+                end_date = datetime.strptime(request.end_date, "%Y-%m-%d") + timedelta(days=1)
+                query = query.filter(MarketplaceTransaction.timestamp < end_date)
+
+            # A buyer's orders are few, counting them is cheap
+            total_count = query.count()
+
+            query = query.order_by(MarketplaceTransaction.transaction_id.desc())
+            if request.page_token:
+                query = query.filter(MarketplaceTransaction.transaction_id < int(request.page_token))
+            elif request.page > 1:
+                query = query.offset((request.page - 1) * page_size)
+
+            orders = query.limit(page_size + 1).all()
+            next_page_token = str(orders[page_size - 1].transaction_id) if len(orders) > page_size else ""
+
+            return marketplace_service_pb2.ListOrdersResponse(
+                orders=[_order_to_proto(order) for order in orders[:page_size]],
+                total_count=total_count,
+                next_page_token=next_page_token
+            )
+
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f"Invalid request: {str(e)}")
+            return marketplace_service_pb2.ListOrdersResponse()
+        except Exception as e:
+            logging.error(f"Error listing orders: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error listing orders: {str(e)}")
+            return marketplace_service_pb2.ListOrdersResponse()
+
+    def UpdateOrderStatus(self, request, context):
+        """Not supported, marketplace transactions have no status column."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Orders are final once placed")
+        return marketplace_service_pb2.Order()
+
+
+def place_order(request):
+    """Claim the item, debit the buyer and record the sale in one transaction.
+
+    Raises:
+        OrderError: If the order is malformed or cannot be filled
+    """
+    if len(request.items) != 1 or request.items[0].quantity not in (0, 1):
+        raise OrderError(grpc.StatusCode.INVALID_ARGUMENT,
+                         "An order holds exactly one marketplace item with quantity 1")
+    try:
+        item_id = int(request.items[0].product_id)
+        buyer_id = int(request.user_id)
+        account_id = int(request.payment_method)
+    except ValueError:
+        raise OrderError(grpc.StatusCode.INVALID_ARGUMENT,
+                         "user_id, product_id and payment_method must be numeric IDs")
+
+    item = db.session.query(MarketplaceItem.price, MarketplaceItem.seller_id).filter(
+        MarketplaceItem.item_id == item_id).first()
+    if not item:
+        raise OrderError(grpc.StatusCode.NOT_FOUND, "Product not found")
+    if item.seller_id == buyer_id:
+        raise OrderError(grpc.StatusCode.FAILED_PRECONDITION, "Sellers cannot buy their own items")
+
+    try:
+        claimed = db.session.execute(
+            update(MarketplaceItem)
+            .where(MarketplaceItem.item_id == item_id)
+            .where(MarketplaceItem.status == AVAILABLE)
+            .where(MarketplaceItem.price == item.price)
+            .values(status=SOLD, buyer_id=buyer_id)
+        )
+        if claimed.rowcount != 1:
+            raise OrderError(grpc.StatusCode.FAILED_PRECONDITION, "This item is no longer available")
+
+        debited = db.session.execute(
+            update(Account)
+            .where(Account.account_id == account_id)
+            .where(Account.user_id == buyer_id)
+            .where(Account.balance >= item.price)
+            .values(balance=Account.balance - item.price)
+        )
+        if debited.rowcount != 1:
+            raise OrderError(grpc.StatusCode.FAILED_PRECONDITION,
+                             "Payment account not found or insufficient funds")
+
+        order = MarketplaceTransaction(
+            item_id=item_id,
+            buyer_id=buyer_id,
+            seller_id=item.seller_id,
+            amount=item.price
+        )
+        db.session.add(order)
+        db.session.commit()
+        return order
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _products_query(request):
+    """Build the filtered query shared by ListProducts and StreamProducts."""
+    query = db.session.query(*PRODUCT_COLUMNS)
+    if request.active_only:
+        query = query.filter(MarketplaceItem.status == AVAILABLE)
+    if request.category:
+        # Items have no category column, so no item is in any category
+        query = query.filter(false())
+    min_price = _parse_price_filter(request.min_price)
+    if min_price is not None:
+        query = query.filter(MarketplaceItem.price >= min_price)
+    max_price = _parse_price_filter(request.max_price)
+    if max_price is not None:
+        query = query.filter(MarketplaceItem.price <= max_price)
+    return query.order_by(MarketplaceItem.item_id)
+
+
+def _parse_price(value):
+    """Parse a positive decimal price.
+
+    Raises:
+        ValueError: If the price is missing, malformed or not positive
+    """
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"Invalid price: {value}")
+    if not price.is_finite() or price <= 0:
+        raise ValueError(f"Invalid price: {value}")
+    return price
+
+
+def _parse_page_token(token):
+    """Parse a page_token: the last item ID of a listing page, or a search rank.
+
+    Raises:
+        ValueError: If the token was not issued by this service
+    """
+    try:
+        value = int(token)
+    except ValueError:
+        raise ValueError("Invalid page_token")
+    if value < 0:
+        raise ValueError("Invalid page_token")
+    return value
+
+
+def _parse_price_filter(value):
+    """Parse an optional min_price/max_price bound, None when empty.
+
+    Raises:
+        ValueError: If the bound is malformed or negative
+    """
+    if not value:
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"Invalid price filter: {value}")
+    if not price.is_finite() or price < 0:
+        raise ValueError(f"Invalid price filter: {value}")
+    return price
+
+
+def _product_to_proto(item):
+    """Convert a marketplace item, or a PRODUCT_COLUMNS row, to a Product message."""
+    return marketplace_service_pb2.Product(
+        product_id=str(item.item_id),
+        name=item.name or "",
+        description=item.description or "",
+        price=str(item.price),
+        created_by=str(item.seller_id),
+        is_active=item.status == AVAILABLE
+    )
+
+
+def _order_to_proto(order, payment_method=""):
+    """Convert a marketplace transaction to an Order message."""
+    return marketplace_service_pb2.Order(
+        order_id=str(order.transaction_id),
+        user_id=str(order.buyer_id),
+        total_amount=str(order.amount),
+        status='completed',
+        date_created=order.timestamp.isoformat() if order.timestamp else "",
+        payment_method=payment_method,
+        items=[marketplace_service_pb2.OrderItem(
+            item_id=str(order.transaction_id),
+            product_id=str(order.item_id),
+            quantity=1,
+            price=str(order.amount),
+            subtotal=str(order.amount)
+        )]
+    )
+
+
+def serve():
+    """Start a gRPC server hosting only the marketplace service.
+
+    Kept for running the service on its own; grpc_utils.server hosts every
+    service on one port with a shared worker pool and database engine.
+    """
+    from grpc_utils.server import GrpcServer
+    server = GrpcServer(address='[::]:50054')
+    server.add_service(
+        marketplace_service_pb2.DESCRIPTOR.services_by_name['MarketplaceService'].full_name,
+        MarketplaceServicer(),
+        marketplace_service_pb2_grpc.add_MarketplaceServiceServicer_to_server
+    )
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    serve()
@@ -1,8 +1,11 @@
 import grpc
-from concurrent import futures
-import time
 import logging
-from decimal import Decimal
+import queue
+import threading
+from decimal import Decimal, InvalidOperation
+from datetime import datetime, timedelta
+from itertools import islice
+from sqlalchemy import or_
 
 # Import generated protobuf code
 import sys
@@ -16,9 +19,53 @@ from database.repositories.transaction_repo import (
     process_deposit,
     process_withdrawal,
     process_transfer,
-    get_transaction_history
+    get_transaction_history,
+    apply_keyset,
+    apply_transaction_batch,
+    encode_cursor
 )
 from core.models import Account, User, Transaction
+from grpc_utils.field_mask import FieldProjection
+
+# Batch size limits for StreamTransactionHistory
+DEFAULT_STREAM_BATCH_SIZE = 500
+MAX_STREAM_BATCH_SIZE = 5000
+
+# Batch size limits for ProcessTransactions
+DEFAULT_INGEST_BATCH_SIZE = 500
+MAX_INGEST_BATCH_SIZE = 5000
+
+# Batches read from the request stream ahead of the one being applied
+INGEST_READ_AHEAD_BATCHES = 2
+
+# Accepted spellings of the bulk ingestion transaction types
+INGEST_TRANSACTION_TYPES = {
+    'deposit': 'deposit',
+    'withdraw': 'withdraw',
+    'withdrawal': 'withdraw',
+    'transfer': 'transfer',
+}
+
+# Columns and values behind each Transaction field, so a read_mask can limit
+# both what is loaded and what is serialized. Getters work on ORM objects
+# and on projected rows alike; user_id is passed in by the caller
+TRANSACTION_PROJECTION = FieldProjection(
+    transaction_service_pb2.Transaction,
+    {
+        'transaction_id': ((Transaction.transaction_id,), lambda tx: str(tx.transaction_id)),
+        'user_id': ((), lambda tx: ""),
+        'account_id': ((Transaction.account_id,), lambda tx: str(tx.account_id)),
+        'transaction_type': ((Transaction.type,), lambda tx: tx.type or ""),
+        'amount': ((Transaction.amount,), lambda tx: str(tx.amount or 0)),
+        'description': ((Transaction.description,), lambda tx: tx.description or ""),
+        'date_posted': ((Transaction.date_posted,),
+                        lambda tx: tx.date_posted.isoformat() if tx.date_posted else ""),
+        'reference_id': ((Transaction.recipient_account_id,), lambda tx: str(tx.recipient_account_id or "")),
+        'status': ((), lambda tx: "completed"),
+    },
+    # Keyset cursors are built from these, whatever the mask
+    always=(Transaction.transaction_id, Transaction.date_posted)
+)
 
 # Update model names to match the actual models
 # AccountModel -> Account, UserModel -> User, TransactionModel -> Transaction
@@ -263,16 +310,18 @@ class TransactionServicer(transaction_service_pb2_grpc.TransactionServiceService
             )
 
     def GetTransactionHistory(self, request, context):
-        """Get transaction history for an account."""
+        """Get transaction history for an account.
+
+        Only the columns behind the fields in read_mask are loaded and
+        only those fields are populated.
+        """
         try:
             # Extract fields from request
-            account_id = request.account_id
-            user_id = request.user_id
-            start_date = request.start_date
-            end_date = request.end_date
-            transaction_type = request.transaction_type
+            account_id = int(request.account_id)
+            user_id = int(request.user_id)
             limit = request.limit or 50
             offset = request.offset or 0
+            fields = TRANSACTION_PROJECTION.resolve(request.read_mask)
             
             # Use db.session.query instead of AccountModel.query
             account = db.session.query(Account).get(account_id)
@@ -293,54 +342,31 @@ class TransactionServicer(transaction_service_pb2_grpc.TransactionServiceService
                     message="Permission denied"
                 )
             
-            # Get transaction history - adjusted to match the updated function signature
             transactions = get_transaction_history(
-                user_id, account_id, start_date, end_date, 
-                transaction_type=transaction_type, limit=limit, offset=offset
+                user_id, account_id, request.start_date, request.end_date,
+                transaction_type=request.transaction_type, limit=limit, offset=offset,
+                columns=TRANSACTION_PROJECTION.columns(fields)
             )
             
-            # Assuming get_transaction_history returns a list but not a count now
-            total_count = len(transactions)
-            
-            # Map transaction types to proto enum
-            tx_type_map = {
-                'deposit': transaction_service_pb2.TransactionType.DEPOSIT,
-                'withdraw': transaction_service_pb2.TransactionType.WITHDRAWAL,  # Updated to 'withdraw'
-                'transfer': transaction_service_pb2.TransactionType.TRANSFER_OUT,
-                'payment': transaction_service_pb2.TransactionType.PAYMENT,
-                'fee': transaction_service_pb2.TransactionType.FEE,
-                'interest': transaction_service_pb2.TransactionType.INTEREST
-            }
-            
-            # Prepare transaction responses - handle potential None values
-            transaction_protos = []
-            for tx in transactions:
-                tx_proto = transaction_service_pb2.Transaction(
-                    transaction_id=str(tx.transaction_id),
-                    account_id=str(tx.account_id),
-                    user_id=user_id,  # Use the provided user_id
-                    transaction_type=tx_type_map.get(
-                        tx.type,  # Updated from tx.transaction_type to tx.type
-                        transaction_service_pb2.TransactionType.OTHER
-                    ),
-                    amount=float(tx.amount or 0),
-                    description=tx.description or "",
-                    created_at=str(tx.date_posted or ""),
-                    status=transaction_service_pb2.TransactionStatus.COMPLETED,
-                    # Handle the case where tx might not have a recipient_account_id attribute
-                    reference_id=str(getattr(tx, 'recipient_account_id', '')) if hasattr(tx, 'recipient_account_id') else ""
-                )
-                transaction_protos.append(tx_proto)
-            
             return transaction_service_pb2.TransactionHistoryResponse(
                 success=True,
                 message=f"Retrieved {len(transactions)} transactions",
-                transactions=transaction_protos,
-                total_count=total_count,
+                transactions=[
+                    TRANSACTION_PROJECTION.to_proto(tx, fields, user_id=request.user_id)
+                    for tx in transactions
+                ],
+                total_count=len(transactions),
                 limit=limit,
                 offset=offset
             )
             
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f"Invalid request: {str(e)}")
+            return transaction_service_pb2.TransactionHistoryResponse(
+                success=False,
+                message=f"Invalid request: {str(e)}"
+            )
         except Exception as e:
             logging.error(f"Error retrieving transaction history: {str(e)}")
             context.set_code(grpc.StatusCode.INTERNAL)
@@ -350,20 +376,290 @@ class TransactionServicer(transaction_service_pb2_grpc.TransactionServiceService
                 message=f"Failed to retrieve transaction history: {str(e)}"
             )
 
-def serve():
-    """Start the gRPC server."""
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    transaction_service_pb2_grpc.add_TransactionServiceServicer_to_server(
-        TransactionServicer(), server)
-    server.add_insecure_port('[::]:50052')
-    server.start()
-    print("Transaction gRPC server started on port 50052")
+    def StreamTransactionHistory(self, request, context):
+        """Stream transaction history in batches straight from a database cursor.
+
+        The sync gRPC server only pulls the next batch from this generator once
+        the previous one has been written, so a slow consumer throttles the
+        database reads instead of buffering the history in memory. Every batch
+        carries a cursor the client can pass as resume_cursor to continue after
+        a dropped connection.
+        """
+        try:
+            user_id = int(request.user_id)
+            batch_size = min(request.batch_size or DEFAULT_STREAM_BATCH_SIZE, MAX_STREAM_BATCH_SIZE)
+            
+            fields = TRANSACTION_PROJECTION.resolve(request.read_mask)
+            query = db.session.query(*TRANSACTION_PROJECTION.columns(fields))
+            
+            if request.account_id:
+                account = db.session.query(Account).get(int(request.account_id))
+                
+                if not account:
+                    context.set_code(grpc.StatusCode.NOT_FOUND)
+                    context.set_details("Account not found")
+                    return
+                    
+                if account.user_id != user_id:
+                    context.set_code(grpc.StatusCode.PERMISSION_DENIED)
+                    context.set_details("User does not have permission to access this account")
+                    return
+                
+                query = query.filter(Transaction.account_id == account.account_id)
+            else:
+                user_accounts = db.session.query(Account.account_id).filter(Account.user_id == user_id)
+                query = query.filter(or_(
+                    Transaction.account_id.in_(user_accounts.scalar_subquery()),
+                    Transaction.recipient_account_id.in_(user_accounts.scalar_subquery())
+                ))
+            
+            if request.start_date:
+                query = query.filter(Transaction.date_posted >= datetime.strptime(request.start_date, "%Y-%m-%d"))
+            if request.end_date:
+                # Include the whole end day
+                end_date = datetime.strptime(request.end_date, "%Y-%m-%d") + timedelta(days=1)
+                query = query.filter(Transaction.date_posted < end_date)
+            if request.transaction_type:
+                query = query.filter(Transaction.type == request.transaction_type)
+            
+            try:
+                query = apply_keyset(query, request.resume_cursor or None)
+            except ValueError:
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details("Invalid resume_cursor")
+                return
+            
+            rows = iter(query.yield_per(batch_size))
+            batch = list(islice(rows, batch_size))
+            while batch:
+                if not context.is_active():
+                    logging.info("Client cancelled transaction history stream")
+                    return
+                
+                # Look one batch ahead so the final batch can be flagged
+                next_batch = list(islice(rows, batch_size))
+                last = batch[-1]
+                yield transaction_service_pb2.TransactionHistoryBatch(
+                    transactions=[
+                        TRANSACTION_PROJECTION.to_proto(row, fields, user_id=request.user_id)
+                        for row in batch
+                    ],
+                    next_cursor=encode_cursor(last.date_posted, last.transaction_id),
+                    last_batch=not next_batch
+                )
+                batch = next_batch
+            
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f"Invalid request: {str(e)}")
+        except Exception as e:
+            logging.error(f"Error streaming transaction history: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error streaming transaction history: {str(e)}")
+
+    def ProcessTransactions(self, request_iterator, context):
+        """Apply a stream of deposits, withdrawals and transfers in batches.
+
+        The first message may carry BulkIngestOptions. Requests are grouped
+        into batches that are each applied with one account lookup and one
+        flush, while the next batches are already being read. One result per
+        request is streamed back in request order once its batch has been
+        applied (and, unless COMMIT_AT_END, committed). With COMMIT_AT_END a
+        failure rolls back the whole stream and ends it with ABORTED.
+        """
+        messages = iter(request_iterator)
+        first = next(messages, None)
+        if first is None:
+            return
+        
+        options = transaction_service_pb2.BulkIngestOptions()
+        if first.WhichOneof('payload') == 'options':
+            options = first.options
+        else:
+            messages = _chain_first(first, messages)
+        
+        batch_size = min(options.batch_size or DEFAULT_INGEST_BATCH_SIZE, MAX_INGEST_BATCH_SIZE)
+        granularity = options.commit_granularity
+        at_end = granularity == transaction_service_pb2.COMMIT_AT_END
+        
+        try:
+            for batch in _read_ahead(messages, batch_size, INGEST_READ_AHEAD_BATCHES):
+                if not context.is_active():
+                    logging.info("Client cancelled transaction ingestion")
+                    db.session.rollback()
+                    return
+                
+                results = [None] * len(batch)
+                items = []
+                for index, (_, message) in enumerate(batch):
+                    if message.WhichOneof('payload') != 'transaction':
+                        results[index] = (False, "Options are only accepted as the first message", None)
+                        continue
+                    try:
+                        items.append((index, _parse_ingest_item(message.transaction)))
+                    except ValueError as e:
+                        results[index] = (False, str(e), None)
+                
+                if granularity == transaction_service_pb2.COMMIT_PER_ITEM:
+                    responses = {}
+                    for index, item in items:
+                        responses[index] = self._apply_ingest_items(batch, [(index, item)], commit=True)[index]
+                else:
+                    responses = self._apply_ingest_items(batch, items, commit=not at_end, fatal=at_end)
+                
+                for index, entry in enumerate(batch):
+                    if index in responses:
+                        yield responses[index]
+                    else:
+                        yield self._ingest_result(entry, results[index], False)
+            
+            if at_end:
+                db.session.commit()
+            
+        except ValueError as e:
+            db.session.rollback()
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f"Invalid request: {str(e)}")
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error ingesting transactions: {str(e)}")
+            context.set_code(grpc.StatusCode.ABORTED if at_end else grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error ingesting transactions: {str(e)}")
+
+    def _apply_ingest_items(self, batch, items, commit, fatal=False):
+        """Apply parsed items of a batch and return their results by batch index.
+
+        A database error fails every item passed in, or is raised when fatal.
+        """
+        if not items:
+            return {}
+        try:
+            applied = apply_transaction_batch([item for _, item in items])
+            # Build the messages before commit expires the new rows
+            responses = {
+                index: self._ingest_result(batch[index], result, commit)
+                for (index, _), result in zip(items, applied)
+            }
+            if commit:
+                db.session.commit()
+            return responses
+        except Exception as e:
+            db.session.rollback()
+            if fatal:
+                raise
+            logging.error(f"Error applying transaction batch: {str(e)}")
+            failure = (False, f"Batch failed: {str(e)}", None)
+            return {index: self._ingest_result(batch[index], failure, False) for index, _ in items}
+
+    def _ingest_result(self, entry, result, committed):
+        """Build the ProcessTransactionResult for one (sequence, message) entry."""
+        sequence, message = entry
+        success, text, transaction = result
+        response = transaction_service_pb2.ProcessTransactionResult(
+            sequence=sequence,
+            reference_id=message.transaction.reference_id,
+            success=success,
+            message=text,
+            committed=success and committed
+        )
+        if transaction is not None:
+            response.transaction.CopyFrom(
+                TRANSACTION_PROJECTION.to_proto(transaction, user_id=message.transaction.user_id))
+        return response
+
+def _parse_ingest_item(request):
+    """Validate a bulk ingestion request and convert it for apply_transaction_batch.
+
+    Raises:
+        ValueError: If the request is malformed
+    """
+    transaction_type = INGEST_TRANSACTION_TYPES.get(request.transaction_type.lower())
+    if transaction_type is None:
+        raise ValueError(f"Unsupported transaction type: {request.transaction_type}")
+    try:
+        amount = Decimal(request.amount)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {request.amount}")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {request.amount}")
+    if transaction_type == 'transfer' and not request.to_account_id:
+        raise ValueError("Transfers need a to_account_id")
+    return {
+        'user_id': int(request.user_id),
+        'account_id': int(request.account_id),
+        'type': transaction_type,
+        'amount': amount,
+        'description': request.description,
+        'to_account_id': int(request.to_account_id) if request.to_account_id else None,
+    }
+
+
+def _chain_first(first, rest):
+    yield first
+    yield from rest
+
+
+def _read_ahead(messages, batch_size, depth):
+    """Yield batches of (sequence, message) while a thread reads the next ones.
+
+    Reading and deserializing the following batches overlaps with the
+    database work on the current one; the bounded queue stops the reader,
+    and with it the client through flow control, when it gets too far ahead.
+    """
+    batches = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def reader():
+        try:
+            sequenced = enumerate(messages)
+            while True:
+                batch = list(islice(sequenced, batch_size))
+                if not batch:
+                    break
+                if not put(batch):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(end)
+
+    thread = threading.Thread(target=reader, name='ingest-reader', daemon=True)
+    thread.start()
     try:
         while True:
-            time.sleep(86400)  # One day in seconds
-    except KeyboardInterrupt:
-        server.stop(0)
-        print("Server stopped")
+            batch = batches.get()
+            if batch is end:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+    finally:
+        stop.set()
+
+def serve():
+    """Start a gRPC server hosting only the transaction service.
+
+    Kept for running the service on its own; grpc_utils.server hosts every
+    service on one port with a shared worker pool and database engine.
+    """
+    from grpc_utils.server import GrpcServer
+    server = GrpcServer(address='[::]:50052')
+    server.add_service(
+        transaction_service_pb2.DESCRIPTOR.services_by_name['TransactionService'].full_name,
+        TransactionServicer(),
+        transaction_service_pb2_grpc.add_TransactionServiceServicer_to_server
+    )
+    server.serve_forever()
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
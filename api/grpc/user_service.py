@@ -1,9 +1,7 @@
 import grpc
 import logging
-from concurrent import futures
 import sys
 import os
-import time
 import uuid
 
 # Import generated gRPC code
@@ -274,19 +272,19 @@ class UserServicer(user_service_pb2_grpc.UserServiceServicer):
             )
 
 def serve():
-    """Start the gRPC server."""
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    user_service_pb2_grpc.add_UserServiceServicer_to_server(
-        UserServicer(), server)
-    server.add_insecure_port('[::]:50053')
-    server.start()
-    print("User gRPC server started on port 50053")
-    try:
-        while True:
-            time.sleep(86400)  # One day in seconds
-    except KeyboardInterrupt:
-        server.stop(0)
-        print("Server stopped")
+    """Start a gRPC server hosting only the user service.
+
+    Kept for running the service on its own; grpc_utils.server hosts every
+    service on one port with a shared worker pool and database engine.
+    """
+    from grpc_utils.server import GrpcServer
+    server = GrpcServer(address='[::]:50053')
+    server.add_service(
+        user_service_pb2.DESCRIPTOR.services_by_name['UserService'].full_name,
+        UserServicer(),
+        user_service_pb2_grpc.add_UserServiceServicer_to_server
+    )
+    server.serve_forever()
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
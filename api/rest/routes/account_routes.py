@@ -1,7 +1,10 @@
 from flask import Blueprint, jsonify, request, current_app
 from flask_login import current_user, login_required
 from core.models import Account, User
+from core.services.fx_rates import convert_amount
+from database.repositories.transaction_repo import process_transfer
 from utils.extensions import db
+from decimal import Decimal, InvalidOperation
 import logging
 
 # Create a blueprint for account API endpoints
@@ -126,6 +129,8 @@ def transfer_money(account_id):
     """
     Transfer money from one account to another
     Expects JSON with amount, recipient_account_id, and optional description
+    The amount is in the source account's currency; a recipient account in
+    another currency is credited the converted amount at the current rate
     """
     try:
         data = request.get_json()
@@ -138,6 +143,15 @@ def transfer_money(account_id):
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
+        try:
+            amount = Decimal(str(data['amount']))
+        except InvalidOperation:
+            return jsonify({"error": "Invalid amount"}), 400
+        
+        # NaN and Infinity parse, but cannot be compared or converted
+        if not amount.is_finite() or amount <= 0:
+            return jsonify({"error": "Amount must be positive"}), 400
+        
         user_id = current_user.get_id()
         source_account = Account.query.filter_by(account_id=account_id, user_id=user_id).first()
         
@@ -150,28 +164,24 @@ def transfer_money(account_id):
         if not recipient_account:
             return jsonify({"error": "Recipient account not found"}), 404
         
-        amount = float(data['amount'])
-        
-        if amount <= 0:
-            return jsonify({"error": "Amount must be positive"}), 400
-        
-        if source_account.balance < amount:
-            return jsonify({"error": "Insufficient funds"}), 400
+        description = data.get('description', 'Transfer')
         
-        description = data.get('description', f'Transfer to account {recipient_account_id}')
-        
-        # Perform the transfer
-        source_account.balance -= amount
-        recipient_account.balance += amount
-        
-        # Create transaction records (you would implement this based on your transaction model)
-        # This is just a placeholder for the actual transaction creation logic
-        
-        db.session.commit()
+        # Perform the transfer, converting currencies if needed
+        success, message, transaction = process_transfer(
+            account_id, recipient_account.account_id, amount, description
+        )
+        if not success:
+            return jsonify({"error": message}), 400
         
+        rate = transaction.exchange_rate
         return jsonify({
             "message": "Transfer successful",
-            "new_balance": float(source_account.balance)
+            "new_balance": float(source_account.balance),
+            "amount": float(amount),
+            "currency_code": source_account.currency_code,
+            "credited_amount": float(convert_amount(amount, rate) if rate is not None else amount),
+            "credited_currency_code": recipient_account.currency_code,
+            "exchange_rate": str(rate) if rate is not None else None
         })
         
     except Exception as e:
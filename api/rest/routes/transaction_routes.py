@@ -1,14 +1,131 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
 from flask_login import current_user, login_required
 from core.models import Account, Transaction
 from utils.extensions import db
+import csv
+import io
+import json
 import logging
+import zlib
 from datetime import datetime, timedelta
 
 # Create a blueprint for transaction API endpoints
 transaction_api = Blueprint('transaction_api', __name__)
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round trip from the server-side cursor during exports
+EXPORT_BATCH_SIZE = 1000
+
+# Columns included in exports, in CSV column order
+EXPORT_COLUMNS = (
+    Transaction.transaction_id,
+    Transaction.account_id,
+    Transaction.amount,
+    Transaction.type,
+    Transaction.description,
+    Transaction.date_posted,
+    Transaction.recipient_account_id,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+def _apply_transaction_filters(query, args):
+    """
+    Apply the date range, type and amount filters from the query string
+    Returns a tuple of (query, error message or None)
+    """
+    start_date_str = args.get('startDate')
+    if start_date_str:
+        try:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+            query = query.filter(Transaction.date_posted >= start_date)
+        except ValueError:
+            return query, "Invalid startDate format. Use YYYY-MM-DD"
+            
+    end_date_str = args.get('endDate')
+    if end_date_str:
+        try:
+            end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
+            # Include the whole day by adding one day and subtracting one second
+            end_date = end_date + timedelta(days=1) - timedelta(seconds=1)
+            query = query.filter(Transaction.date_posted <= end_date)
+        except ValueError:
+            return query, "Invalid endDate format. Use YYYY-MM-DD"
+    
+    if args.get('type'):
+        transaction_type = args.get('type')
+        query = query.filter(Transaction.type == transaction_type)
+        
+    min_amount_str = args.get('minAmount')
+    if min_amount_str:
+        try:
+            min_amount = float(min_amount_str)
+            query = query.filter(Transaction.amount >= min_amount)
+        except ValueError:
+            return query, "Invalid minAmount format. Must be a number"
+            
+    max_amount_str = args.get('maxAmount')
+    if max_amount_str:
+        try:
+            max_amount = float(max_amount_str)
+            query = query.filter(Transaction.amount <= max_amount)
+        except ValueError:
+            return query, "Invalid maxAmount format. Must be a number"
+    
+    return query, None
+
+def _export_row(row):
+    """Convert a projected export row into a JSON serializable dict"""
+    return {
+        'transaction_id': row.transaction_id,
+        'account_id': row.account_id,
+        'amount': float(row.amount),
+        'type': row.type,
+        'description': row.description,
+        'date_posted': row.date_posted.isoformat(),
+        'recipient_account_id': row.recipient_account_id
+    }
+
+def _ndjson_chunks(rows):
+    """Yield one NDJSON chunk per fetched batch of rows"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(_export_row(row)))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+def _csv_chunks(rows):
+    """Yield a CSV header followed by one chunk per fetched batch of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    for row in rows:
+        data = _export_row(row)
+        writer.writerow([data[field] for field in EXPORT_FIELDS])
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+def _gzip_chunks(chunks):
+    """Gzip-compress a stream of text chunks on the fly"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
 @transaction_api.route('/accounts/<int:account_id>/transactions', methods=['GET'])
 @login_required
 def get_account_transactions(account_id):
@@ -30,46 +147,11 @@ def get_account_transactions(account_id):
             return jsonify({"error": "Account not found or not authorized"}), 404
         
         # Start with base query
-        query = Transaction.query.filter_by(account_id=account_id)
-        
-        # Apply filters based on query parameters
-        start_date_str = request.args.get('startDate')
-        if start_date_str:
-            try:
-                start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-                query = query.filter(Transaction.date_posted >= start_date)
-            except ValueError:
-                return jsonify({"error": "Invalid startDate format. Use YYYY-MM-DD"}), 400
-                
-        end_date_str = request.args.get('endDate')
-        if end_date_str:
-            try:
-                end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
-                # Include the whole day by adding one day and subtracting one second
-                end_date = end_date + timedelta(days=1) - timedelta(seconds=1)
-                query = query.filter(Transaction.date_posted <= end_date)
-            except ValueError:
-                return jsonify({"error": "Invalid endDate format. Use YYYY-MM-DD"}), 400
-        
-        if request.args.get('type'):
-            transaction_type = request.args.get('type')
-            query = query.filter(Transaction.type == transaction_type)
-            
-        min_amount_str = request.args.get('minAmount')
-        if min_amount_str:
-            try:
-                min_amount = float(min_amount_str)
-                query = query.filter(Transaction.amount >= min_amount)
-            except ValueError:
-                return jsonify({"error": "Invalid minAmount format. Must be a number"}), 400
-                
-        max_amount_str = request.args.get('maxAmount')
-        if max_amount_str:
-            try:
-                max_amount = float(max_amount_str)
-                query = query.filter(Transaction.amount <= max_amount)
-            except ValueError:
-                return jsonify({"error": "Invalid maxAmount format. Must be a number"}), 400
+        query, error = _apply_transaction_filters(
+            Transaction.query.filter_by(account_id=account_id), request.args
+        )
+        if error:
+            return jsonify({"error": error}), 400
         
         # Order by date, most recent first
         transactions = query.order_by(Transaction.date_posted.desc()).all()
@@ -158,4 +240,54 @@ def get_transaction_receipt(transaction_id):
         })
     except Exception as e:
         logger.error(f"Error generating transaction receipt: {e}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@transaction_api.route('/accounts/<int:account_id>/transactions/export', methods=['GET'])
+@login_required
+def export_account_transactions(account_id):
+    """
+    Stream all transactions for a specific account, most recent first
+    Rows are read from a server-side cursor so memory use does not grow
+    with the size of the export.
+    Optional query parameters:
+    - format (ndjson, csv), defaults to ndjson
+    - gzip (true/false), compress the response on the fly
+    - startDate, endDate, type, minAmount, maxAmount as for the listing endpoint
+    """
+    try:
+        user_id = current_user.get_id()
+        
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in EXPORT_MIMETYPES:
+            return jsonify({"error": "Invalid format. Use ndjson or csv"}), 400
+        
+        # First check if the account belongs to the current user
+        account = Account.query.filter_by(account_id=account_id, user_id=user_id).first()
+        if not account:
+            return jsonify({"error": "Account not found or not authorized"}), 404
+        
+        query = db.session.query(*EXPORT_COLUMNS).filter(Transaction.account_id == account_id)
+        query, error = _apply_transaction_filters(query, request.args)
+        if error:
+            return jsonify({"error": error}), 400
+        
+        rows = query.order_by(
+            Transaction.date_posted.desc(), Transaction.transaction_id.desc()
+        ).yield_per(EXPORT_BATCH_SIZE)
+        
+        chunks = _csv_chunks(rows) if export_format == 'csv' else _ndjson_chunks(rows)
+        filename = f"account_{account_id}_transactions.{export_format}"
+        headers = {"Content-Disposition": f"attachment; filename={filename}"}
+        
+        if request.args.get('gzip', '').lower() in ('1', 'true', 'yes'):
+            chunks = _gzip_chunks(chunks)
+            headers["Content-Encoding"] = "gzip"
+        
+        return Response(
+            stream_with_context(chunks),
+            mimetype=EXPORT_MIMETYPES[export_format],
+            headers=headers
+        )
+    except Exception as e:
+        logger.error(f"Error exporting account transactions: {e}")
+        return jsonify({"error": str(e)}), 500
@@ -57,6 +57,12 @@ class Transaction(db.Model):
     amount = db.Column(db.Float, nullable=False)
     type = db.Column(db.String(10), nullable=False)  # 'deposit', 'withdraw', or 'transfer'
     recipient_account_id = db.Column(db.Integer, db.ForeignKey("accounts.account_id"), nullable=True)
+    exchange_rate = db.Column(db.Numeric(20, 10), nullable=True)  # Set on cross-currency transfers
+
+    __table_args__ = (
+        db.Index("ix_transactions_account_date", "account_id", "date_posted"),
+        db.Index("ix_transactions_date_posted", "date_posted"),
+    )
 
     def __repr__(self):
         return f"Transaction('{self.date_posted}', '{self.description}', '{self.amount}', Type: '{self.type}')"
@@ -74,6 +80,21 @@ class Account(db.Model):
         return f"<Account {self.account_type}, Currency Code: {self.currency_code}, User ID: {self.user_id}>"
 
 
+class ExchangeRate(db.Model):
+    __tablename__ = "exchange_rates"
+    __table_args__ = (
+        db.UniqueConstraint("base_currency", "quote_currency", "effective_at", name="uq_exchange_rates_pair_effective"),
+    )
+    rate_id = db.Column(db.Integer, primary_key=True)
+    base_currency = db.Column(db.String(3), nullable=False)
+    quote_currency = db.Column(db.String(3), nullable=False)
+    rate = db.Column(db.Numeric(20, 10), nullable=False)  # Units of quote_currency per unit of base_currency
+    effective_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"ExchangeRate('{self.base_currency}/{self.quote_currency}', Rate: '{self.rate}', Effective At: '{self.effective_at}')"
+
+
 class SignedDocument(db.Model):
     __tablename__ = "signed_documents"
     document_id = db.Column(db.Integer, primary_key=True)
@@ -115,6 +136,38 @@ class StockAsset(db.Model):
         return f"StockAsset('{self.name}', '{self.symbol}', Shares: '{self.shares}')"
 
 
+class PortfolioValuation(db.Model):
+    __tablename__ = "portfolio_valuations"
+    valuation_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), nullable=False, index=True)
+    valued_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    base_currency = db.Column(db.String(3), nullable=False)
+    cash = db.Column(db.Numeric(20, 2), nullable=False)
+    crypto = db.Column(db.Numeric(20, 2), nullable=False)
+    stocks = db.Column(db.Numeric(20, 2), nullable=False)
+    total = db.Column(db.Numeric(20, 2), nullable=False)
+    unpriced_holdings = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"PortfolioValuation(User ID: '{self.user_id}', Total: '{self.total} {self.base_currency}', Valued At: '{self.valued_at}')"
+
+
+class AccountMonthlyRollup(db.Model):
+    __tablename__ = "account_monthly_rollups"
+    __table_args__ = (
+        db.UniqueConstraint("account_id", "month", name="uq_account_monthly_rollups_account_month"),
+    )
+    rollup_id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey("accounts.account_id", ondelete="CASCADE"), nullable=False)
+    month = db.Column(db.Date, nullable=False)  # First day of the month
+    credits = db.Column(db.Numeric(20, 2), nullable=False, default=0)
+    debits = db.Column(db.Numeric(20, 2), nullable=False, default=0)  # Positive total of outflows
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"AccountMonthlyRollup(Account ID: '{self.account_id}', Month: '{self.month}', Credits: '{self.credits}', Debits: '{self.debits}')"
+
+
 class MarketplaceItem(db.Model):
     __tablename__ = "marketplace_items"
     item_id = db.Column(db.Integer, primary_key=True)
@@ -138,6 +191,10 @@ class MarketplaceTransaction(db.Model):
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     amount = db.Column(db.Numeric(20, 2), nullable=False)
 
+    __table_args__ = (
+        db.Index("ix_mkt_transactions_timestamp", "timestamp"),
+    )
+
     def __repr__(self):
         return f"MarketplaceTransaction(Item ID: '{self.item_id}', Buyer ID: '{self.buyer_id}', Seller ID: '{self.seller_id}', Amount: '{self.amount}')"
 
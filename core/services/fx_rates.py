@@ -0,0 +1,194 @@
+"""
+Foreign exchange rates for cross-currency transfers and valuations.
+
+Rates live in exchange_rates, one row per currency pair and effective time.
+The latest effective rate of every pair is held in memory as a dense
+currency x currency matrix (RateMatrix), so a lookup is two dict hits and an
+array index. Pairs without a quote in either direction are crossed through
+the best-quoted currency. A refresh builds a whole new matrix and swaps it
+in with one assignment, so readers always see one consistent snapshot.
+
+Rates come from a feed: any object whose fetch() returns
+(base, quote, rate, effective_at) tuples. FileRateFeed reads a local CSV
+and stands in for a market data provider.
+"""
+
+import csv
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_EVEN
+
+import numpy as np
+from sqlalchemy import and_, func, select
+
+from core.models import ExchangeRate
+from utils.extensions import db
+
+# Scale of exchange_rates.rate and of account balances
+RATE_QUANTUM = Decimal('0.0000000001')
+AMOUNT_QUANTUM = Decimal('0.01')
+
+DEFAULT_FEED_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+                                 'extresources', 'fx_rates.csv')
+
+logger = logging.getLogger(__name__)
+
+
+class RateUnavailable(Exception):
+    """No rate is known between two currencies."""
+
+
+def convert_amount(amount, rate):
+    """Convert amount at rate, rounded to cents."""
+    return (Decimal(str(amount)) * rate).quantize(AMOUNT_QUANTUM, rounding=ROUND_HALF_EVEN)
+
+
+class RateMatrix:
+    """Immutable snapshot of the rate between every pair of known currencies."""
+
+    def __init__(self, quotes, effective_at=None):
+        quotes = [(base, quote, float(rate)) for base, quote, rate in quotes if rate and rate > 0]
+        self.currencies = tuple(sorted({code for base, quote, _ in quotes for code in (base, quote)}))
+        self.index = {code: i for i, code in enumerate(self.currencies)}
+        self.effective_at = effective_at
+
+        size = len(self.currencies)
+        matrix = np.full((size, size), np.nan)
+        np.fill_diagonal(matrix, 1.0)
+        # Inverses first so a quote in the other direction always wins
+        for base, quote, rate in quotes:
+            matrix[self.index[quote], self.index[base]] = 1.0 / rate
+        for base, quote, rate in quotes:
+            matrix[self.index[base], self.index[quote]] = rate
+
+        if size:
+            known = ~np.isnan(matrix)
+            pivot = int(known.sum(axis=1).argmax())
+            matrix = np.where(known, matrix, np.outer(matrix[:, pivot], matrix[pivot, :]))
+        matrix.setflags(write=False)
+        self.matrix = matrix
+
+    def rate(self, base, quote):
+        """Return units of quote per unit of base, raising RateUnavailable if unknown."""
+        if base == quote:
+            return Decimal(1)
+        i, j = self.index.get(base), self.index.get(quote)
+        if i is None or j is None or np.isnan(self.matrix[i, j]):
+            raise RateUnavailable(f"No exchange rate from {base} to {quote}")
+        return Decimal(repr(float(self.matrix[i, j]))).quantize(RATE_QUANTUM)
+
+    def rates_to(self, quote):
+        """Return {currency: units of quote per unit} for every currency with a rate."""
+        j = self.index.get(quote)
+        if j is None:
+            return {quote: 1.0}
+        column = self.matrix[:, j]
+        return {code: float(column[i]) for i, code in enumerate(self.currencies) if not np.isnan(column[i])}
+
+
+class FileRateFeed:
+    """Rates from a CSV with base_currency, quote_currency, rate and optional effective_at columns."""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('FX_RATES_FILE', DEFAULT_FEED_PATH)
+
+    def fetch(self):
+        with open(self.path, newline='') as feed:
+            return [
+                (
+                    row['base_currency'].strip().upper(),
+                    row['quote_currency'].strip().upper(),
+                    Decimal(row['rate'].strip()),
+                    datetime.fromisoformat(row['effective_at'].strip()) if row.get('effective_at') else None,
+                )
+                for row in csv.DictReader(feed)
+            ]
+
+
+class FxRates:
+    """The current RateMatrix, reloaded from exchange_rates periodically.
+
+    Must be used inside a Flask app context.
+    """
+
+    def __init__(self, refresh_interval=None):
+        if refresh_interval is None:
+            refresh_interval = float(os.environ.get('FX_REFRESH_SECONDS', 60))
+        self.refresh_interval = refresh_interval
+        self._matrix = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return the current matrix, reloading it if it is older than refresh_interval."""
+        if self._matrix is None or time.monotonic() - self._loaded_at >= self.refresh_interval:
+            with self._lock:
+                if self._matrix is None or time.monotonic() - self._loaded_at >= self.refresh_interval:
+                    self.refresh()
+        return self._matrix
+
+    def rate(self, base, quote):
+        return self.current().rate(base, quote)
+
+    def convert(self, amount, base, quote):
+        """Return (converted amount, rate applied)."""
+        rate = self.rate(base, quote)
+        return convert_amount(amount, rate), rate
+
+    def rates_to(self, quote):
+        return self.current().rates_to(quote)
+
+    def refresh(self, now=None):
+        """Load the latest effective rate of every pair and swap in a new matrix."""
+        now = now or datetime.utcnow()
+        latest = (
+            select(ExchangeRate.base_currency, ExchangeRate.quote_currency,
+                   func.max(ExchangeRate.effective_at).label('effective_at'))
+            .where(ExchangeRate.effective_at <= now)
+            .group_by(ExchangeRate.base_currency, ExchangeRate.quote_currency)
+            .subquery()
+        )
+        rows = db.session.execute(
+            select(ExchangeRate.base_currency, ExchangeRate.quote_currency,
+                   ExchangeRate.rate, ExchangeRate.effective_at)
+            .join(latest, and_(ExchangeRate.base_currency == latest.c.base_currency,
+                               ExchangeRate.quote_currency == latest.c.quote_currency,
+                               ExchangeRate.effective_at == latest.c.effective_at))
+        ).all()
+        effective_at = max((row.effective_at for row in rows), default=None)
+        self._matrix = RateMatrix(((row.base_currency, row.quote_currency, row.rate) for row in rows),
+                                  effective_at=effective_at)
+        self._loaded_at = time.monotonic()
+        return self._matrix
+
+    def import_feed(self, feed=None):
+        """Store the rates of feed not stored yet, refresh, and return how many were new."""
+        fetched_at = datetime.utcnow()
+        rates = [(base, quote, rate, effective_at or fetched_at)
+                 for base, quote, rate, effective_at in (feed or FileRateFeed()).fetch()]
+        if not rates:
+            return 0
+
+        existing = set(db.session.execute(
+            select(ExchangeRate.base_currency, ExchangeRate.quote_currency, ExchangeRate.effective_at)
+            .where(ExchangeRate.effective_at.in_({effective_at for _, _, _, effective_at in rates}))
+        ).tuples())
+        new = {}
+        for base, quote, rate, effective_at in rates:
+            if (base, quote, effective_at) not in existing:
+                new[(base, quote, effective_at)] = ExchangeRate(
+                    base_currency=base, quote_currency=quote,
+                    rate=Decimal(rate).quantize(RATE_QUANTUM), effective_at=effective_at,
+                )
+        db.session.add_all(new.values())
+        db.session.commit()
+        self.refresh()
+        logger.info(f"Imported {len(new)} of {len(rates)} exchange rates")
+        return len(new)
+
+
+# Shared by the transfer paths of one process
+fx_rates = FxRates()
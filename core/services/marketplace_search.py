@@ -0,0 +1,161 @@
+"""
+Keyword search over available marketplace listings.
+
+Listings are served from an in-process InvertedIndex (utils.search_index)
+loaded from marketplace_items on first use. The index is a ranking aid,
+the table stays authoritative:
+
+* Writes made through this process update the index right after they
+  commit (see item_changed).
+* Listings added by other processes, such as the Django app or sibling
+  prefork workers, are picked up by a cheap primary-key range query at
+  most every MARKETPLACE_SEARCH_SYNC_SECONDS.
+* Every page of hits is re-read from the table by primary key with the
+  availability and price filters applied again. Hits sold or withdrawn
+  elsewhere are dropped from the index and the page is filled from the
+  next hits.
+
+Text edited by another process is matched on its old words until the
+process restarts; prices and availability are always current.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import func
+
+from core.models import MarketplaceItem
+from utils.extensions import db
+from utils.search_index import InvertedIndex
+
+AVAILABLE = 'available'
+
+# Rows fetched per round trip while loading the index
+LOAD_BATCH_SIZE = 10000
+
+# Re-reads of a page whose hits turned out to be stale before giving up
+MAX_STALE_RETRIES = 3
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSearch:
+    """Search over the available listings in marketplace_items.
+
+    Must be used inside a Flask app context, like the gRPC servicers.
+    """
+
+    def __init__(self, sync_interval=None):
+        if sync_interval is None:
+            sync_interval = float(os.environ.get('MARKETPLACE_SEARCH_SYNC_SECONDS', 5))
+        self.sync_interval = sync_interval
+        self.index = InvertedIndex()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._high_water = 0  # Highest item_id read from the table
+        self._synced_at = 0.0
+
+    def search(self, query, limit, offset=0, min_price=None, max_price=None):
+        """Return up to limit available items matching every word of query, best first.
+
+        Items are full MarketplaceItem rows read from the table, so their
+        price and status reflect the latest committed state.
+        """
+        self.ensure_current()
+        for _ in range(MAX_STALE_RETRIES):
+            hits = self.index.search(query, limit=limit, offset=offset,
+                                     min_price=min_price, max_price=max_price)
+            if not hits:
+                return []
+
+            ids = [item_id for item_id, _ in hits]
+            query_rows = db.session.query(MarketplaceItem).filter(
+                MarketplaceItem.item_id.in_(ids),
+                MarketplaceItem.status == AVAILABLE
+            )
+            if min_price is not None:
+                query_rows = query_rows.filter(MarketplaceItem.price >= min_price)
+            if max_price is not None:
+                query_rows = query_rows.filter(MarketplaceItem.price <= max_price)
+            rows = {item.item_id: item for item in query_rows}
+
+            stale = [item_id for item_id in ids if item_id not in rows]
+            for item_id in stale:
+                self._refresh(item_id)
+            if not stale:
+                return [rows[item_id] for item_id in ids]
+
+        # Still churning; serve what is current rather than retry forever
+        return [rows[item_id] for item_id in ids if item_id in rows]
+
+    def suggest(self, prefix, limit=10):
+        """Complete the last word of prefix from words in available listings."""
+        self.ensure_current()
+        return self.index.suggest(prefix, limit=limit)
+
+    def item_changed(self, item):
+        """Bring one listing's entry up to date after a committed write."""
+        if not self._loaded:
+            return
+        if item.status == AVAILABLE:
+            self.index.add(item.item_id, item.name, item.description, item.price)
+        else:
+            self.index.remove(item.item_id)
+
+    def item_removed(self, item_id):
+        self.index.remove(item_id)
+
+    def ensure_current(self):
+        """Load the index on first use, then pick up new listings periodically."""
+        if self._loaded and time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            elif time.monotonic() - self._synced_at >= self.sync_interval:
+                self._catch_up()
+
+    def _load(self):
+        start = time.monotonic()
+        high_water = db.session.query(func.max(MarketplaceItem.item_id)).scalar() or 0
+        rows = (
+            db.session.query(MarketplaceItem.item_id, MarketplaceItem.name,
+                             MarketplaceItem.description, MarketplaceItem.price)
+            .filter(MarketplaceItem.status == AVAILABLE,
+                    MarketplaceItem.item_id <= high_water)
+            .order_by(MarketplaceItem.item_id)
+            .yield_per(LOAD_BATCH_SIZE)
+        )
+        self.index.bulk_load(tuple(row) for row in rows)
+        self._high_water = high_water
+        self._synced_at = time.monotonic()
+        self._loaded = True
+        logger.info(f"Indexed {len(self.index)} marketplace listings in {self._synced_at - start:.1f}s")
+
+    def _catch_up(self):
+        rows = (
+            db.session.query(MarketplaceItem.item_id, MarketplaceItem.name,
+                             MarketplaceItem.description, MarketplaceItem.price,
+                             MarketplaceItem.status)
+            .filter(MarketplaceItem.item_id > self._high_water)
+            .order_by(MarketplaceItem.item_id)
+            .all()
+        )
+        for row in rows:
+            if row.status == AVAILABLE:
+                self.index.add(row.item_id, row.name, row.description, row.price)
+            self._high_water = row.item_id
+        self._synced_at = time.monotonic()
+
+    def _refresh(self, item_id):
+        item = db.session.get(MarketplaceItem, item_id, populate_existing=True)
+        if item is None:
+            self.index.remove(item_id)
+        else:
+            self.item_changed(item)
+
+
+# Shared by the servicers of one process
+catalog_search = CatalogSearch()
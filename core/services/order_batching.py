@@ -0,0 +1,238 @@
+"""
+Batched execution of stock and crypto orders.
+
+Settling each order on its own costs a price lookup, a handful of queries
+and a commit per order, which does not hold up during market spikes.
+OrderBatcher groups the orders arriving within ORDER_BATCH_WINDOW_MS:
+
+* The first order of a window leads. It waits for the window to close, or
+  for ORDER_BATCH_MAX orders, then settles the whole batch while the other
+  requests wait for their own result.
+* Every symbol in the batch is priced once, through one quote batch. A
+  symbol without a price fails only the orders for it.
+* Cash accounts and holdings of all buyers and sellers are loaded and
+  row-locked with one query each, in primary key order so concurrent
+  batches cannot deadlock.
+* Orders are applied in arrival order against the loaded rows, so an order
+  sees the effect of the ones before it, and a rejected order changes
+  nothing. One commit settles the batch.
+
+Batching is per process; the database row locks keep batches of different
+processes consistent.
+"""
+
+import logging
+import os
+import threading
+from decimal import Decimal
+
+from sqlalchemy import tuple_
+
+from core.models import Account, CryptoAsset, StockAsset, Transaction
+from core.services import fx_rates as fx_service
+from core.services import quote_service
+from core.services.fx_rates import AMOUNT_QUANTUM, RateUnavailable
+from utils.extensions import db
+
+BUY, SELL = 'buy', 'sell'
+
+# Quote providers price crypto and stocks in this currency
+QUOTE_CURRENCY = 'USD'
+
+# How long a request waits for its batch to settle
+ORDER_TIMEOUT_SECONDS = 10.0
+
+logger = logging.getLogger(__name__)
+
+
+def parse_id(value):
+    """A user or account id from a JSON body as an int, or None if it is not a positive integer."""
+    if isinstance(value, str) and value.isdecimal():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+        return None
+    return value
+
+
+class Order:
+    """One buy or sell order and, once settled, its result."""
+
+    def __init__(self, user_id, symbol, quantity, side, account_id=None):
+        self.user_id = user_id
+        self.symbol = symbol
+        self.quantity = quantity
+        self.side = side
+        self.account_id = account_id
+        self.result = None
+        self.done = threading.Event()
+
+    def settle(self, success, message, status=None, **details):
+        self.result = dict(success=success, message=message,
+                           status=status or (200 if success else 400), **details)
+        self.done.set()
+
+
+class AssetBook:
+    """Where holdings of one asset class are kept."""
+
+    def __init__(self, kind, model, quantity_field, name_for):
+        self.kind = kind
+        self.model = model
+        self.quantity_field = quantity_field
+        self.name_for = name_for
+
+
+STOCKS = AssetBook('stock', StockAsset, 'shares', lambda symbol: symbol)
+CRYPTO = AssetBook('crypto', CryptoAsset, 'balance', lambda symbol: symbol.capitalize())
+
+
+class OrderBatcher:
+    """Collects orders for one asset class and settles them in batches."""
+
+    def __init__(self, book, quotes, window=None, max_batch=None):
+        if window is None:
+            window = float(os.environ.get('ORDER_BATCH_WINDOW_MS', 20)) / 1000
+        if max_batch is None:
+            max_batch = int(os.environ.get('ORDER_BATCH_MAX', 500))
+        self.book = book
+        self.quotes = quotes
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending = []
+        self._full = None  # Set when the collecting batch reaches max_batch
+
+    def submit(self, order):
+        """Queue order, wait for its batch to settle, and return its result dict.
+
+        Must be called inside a Flask app context; the leading request
+        settles the batch in its own.
+        """
+        with self._lock:
+            self._pending.append(order)
+            lead = self._full is None
+            if lead:
+                self._full = full = threading.Event()
+            elif len(self._pending) >= self.max_batch:
+                self._full.set()
+
+        if lead:
+            full.wait(self.window)
+            with self._lock:
+                batch, self._pending, self._full = self._pending, [], None
+            self.execute(batch)
+
+        if not order.done.wait(ORDER_TIMEOUT_SECONDS):
+            return dict(success=False, message="Order timed out", status=504)
+        return order.result
+
+    def execute(self, batch):
+        """Settle batch in one database transaction, settling every order."""
+        try:
+            self._execute(batch)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error settling {self.book.kind} order batch: {e}")
+            for order in batch:
+                if not order.done.is_set():
+                    order.settle(False, "Order could not be processed", status=500)
+
+    def _execute(self, batch):
+        prices = self.quotes.get_many({order.symbol for order in batch}, partial=True)
+        orders = []
+        for order in batch:
+            if order.symbol in prices:
+                orders.append(order)
+            else:
+                order.settle(False, "Price unavailable, try again later", status=503)
+        if not orders:
+            return
+
+        user_ids = {order.user_id for order in orders}
+        accounts = (
+            db.session.query(Account)
+            .filter(Account.user_id.in_(user_ids))
+            .order_by(Account.account_id)
+            .with_for_update()
+            .all()
+        )
+        by_id = {account.account_id: account for account in accounts}
+        # Orders without an account pay from the user's first account in the quote currency
+        default_accounts = {}
+        for account in accounts:
+            if account.currency_code == QUOTE_CURRENCY:
+                default_accounts.setdefault(account.user_id, account)
+
+        model = self.book.model
+        holdings = {
+            (holding.user_id, holding.symbol): holding
+            for holding in db.session.query(model)
+            .filter(tuple_(model.user_id, model.symbol).in_({(order.user_id, order.symbol) for order in orders}))
+            .order_by(model.asset_id)
+            .with_for_update()
+        }
+
+        settled = []
+        new_transactions = []
+        for order in orders:
+            if order.account_id is not None:
+                account = by_id.get(order.account_id)
+            else:
+                account = default_accounts.get(order.user_id)
+            if account is None or account.user_id != order.user_id:
+                order.settle(False, "Account not found")
+                continue
+
+            price = prices[order.symbol]
+            total = (price * Decimal(str(order.quantity))).quantize(AMOUNT_QUANTUM)
+            if account.currency_code != QUOTE_CURRENCY:
+                try:
+                    total, _ = fx_service.fx_rates.convert(total, QUOTE_CURRENCY, account.currency_code)
+                except RateUnavailable as e:
+                    order.settle(False, str(e))
+                    continue
+
+            balance = account.balance or Decimal('0')
+            holding = holdings.get((order.user_id, order.symbol))
+            held = getattr(holding, self.book.quantity_field) if holding is not None else 0
+
+            if order.side == BUY:
+                if balance < total:
+                    order.settle(False, "Insufficient balance")
+                    continue
+                account.balance = balance - total
+                if holding is None:
+                    holding = model(user_id=order.user_id, symbol=order.symbol,
+                                    name=self.book.name_for(order.symbol), **{self.book.quantity_field: 0})
+                    holdings[(order.user_id, order.symbol)] = holding
+                    db.session.add(holding)
+                setattr(holding, self.book.quantity_field, held + order.quantity)
+                amount = -total
+            else:
+                if holding is None or held < order.quantity:
+                    order.settle(False, f"Insufficient {self.book.kind} balance")
+                    continue
+                setattr(holding, self.book.quantity_field, held - order.quantity)
+                if held == order.quantity:
+                    db.session.delete(holding)
+                    del holdings[(order.user_id, order.symbol)]
+                account.balance = balance + total
+                amount = total
+
+            new_transactions.append(Transaction(
+                account_id=account.account_id,
+                description=f"{order.side.capitalize()} {order.quantity} {order.symbol} @ {price}",
+                amount=float(amount),
+                type='withdraw' if order.side == BUY else 'deposit',
+            ))
+            settled.append((order, dict(price=str(price), total=str(total), currency_code=account.currency_code)))
+
+        db.session.add_all(new_transactions)
+        db.session.commit()
+        for order, details in settled:
+            order.settle(True, "Order executed", **details)
+
+
+# Shared by the order routes of one process
+stock_orders = OrderBatcher(STOCKS, quote_service.stock_quotes)
+crypto_orders = OrderBatcher(CRYPTO, quote_service.crypto_quotes)
@@ -0,0 +1,234 @@
+"""
+Valuation of users' full positions across cash, crypto and stock holdings.
+
+Holdings of any number of users are read with one streamed query per asset
+class into flat NumPy columns: owner, asset class, instrument, quantity.
+Every instrument (a cash currency, a crypto id or a stock symbol) gets one
+slot in a price vector holding the value of one unit in the base currency.
+Valuing is then a single gather plus np.bincount, for one user on the
+dashboard or every user in the nightly job.
+
+Values are float64. That is fine for summaries and reports; the ledger
+amounts themselves stay Decimal in their tables.
+"""
+
+import logging
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import insert, select
+
+from core.models import Account, CryptoAsset, PortfolioValuation, StockAsset, User
+from core.services import fx_rates as fx_service
+from core.services import quote_service
+from utils.extensions import db
+
+BASE_CURRENCY = 'USD'
+
+# Quote providers price crypto and stocks in this currency
+QUOTE_CURRENCY = 'USD'
+
+CASH, CRYPTO, STOCKS = 0, 1, 2
+ASSET_CLASSES = ('cash', 'crypto', 'stocks')
+
+# Users per IN list when valuing a given set of users
+USER_BATCH_SIZE = 1000
+
+# Rows fetched per round trip while loading holdings or writing valuations
+LOAD_BATCH_SIZE = 10000
+
+logger = logging.getLogger(__name__)
+
+
+class Holdings:
+    """Holdings of many users as flat columns, one row per holding."""
+
+    def __init__(self, owners, asset_classes, keys, quantities, user_ids=None):
+        owners = np.asarray(owners, dtype=np.int64)
+        self.user_ids, self.user_index = np.unique(
+            np.concatenate([owners, np.asarray(user_ids or [], dtype=np.int64)]),
+            return_inverse=True,
+        )
+        self.user_index = self.user_index[:len(owners)]
+        self.asset_class = np.asarray(asset_classes, dtype=np.int8)
+        self.quantity = np.asarray(quantities, dtype=np.float64)
+
+        # Instruments are numbered class by class, keys sorted within a class
+        keys = np.asarray(keys, dtype=str)
+        self.instrument_index = np.empty(len(keys), dtype=np.int64)
+        self.instruments = []  # Per class, the sorted keys held
+        offset = 0
+        for asset_class in range(len(ASSET_CLASSES)):
+            rows = self.asset_class == asset_class
+            class_keys, inverse = np.unique(keys[rows], return_inverse=True)
+            self.instrument_index[rows] = inverse + offset
+            self.instruments.append(class_keys)
+            offset += len(class_keys)
+        self.instrument_count = offset
+
+    def __len__(self):
+        return len(self.quantity)
+
+
+def load_holdings(user_ids=None):
+    """Load the non-zero holdings of user_ids, or of every user if None.
+
+    Users without holdings are still listed, so they value at zero.
+    """
+    sources = (
+        (CASH, Account.user_id, Account.currency_code, Account.balance),
+        (CRYPTO, CryptoAsset.user_id, CryptoAsset.symbol, CryptoAsset.balance),
+        (STOCKS, StockAsset.user_id, StockAsset.symbol, StockAsset.shares),
+    )
+    if user_ids is not None:
+        listed = list(dict.fromkeys(user_ids))
+        chunks = [listed[i:i + USER_BATCH_SIZE] for i in range(0, len(listed), USER_BATCH_SIZE)]
+    else:
+        listed = db.session.execute(select(User.user_id)).scalars().all()
+        chunks = [None]
+
+    owners, asset_classes, keys, quantities = [], [], [], []
+    for asset_class, owner_column, key_column, quantity_column in sources:
+        for chunk in chunks:
+            statement = select(owner_column, key_column, quantity_column).where(
+                quantity_column.isnot(None), quantity_column != 0
+            )
+            if chunk is not None:
+                statement = statement.where(owner_column.in_(chunk))
+            result = db.session.execute(statement.execution_options(yield_per=LOAD_BATCH_SIZE))
+            for partition in result.partitions():
+                partition_owners, partition_keys, partition_quantities = zip(*partition)
+                owners.extend(partition_owners)
+                keys.extend(partition_keys)
+                quantities.extend(partition_quantities)
+                asset_classes.extend([asset_class] * len(partition))
+
+    return Holdings(owners, asset_classes, keys, quantities, user_ids=listed)
+
+
+def price_vector(holdings, fx_rates=None, base_currency=BASE_CURRENCY,
+                 stock_quotes=None, crypto_quotes=None):
+    """Return the base-currency value of one unit of every instrument held.
+
+    fx_rates maps currency codes to the value of one unit in base_currency,
+    by default the current exchange rates. Instruments without a price or
+    rate are NaN.
+    """
+    if fx_rates is None:
+        fx_rates = fx_service.fx_rates.rates_to(base_currency)
+    fx_rates = dict(fx_rates)
+    fx_rates[base_currency] = 1.0
+    stock_quotes = stock_quotes or quote_service.stock_quotes
+    crypto_quotes = crypto_quotes or quote_service.crypto_quotes
+
+    def rate(currency):
+        return float(fx_rates.get(currency, np.nan))
+
+    cash, crypto, stocks = holdings.instruments
+    quote_rate = rate(QUOTE_CURRENCY)
+    crypto_prices = crypto_quotes.get_many(crypto.tolist(), partial=True) if len(crypto) else {}
+    stock_prices = stock_quotes.get_many(stocks.tolist(), partial=True) if len(stocks) else {}
+
+    return np.concatenate([
+        np.array([rate(code) for code in cash], dtype=np.float64),
+        np.array([float(crypto_prices.get(key, np.nan)) for key in crypto], dtype=np.float64) * quote_rate,
+        np.array([float(stock_prices.get(key, np.nan)) for key in stocks], dtype=np.float64) * quote_rate,
+    ])
+
+
+class Valuation:
+    """Per-user and per-currency totals of one valuation pass."""
+
+    def __init__(self, holdings, prices, base_currency=BASE_CURRENCY):
+        self.base_currency = base_currency
+        self.user_ids = holdings.user_ids
+        users = len(self.user_ids)
+
+        values = holdings.quantity * prices[holdings.instrument_index]
+        priced = ~np.isnan(values)
+        values = np.where(priced, values, 0.0)
+
+        by_class = np.bincount(
+            holdings.user_index * len(ASSET_CLASSES) + holdings.asset_class,
+            weights=values, minlength=users * len(ASSET_CLASSES),
+        ).reshape(users, len(ASSET_CLASSES))
+        self.cash, self.crypto, self.stocks = by_class.T
+        self.total = by_class.sum(axis=1)
+        self.unpriced = np.bincount(holdings.user_index[~priced], minlength=users)
+
+        # Cash per currency, in the currency itself and in the base currency
+        currencies = holdings.instruments[CASH]
+        cash_rows = holdings.asset_class == CASH
+        native = np.bincount(holdings.instrument_index[cash_rows],
+                             weights=holdings.quantity[cash_rows], minlength=len(currencies))
+        converted = np.bincount(holdings.instrument_index[cash_rows],
+                                weights=values[cash_rows], minlength=len(currencies))
+        self.currency_totals = {
+            code: (float(native[i]), float(converted[i]) if not np.isnan(prices[i]) else None)
+            for i, code in enumerate(currencies.tolist())
+        }
+
+        missing = np.flatnonzero(np.isnan(prices))
+        labels = [f"{ASSET_CLASSES[asset_class]}:{key}"
+                  for asset_class, keys in enumerate(holdings.instruments) for key in keys.tolist()]
+        self.missing = [labels[i] for i in missing]
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def for_user(self, user_id):
+        """Return the totals of one user as a dict, or None if not valued."""
+        i = np.searchsorted(self.user_ids, user_id)
+        if i == len(self.user_ids) or self.user_ids[i] != user_id:
+            return None
+        return {
+            'user_id': int(user_id),
+            'base_currency': self.base_currency,
+            'cash': round(float(self.cash[i]), 2),
+            'crypto': round(float(self.crypto[i]), 2),
+            'stocks': round(float(self.stocks[i]), 2),
+            'total': round(float(self.total[i]), 2),
+            'unpriced_holdings': int(self.unpriced[i]),
+        }
+
+
+def value_portfolios(user_ids=None, fx_rates=None, base_currency=BASE_CURRENCY,
+                     stock_quotes=None, crypto_quotes=None):
+    """Value the positions of user_ids, or of every user if None."""
+    holdings = load_holdings(user_ids)
+    prices = price_vector(holdings, fx_rates=fx_rates, base_currency=base_currency,
+                          stock_quotes=stock_quotes, crypto_quotes=crypto_quotes)
+    valuation = Valuation(holdings, prices, base_currency=base_currency)
+    if valuation.missing:
+        logger.warning(f"No price for {len(valuation.missing)} instruments: {', '.join(valuation.missing[:20])}")
+    return valuation
+
+
+def portfolio_summary(user_id, **kwargs):
+    """Return the dashboard totals of one user."""
+    return value_portfolios([user_id], **kwargs).for_user(user_id)
+
+
+def save_valuations(valuation, valued_at=None):
+    """Insert one portfolio_valuations row per valued user and commit."""
+    valued_at = valued_at or datetime.utcnow()
+    rows = [
+        {
+            'user_id': int(user_id),
+            'valued_at': valued_at,
+            'base_currency': valuation.base_currency,
+            'cash': round(float(cash), 2),
+            'crypto': round(float(crypto), 2),
+            'stocks': round(float(stocks), 2),
+            'total': round(float(total), 2),
+            'unpriced_holdings': int(unpriced),
+        }
+        for user_id, cash, crypto, stocks, total, unpriced in zip(
+            valuation.user_ids, valuation.cash, valuation.crypto,
+            valuation.stocks, valuation.total, valuation.unpriced,
+        )
+    ]
+    for start in range(0, len(rows), LOAD_BATCH_SIZE):
+        db.session.execute(insert(PortfolioValuation), rows[start:start + LOAD_BATCH_SIZE])
+    db.session.commit()
+    return len(rows)
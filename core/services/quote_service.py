@@ -0,0 +1,209 @@
+"""
+Cached market quotes for the stock and crypto order routes.
+
+Orders used to call the price APIs inline, so every order waited on a
+third-party round trip and load on the order routes turned straight into
+load on the provider. QuoteCache sits in between:
+
+* Quotes are kept per symbol for QUOTE_TTL_SECONDS and served from memory.
+* For a further QUOTE_STALE_SECONDS an expired quote is still served while
+  one background fetch replaces it (stale-while-revalidate).
+* Concurrent misses for a symbol share one upstream fetch (single-flight),
+  and the misses of one get_many call go upstream as a single batch.
+* Providers are plain objects with fetch(symbols) -> {symbol: Decimal}, so
+  tests and local runs can swap in a fake. A symbol a provider has no
+  price for is left out of the result, so it cannot fail the others.
+
+Callers get QuoteUnavailable when no usable quote exists, never a stale
+quote past the stale window.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from decimal import Decimal
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Upstream request timeout; an order never waits longer than this for a price
+PROVIDER_TIMEOUT_SECONDS = 2.0
+
+# Per-symbol stock requests in flight at once; requests' default pool size per host
+STOCK_FETCH_CONCURRENCY = 10
+
+
+class QuoteUnavailable(Exception):
+    """No quote could be served for a symbol."""
+
+
+class StockQuoteProvider:
+    """Stock prices from the per-symbol price endpoint."""
+
+    def __init__(self, base_url="https://api.example.com/stock", timeout=PROVIDER_TIMEOUT_SECONDS):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._executor = ThreadPoolExecutor(max_workers=STOCK_FETCH_CONCURRENCY,
+                                            thread_name_prefix="stock-quotes")
+
+    def fetch(self, symbols):
+        # The endpoint takes one symbol per request. The requests run in
+        # parallel and the batch gets one timeout in total; a symbol that
+        # fails or is not answered in time is left out, like unknown ids
+        # are by CryptoQuoteProvider
+        futures = {self._executor.submit(self._fetch_one, symbol): symbol for symbol in symbols}
+        done, not_done = wait(futures, timeout=self.timeout)
+        prices = {}
+        for future, symbol in futures.items():
+            if future in not_done:
+                future.cancel()
+                logger.error(f"Stock quote fetch timed out for {symbol}")
+                continue
+            try:
+                prices[symbol] = future.result()
+            except Exception as e:
+                logger.error(f"Stock quote fetch failed for {symbol}: {e}")
+        return prices
+
+    def _fetch_one(self, symbol):
+        response = self.session.get(f"{self.base_url}/{symbol}/price", timeout=self.timeout)
+        response.raise_for_status()
+        return Decimal(str(response.json()["price"]))
+
+
+class CryptoQuoteProvider:
+    """USD crypto prices from CoinGecko, many ids per request."""
+
+    def __init__(self, base_url="https://api.coingecko.com/api/v3/simple/price",
+                 timeout=PROVIDER_TIMEOUT_SECONDS):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def fetch(self, symbols):
+        response = self.session.get(
+            self.base_url,
+            params={"ids": ",".join(symbols), "vs_currencies": "usd"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        data = response.json()
+        return {symbol: Decimal(str(data[symbol]["usd"])) for symbol in symbols if symbol in data}
+
+
+class _Flight:
+    """One upstream fetch that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class QuoteCache:
+    """Per-symbol TTL cache with single-flight, batched upstream fetches."""
+
+    def __init__(self, provider, ttl=None, stale_ttl=None, wait_timeout=None, clock=time.monotonic):
+        if ttl is None:
+            ttl = float(os.environ.get("QUOTE_TTL_SECONDS", 5))
+        if stale_ttl is None:
+            stale_ttl = float(os.environ.get("QUOTE_STALE_SECONDS", 25))
+        if wait_timeout is None:
+            wait_timeout = PROVIDER_TIMEOUT_SECONDS * 2
+        self.provider = provider
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.wait_timeout = wait_timeout
+        self.clock = clock
+        self._quotes = {}  # symbol -> (price, fetched_at)
+        self._flights = {}  # symbol -> _Flight
+        self._lock = threading.Lock()
+
+    def get(self, symbol):
+        """Return the price of one symbol, raising QuoteUnavailable if there is none."""
+        return self.get_many([symbol])[symbol]
+
+    def get_many(self, symbols, partial=False):
+        """Return {symbol: price} for every symbol, in one upstream batch for the misses.
+
+        With partial=True symbols without a usable quote are left out
+        instead of raising QuoteUnavailable.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        prices = {}
+        to_fetch = []  # Misses this call fetches itself
+        to_wait = {}  # Misses and the fetch that answers them
+        to_refresh = []  # Stale hits to refresh in the background
+
+        now = self.clock()
+        with self._lock:
+            for symbol in symbols:
+                cached = self._quotes.get(symbol)
+                age = now - cached[1] if cached else None
+                if cached and age < self.ttl:
+                    prices[symbol] = cached[0]
+                elif cached and age < self.ttl + self.stale_ttl:
+                    prices[symbol] = cached[0]
+                    if symbol not in self._flights:
+                        self._flights[symbol] = _Flight()
+                        to_refresh.append(symbol)
+                elif symbol in self._flights:
+                    to_wait[symbol] = self._flights[symbol]
+                else:
+                    to_wait[symbol] = self._flights[symbol] = _Flight()
+                    to_fetch.append(symbol)
+
+        if to_refresh:
+            threading.Thread(target=self._fetch, args=(to_refresh,), daemon=True).start()
+        if to_fetch:
+            self._fetch(to_fetch)
+
+        for symbol, flight in to_wait.items():
+            try:
+                if not flight.done.wait(self.wait_timeout):
+                    raise QuoteUnavailable(f"Timed out waiting for a {symbol} quote")
+                prices[symbol] = self._usable(symbol, flight.error)
+            except QuoteUnavailable:
+                if not partial:
+                    raise
+        return prices
+
+    def invalidate(self, symbol=None):
+        """Drop one cached quote, or all of them."""
+        with self._lock:
+            if symbol is None:
+                self._quotes.clear()
+            else:
+                self._quotes.pop(symbol, None)
+
+    def _fetch(self, symbols):
+        error = None
+        try:
+            fetched = self.provider.fetch(symbols)
+        except Exception as e:
+            logger.error(f"Quote fetch failed for {', '.join(symbols)}: {e}")
+            fetched, error = {}, e
+
+        fetched_at = self.clock()
+        with self._lock:
+            for symbol in symbols:
+                if symbol in fetched:
+                    self._quotes[symbol] = (fetched[symbol], fetched_at)
+                flight = self._flights.pop(symbol)
+                flight.error = error
+                flight.done.set()
+
+    def _usable(self, symbol, error=None):
+        with self._lock:
+            cached = self._quotes.get(symbol)
+        if cached is None or self.clock() - cached[1] >= self.ttl + self.stale_ttl:
+            raise QuoteUnavailable(f"No quote available for {symbol}") from error
+        return cached[0]
+
+
+# Shared by the order routes of one process
+stock_quotes = QuoteCache(StockQuoteProvider())
+crypto_quotes = QuoteCache(CryptoQuoteProvider())
@@ -0,0 +1,41 @@
+"""
+Migration script to add the account_monthly_rollups table behind account
+statements
+"""
+import logging
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+def upgrade():
+    """
+    Create account_monthly_rollups, one row per account and calendar month
+    """
+    try:
+        op.create_table(
+            'account_monthly_rollups',
+            sa.Column('rollup_id', sa.Integer, primary_key=True),
+            sa.Column('account_id', sa.Integer,
+                      sa.ForeignKey('accounts.account_id', ondelete='CASCADE'), nullable=False),
+            sa.Column('month', sa.Date, nullable=False),
+            sa.Column('credits', sa.Numeric(20, 2), nullable=False, server_default='0'),
+            sa.Column('debits', sa.Numeric(20, 2), nullable=False, server_default='0'),
+            sa.Column('transaction_count', sa.Integer, nullable=False, server_default='0'),
+            sa.UniqueConstraint('account_id', 'month', name='uq_account_monthly_rollups_account_month'),
+        )
+        logger.info("Successfully created account_monthly_rollups table")
+    except Exception as e:
+        logger.error(f"Error creating account_monthly_rollups table: {e}")
+        raise
+
+def downgrade():
+    """
+    Drop the account_monthly_rollups table
+    """
+    try:
+        op.drop_table('account_monthly_rollups')
+        logger.info("Successfully dropped account_monthly_rollups table")
+    except Exception as e:
+        logger.error(f"Error dropping account_monthly_rollups table: {e}")
+        raise
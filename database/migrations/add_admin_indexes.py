@@ -0,0 +1,35 @@
+"""
+Migration script to index the columns the Django admin and account
+statements sort and filter large tables by
+"""
+import logging
+from alembic import op
+
+logger = logging.getLogger(__name__)
+
+def upgrade():
+    """
+    Index transactions by account and posting date, and marketplace
+    transactions by timestamp
+    """
+    try:
+        op.create_index('ix_transactions_account_date', 'transactions', ['account_id', 'date_posted'])
+        op.create_index('ix_transactions_date_posted', 'transactions', ['date_posted'])
+        op.create_index('ix_mkt_transactions_timestamp', 'marketplace_transactions', ['timestamp'])
+        logger.info("Successfully created transaction date indexes")
+    except Exception as e:
+        logger.error(f"Error creating transaction date indexes: {e}")
+        raise
+
+def downgrade():
+    """
+    Drop the transaction date indexes
+    """
+    try:
+        op.drop_index('ix_mkt_transactions_timestamp', table_name='marketplace_transactions')
+        op.drop_index('ix_transactions_date_posted', table_name='transactions')
+        op.drop_index('ix_transactions_account_date', table_name='transactions')
+        logger.info("Successfully removed transaction date indexes")
+    except Exception as e:
+        logger.error(f"Error removing transaction date indexes: {e}")
+        raise
@@ -0,0 +1,43 @@
+"""
+Migration script to add the exchange_rates table and record the rate
+applied on cross-currency transfers
+"""
+import logging
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+def upgrade():
+    """
+    Create exchange_rates and add exchange_rate to the transactions table
+    """
+    try:
+        op.create_table(
+            'exchange_rates',
+            sa.Column('rate_id', sa.Integer, primary_key=True),
+            sa.Column('base_currency', sa.String(3), nullable=False),
+            sa.Column('quote_currency', sa.String(3), nullable=False),
+            sa.Column('rate', sa.Numeric(20, 10), nullable=False),
+            sa.Column('effective_at', sa.DateTime, nullable=False),
+            sa.UniqueConstraint('base_currency', 'quote_currency', 'effective_at',
+                                name='uq_exchange_rates_pair_effective'),
+        )
+        op.add_column('transactions',
+                      sa.Column('exchange_rate', sa.Numeric(20, 10), nullable=True))
+        logger.info("Successfully created exchange_rates table and transactions.exchange_rate column")
+    except Exception as e:
+        logger.error(f"Error adding exchange rates: {e}")
+        raise
+
+def downgrade():
+    """
+    Drop exchange_rates and transactions.exchange_rate
+    """
+    try:
+        op.drop_column('transactions', 'exchange_rate')
+        op.drop_table('exchange_rates')
+        logger.info("Successfully removed exchange rates")
+    except Exception as e:
+        logger.error(f"Error removing exchange rates: {e}")
+        raise
@@ -0,0 +1,43 @@
+"""
+Migration script to add the portfolio_valuations table
+"""
+import logging
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+def upgrade():
+    """
+    Create portfolio_valuations, written by the nightly valuation job
+    """
+    try:
+        op.create_table(
+            'portfolio_valuations',
+            sa.Column('valuation_id', sa.Integer, primary_key=True),
+            sa.Column('user_id', sa.Integer, sa.ForeignKey('user.user_id'), nullable=False),
+            sa.Column('valued_at', sa.DateTime, nullable=False),
+            sa.Column('base_currency', sa.String(3), nullable=False),
+            sa.Column('cash', sa.Numeric(20, 2), nullable=False),
+            sa.Column('crypto', sa.Numeric(20, 2), nullable=False),
+            sa.Column('stocks', sa.Numeric(20, 2), nullable=False),
+            sa.Column('total', sa.Numeric(20, 2), nullable=False),
+            sa.Column('unpriced_holdings', sa.Integer, nullable=False, server_default='0'),
+        )
+        op.create_index('ix_portfolio_valuations_user_id', 'portfolio_valuations', ['user_id'])
+        op.create_index('ix_portfolio_valuations_valued_at', 'portfolio_valuations', ['valued_at'])
+        logger.info("Successfully created portfolio_valuations table")
+    except Exception as e:
+        logger.error(f"Error creating portfolio_valuations table: {e}")
+        raise
+
+def downgrade():
+    """
+    Drop the portfolio_valuations table
+    """
+    try:
+        op.drop_table('portfolio_valuations')
+        logger.info("Successfully dropped portfolio_valuations table")
+    except Exception as e:
+        logger.error(f"Error dropping portfolio_valuations table: {e}")
+        raise
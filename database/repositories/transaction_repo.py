@@ -3,7 +3,10 @@ import logging
 from datetime import datetime
 from utils.extensions import db
 from core.models import Account, Transaction, User
+from core.services.fx_rates import RateUnavailable, fx_rates
+from sqlalchemy import and_, or_
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import load_only
 
 logger = logging.getLogger(__name__)
 
@@ -116,6 +119,10 @@ def process_withdrawal(account_id, amount, description="Withdrawal"):
 def process_transfer(from_account_id, to_account_id, amount, description="Transfer"):
     """
     Process a transfer transaction between accounts
+
+    Transfers between accounts in different currencies credit the converted
+    amount at the current exchange rate, which is recorded on both
+    transactions.
     
     Args:
         from_account_id: The ID of the source account
@@ -150,16 +157,20 @@ def process_transfer(from_account_id, to_account_id, amount, description="Transf
         if from_account.balance is None or from_account.balance < Decimal(str(amount)):
             return False, "Insufficient funds", None
         
-        # Check currency compatibility - only allow transfers between same currency
+        # Convert into the destination currency if the accounts differ
+        credited, rate = Decimal(str(amount)), None
         if from_account.currency_code != to_account.currency_code:
-            return False, "Currency mismatch between accounts", None
+            try:
+                credited, rate = fx_rates.convert(amount, from_account.currency_code, to_account.currency_code)
+            except RateUnavailable as e:
+                return False, str(e), None
             
         # Update account balances
         from_account.balance -= Decimal(str(amount))
         
         if to_account.balance is None:
             to_account.balance = Decimal('0')
-        to_account.balance += Decimal(str(amount))
+        to_account.balance += credited
         
         # Create transaction records with proper initialization
         source_transaction = Transaction(
@@ -167,14 +178,16 @@ def process_transfer(from_account_id, to_account_id, amount, description="Transf
             description=f"{description} to {to_account_id}",
             amount=float(amount) * -1,  # Negative amount for sender
             type='transfer',
-            recipient_account_id=to_account_id
+            recipient_account_id=to_account_id,
+            exchange_rate=rate
         )
         
         destination_transaction = Transaction(
             account_id=to_account_id,
             description=f"{description} from {from_account_id}",
-            amount=float(amount),  # Positive amount for receiver
-            type='transfer'
+            amount=float(credited),  # Positive amount for receiver, in their currency
+            type='transfer',
+            exchange_rate=rate
         )
         
         # Save changes
@@ -192,7 +205,7 @@ def process_transfer(from_account_id, to_account_id, amount, description="Transf
         logger.error(f"Error processing transfer: {str(e)}")
         return False, f"Error: {str(e)}", None
 
-def get_transaction_history(user_id, account_id=None, start_date=None, end_date=None, transaction_type=None, limit=100, offset=0):
+def get_transaction_history(user_id, account_id=None, start_date=None, end_date=None, transaction_type=None, limit=100, offset=0, columns=None):
     """
     Get transaction history for a user or specific account
     
@@ -204,6 +217,7 @@ def get_transaction_history(user_id, account_id=None, start_date=None, end_date=
         transaction_type: Optional transaction type to filter by
         limit: Maximum number of transactions to return
         offset: Offset for pagination
+        columns: Optional Transaction columns to load, the rest are deferred
         
     Returns:
         List of transactions
@@ -219,6 +233,8 @@ def get_transaction_history(user_id, account_id=None, start_date=None, end_date=
         
         # Start with basic query using SQLAlchemy's session query
         query = db.session.query(Transaction).filter(Transaction.account_id.in_(account_ids))
+        if columns:
+            query = query.options(load_only(*columns))
         
         # Apply filters if provided
         if account_id:
@@ -252,3 +268,156 @@ def get_transaction_history(user_id, account_id=None, start_date=None, end_date=
         logger.error(f"Error getting transaction history: {str(e)}")
         return []
 
+def encode_cursor(date_posted, transaction_id):
+    """
+    Encode the position of a transaction as an opaque keyset cursor
+
+    Args:
+        date_posted: The date_posted of the last transaction returned
+        transaction_id: The ID of the last transaction returned
+
+    Returns:
+        Cursor string that can be passed back as ``before``
+    """
+    return f"{date_posted.isoformat()}|{transaction_id}"
+
+def decode_cursor(cursor):
+    """
+    Decode a keyset cursor produced by encode_cursor
+
+    Args:
+        cursor: Cursor string
+
+    Returns:
+        Tuple of (date_posted, transaction_id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    date_part, _, id_part = cursor.rpartition("|")
+    if not date_part:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return datetime.fromisoformat(date_part), int(id_part)
+
+def apply_keyset(query, before=None):
+    """
+    Order a transaction query newest first and skip everything up to a cursor
+
+    Uses (date_posted, transaction_id) as the sort key so that pages stay
+    stable while new transactions are inserted, and so the database can walk
+    an index instead of counting past OFFSET rows.
+
+    Args:
+        query: Query selecting from the transactions table
+        before: Optional cursor from encode_cursor; only older rows are returned
+
+    Returns:
+        The ordered (and filtered) query
+    """
+    if before:
+        before_date, before_id = decode_cursor(before)
+        query = query.filter(or_(
+            Transaction.date_posted < before_date,
+            and_(Transaction.date_posted == before_date, Transaction.transaction_id < before_id)
+        ))
+    return query.order_by(Transaction.date_posted.desc(), Transaction.transaction_id.desc())
+
+def apply_transaction_batch(items):
+    """
+    Apply a batch of deposits, withdrawals and transfers without committing
+
+    Every account the batch touches is loaded, and row-locked, with one
+    query in account ID order so concurrent batches cannot deadlock. Items
+    are then validated and applied in order against the loaded balances, so
+    an item sees the effect of the ones before it. A rejected item changes
+    nothing. The caller commits, which sets the commit granularity.
+
+    Args:
+        items: Dicts with user_id, account_id, type ('deposit', 'withdraw'
+            or 'transfer'), amount (Decimal), description and, for
+            transfers, to_account_id
+
+    Returns:
+        List of (success status, message, transaction or None), one per item
+    """
+    account_ids = set()
+    for item in items:
+        account_ids.add(item['account_id'])
+        if item.get('to_account_id'):
+            account_ids.add(item['to_account_id'])
+
+    accounts = {
+        account.account_id: account
+        for account in db.session.query(Account)
+        .filter(Account.account_id.in_(account_ids))
+        .order_by(Account.account_id)
+        .with_for_update()
+    }
+
+    results = []
+    new_transactions = []
+    for item in items:
+        amount = item['amount']
+        account = accounts.get(item['account_id'])
+        if amount <= 0:
+            results.append((False, "Amount must be greater than zero", None))
+            continue
+        if not account:
+            results.append((False, f"Account {item['account_id']} not found", None))
+            continue
+        if account.user_id != item['user_id']:
+            results.append((False, "Permission denied", None))
+            continue
+
+        balance = account.balance or Decimal('0')
+        if item['type'] == 'deposit':
+            account.balance = balance + amount
+            transaction = Transaction(account_id=account.account_id, description=item.get('description') or "Deposit",
+                                      amount=float(amount), type='deposit')
+            new_transactions.append(transaction)
+        elif item['type'] == 'withdraw':
+            if balance < amount:
+                results.append((False, "Insufficient funds", None))
+                continue
+            account.balance = balance - amount
+            transaction = Transaction(account_id=account.account_id, description=item.get('description') or "Withdrawal",
+                                      amount=float(amount) * -1, type='withdraw')
+            new_transactions.append(transaction)
+        elif item['type'] == 'transfer':
+            to_account = accounts.get(item.get('to_account_id'))
+            if not to_account:
+                results.append((False, f"Destination account {item.get('to_account_id')} not found", None))
+                continue
+            if to_account.account_id == account.account_id:
+                results.append((False, "Cannot transfer to the same account", None))
+                continue
+            if balance < amount:
+                results.append((False, "Insufficient funds", None))
+                continue
+            credited, rate = amount, None
+            if account.currency_code != to_account.currency_code:
+                try:
+                    credited, rate = fx_rates.convert(amount, account.currency_code, to_account.currency_code)
+                except RateUnavailable as e:
+                    results.append((False, str(e), None))
+                    continue
+            description = item.get('description') or "Transfer"
+            account.balance = balance - amount
+            to_account.balance = (to_account.balance or Decimal('0')) + credited
+            transaction = Transaction(account_id=account.account_id,
+                                      description=f"{description} to {to_account.account_id}",
+                                      amount=float(amount) * -1, type='transfer',
+                                      recipient_account_id=to_account.account_id, exchange_rate=rate)
+            new_transactions.append(transaction)
+            new_transactions.append(Transaction(account_id=to_account.account_id,
+                                                description=f"{description} from {account.account_id}",
+                                                amount=float(credited), type='transfer', exchange_rate=rate))
+        else:
+            results.append((False, f"Unsupported transaction type: {item['type']}", None))
+            continue
+        results.append((True, "Transaction applied", transaction))
+
+    # One flush inserts the whole batch in a few multi-row statements
+    db.session.add_all(new_transactions)
+    db.session.flush()
+    return results
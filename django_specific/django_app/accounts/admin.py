@@ -1,11 +1,16 @@
 from django.contrib import admin
+from bankarstvo.admin_utils import LargeTableAdmin
 from .models import Account, Loan, Payment
 
 @admin.register(Account)
-class AccountAdmin(admin.ModelAdmin):
+class AccountAdmin(LargeTableAdmin):
     list_display = ('account_id', 'user', 'account_type', 'balance', 'currency_code')
-    list_filter = ('account_type', 'currency_code')
-    search_fields = ('user__username', 'user__email', 'account_type')
+    # No list_filter: the choices of free-text columns come from SELECT DISTINCT over the table
+    list_select_related = ('user',)
+    search_id_fields = ('account_id',)
+    search_fields = ('^user__username',)
+    ordering = ('-account_id',)
+    raw_id_fields = ('user',)
     readonly_fields = ('account_id',)
 
 @admin.register(Loan)
@@ -20,4 +25,5 @@ class PaymentAdmin(admin.ModelAdmin):
     list_display = ('payment_id', 'loan', 'amount', 'payment_date', 'status')
     list_filter = ('status', 'payment_date')
     search_fields = ('loan__user__username',)
+    raw_id_fields = ('loan',)
     readonly_fields = ('payment_id',)
@@ -0,0 +1,203 @@
+import http.client
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import Account
+from accounts.statements import rebuild_rollups
+from transactions.models import Transaction
+from users.models import User
+
+# Rendered in place of the site templates, so only views and queries are measured
+TEMPLATES = {
+    'dashboard.html': (
+        '{% for account in accounts %}{{ account.account_type }} {{ account.balance }}\n{% endfor %}'
+        '{% for t in recent_transactions %}{{ t.date_posted }} {{ t.amount }} {{ t.account.account_type }}\n'
+        '{% endfor %}{{ total_balance }}'
+    ),
+    'transaction_history.html': (
+        '{% for t in transactions %}{{ t.date_posted }} {{ t.type }} {{ t.amount }}\n{% endfor %}'
+    ),
+    'account_statement.html': (
+        '{{ opening_balance }} {{ total_deposits }} {{ total_withdrawals }} {{ closing_balance }}\n'
+        '{% for t in transactions %}{{ t.date_posted }} {{ t.amount }} {{ t.running_balance }}\n{% endfor %}'
+    ),
+}
+
+SETTINGS = '''from {module} import *  # noqa
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+# Cache hits would hide the queries being compared
+CACHES = {{'default': {{'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}}}
+TEMPLATES[0]['DIRS'] = [{templates!r}] + list(TEMPLATES[0]['DIRS'])
+'''
+
+
+class Command(BaseCommand):
+    help = ('Serve the sync views with runserver (WSGI) and uvicorn (ASGI) and the async views with '
+            'uvicorn, and compare throughput and latency under concurrent load. Needs uvicorn and a '
+            'database the server processes can reach (not an in-memory SQLite database).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent clients')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per page and server')
+        parser.add_argument('--transactions', type=int, default=2000, help='Transactions seeded for the user')
+        parser.add_argument('--wsgi-port', type=int, default=8766)
+        parser.add_argument('--asgi-port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        if settings.DATABASES['default']['NAME'] in (':memory:', ''):
+            raise CommandError('The server processes cannot share an in-memory database')
+
+        directory = tempfile.mkdtemp(prefix='bench_async_')
+        fixtures = self.create_fixtures(options['transactions'])
+        servers = []
+        try:
+            env = self.server_env(directory)
+            servers.append(self.start(
+                [sys.executable, 'manage.py', 'runserver', '--noreload', '--nostatic',
+                 f"127.0.0.1:{options['wsgi_port']}"], options['wsgi_port'], env))
+            servers.append(self.start(
+                [sys.executable, '-m', 'uvicorn', 'bankarstvo.asgi:application', '--port', str(options['asgi_port']),
+                 '--log-level', 'warning', '--no-access-log'], options['asgi_port'], env))
+
+            statement = f"/accounts/statement/{fixtures['account'].pk}/"
+            year = f"?start_date={(timezone.localdate() - timedelta(days=365)):%Y-%m-%d}"
+            pages = [
+                ('dashboard', '/accounts/dashboard/', '/accounts/dashboard/async/'),
+                ('transaction history', '/transactions/', '/transactions/async/'),
+                ('account statement', statement + year, statement + 'async/' + year),
+            ]
+            for name, sync_path, async_path in pages:
+                self.stdout.write(f"{name}:")
+                for label, port, path in [
+                    ('sync views, runserver (WSGI)', options['wsgi_port'], sync_path),
+                    ('sync views, uvicorn (ASGI)', options['asgi_port'], sync_path),
+                    ('async views, uvicorn (ASGI)', options['asgi_port'], async_path),
+                ]:
+                    self.load(label, port, path, fixtures['cookie'], options['concurrency'], options['duration'])
+        finally:
+            for server in servers:
+                server.terminate()
+                server.wait()
+            self.delete_fixtures(fixtures)
+            shutil.rmtree(directory)
+
+    def create_fixtures(self, count):
+        prefix = f"bench_{uuid.uuid4().hex[:8]}"
+        user = User.objects.create(username=prefix, email=f"{prefix}@example.com")
+        accounts = [
+            Account.objects.create(account_type=kind, balance=0, currency_code='USD', user=user)
+            for kind in ('checking', 'savings', 'investment')
+        ]
+        # bulk_create skips the rollup signals; the rollups are rebuilt below
+        now = timezone.now()
+        Transaction.objects.bulk_create([
+            Transaction(user=user, account=accounts[i % 3], date_posted=now - timedelta(hours=4 * i),
+                        description=f"{prefix} {i}", amount=10.0 if i % 2 else -4.0,
+                        type='deposit' if i % 2 else 'withdraw')
+            for i in range(count)
+        ], batch_size=1000)
+        rebuild_rollups([account.pk for account in accounts])
+
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return {'user': user, 'account': accounts[0], 'session': session,
+                'cookie': f"{settings.SESSION_COOKIE_NAME}={session.session_key}"}
+
+    def delete_fixtures(self, fixtures):
+        fixtures['session'].delete()
+        Transaction.objects.filter(user=fixtures['user']).delete()
+        fixtures['user'].delete()
+
+    def server_env(self, directory):
+        templates = os.path.join(directory, 'templates')
+        os.mkdir(templates)
+        for name, source in TEMPLATES.items():
+            with open(os.path.join(templates, name), 'w') as f:
+                f.write(source)
+        with open(os.path.join(directory, 'async_bench_settings.py'), 'w') as f:
+            f.write(SETTINGS.format(module=settings.SETTINGS_MODULE, templates=templates))
+
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [directory, str(settings.BASE_DIR),
+                                                          env.get('PYTHONPATH')]))
+        env['DJANGO_SETTINGS_MODULE'] = 'async_bench_settings'
+        return env
+
+    def start(self, command, port, env):
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"{command[1:4]} exited with status {server.returncode}")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"{command[1:4]} did not start listening on port {port}")
+
+    def load(self, label, port, path, cookie, concurrency, duration):
+        latencies = []
+        failures = []
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def client():
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            mine, failed = [], 0
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers={'Cookie': cookie})
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        failed += 1
+                    if response.getheader('Connection', '').lower() == 'close':
+                        connection.close()
+                except (OSError, http.client.HTTPException):
+                    failed += 1
+                    connection.close()
+                mine.append(time.perf_counter() - started)
+            connection.close()
+            with lock:
+                latencies.extend(mine)
+                failures.append(failed)
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if not latencies:
+            self.stdout.write(self.style.ERROR(f"  {label:>30}: no requests completed"))
+            return
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+        self.stdout.write(
+            f"  {label:>30}: {len(latencies) / duration:7.1f} req/s, "
+            f"p50 {statistics.median(latencies) * 1000:7.1f} ms, p95 {p95 * 1000:7.1f} ms, "
+            f"{sum(failures)} failed"
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from accounts.statements import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly account rollups used by statements from the transactions table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account',
+            type=int,
+            action='append',
+            dest='accounts',
+            help='Account ID to rebuild (repeatable); all accounts by default'
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_rollups(options['accounts'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} monthly account rollups'))
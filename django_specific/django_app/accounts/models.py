@@ -56,3 +56,25 @@ class Payment(models.Model):
     
     class Meta:
         db_table = 'payments'  # Match the existing table name
+
+class AccountMonthlyRollup(models.Model):
+    """
+    Credits and debits of one account in one calendar month.
+
+    Kept current by the Transaction signals in accounts.signals, so
+    statements sum months instead of transactions. Rebuild with
+    `manage.py rebuild_account_rollups` after bulk loads, which skip signals.
+    """
+    rollup_id = models.AutoField(primary_key=True)
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='monthly_rollups')
+    month = models.DateField()  # First day of the month
+    credits = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    debits = models.DecimalField(max_digits=20, decimal_places=2, default=0)  # Positive total of outflows
+    transaction_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Account {self.account_id} {self.month:%Y-%m}: +{self.credits} -{self.debits}"
+
+    class Meta:
+        db_table = 'account_monthly_rollups'  # Created by database/migrations/add_account_monthly_rollups.py
+        unique_together = ['account', 'month']
@@ -0,0 +1,142 @@
+"""
+Cached fragments of the dashboard and account details pages.
+
+Each fragment is built with a fixed number of queries that load only the
+columns the page shows, and is cached per user under that user's data version. signals.py
+bumps the version whenever one of the user's accounts or transactions is
+saved or deleted through the Django ORM, so a repeat view costs a version
+lookup and a fragment fetch from the cache and no database queries.
+
+The Flask app and the gRPC services write the same accounts and
+transactions tables without bumping the version, so their changes show up
+only once the fragment expires: a page can be up to OVERVIEW_CACHE_TTL
+seconds behind them. The TTL also bounds how long orphaned fragments
+linger and how stale the rolling 30-day totals of account details can get.
+
+The a-prefixed variants serve the async views: they use the async cache
+API and run a fragment's independent queries concurrently.
+"""
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from bankarstvo.async_utils import gather_queries
+from transactions.models import Transaction
+from .models import Account
+
+OVERVIEW_CACHE_TTL = 300
+
+RECENT_TRANSACTIONS = 10
+ACCOUNT_TRANSACTIONS = 20
+
+ACCOUNT_FIELDS = ('account_id', 'account_type', 'balance', 'currency_code')
+TRANSACTION_FIELDS = ('transaction_id', 'date_posted', 'description', 'amount', 'type')
+
+
+def version_key(user_id):
+    return f"accounts:user{user_id}:version"
+
+
+def user_data_version(user_id):
+    return cache.get_or_set(version_key(user_id), 1, timeout=None)
+
+
+def bump_user_data(user_id):
+    """Drop every cached fragment of the user."""
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        # Key evicted or never set; any fresh version orphans the old fragments
+        cache.set(version_key(user_id), 1, timeout=None)
+
+
+def _fragment_key(user_id, version, name):
+    return f"accounts:user{user_id}:v{version}:{name}"
+
+
+def _cached(user_id, name, build):
+    key = _fragment_key(user_id, user_data_version(user_id), name)
+    fragment = cache.get(key)
+    if fragment is None:
+        fragment = build()
+        cache.set(key, fragment, OVERVIEW_CACHE_TTL)
+    return fragment
+
+
+async def _acached(user_id, name, build):
+    """_cached for async views; build is a coroutine function."""
+    version = await cache.aget_or_set(version_key(user_id), 1, timeout=None)
+    key = _fragment_key(user_id, version, name)
+    fragment = await cache.aget(key)
+    if fragment is None:
+        fragment = await build()
+        await cache.aset(key, fragment, OVERVIEW_CACHE_TTL)
+    return fragment
+
+
+def _dashboard_queries(user):
+    """The dashboard's two independent queries, as callables."""
+    def accounts():
+        return list(Account.objects.filter(user=user).only(*ACCOUNT_FIELDS).order_by('account_id'))
+
+    def recent_transactions():
+        return list(
+            Transaction.objects.filter(user=user)
+            .select_related('account')
+            .only(*TRANSACTION_FIELDS, 'account__account_type', 'account__currency_code')
+            .order_by('-date_posted', '-transaction_id')[:RECENT_TRANSACTIONS]
+        )
+    return accounts, recent_transactions
+
+
+def _dashboard_fragment(accounts, recent_transactions):
+    return {
+        'accounts': accounts,
+        'recent_transactions': recent_transactions,
+        'total_balance': sum(account.balance or 0 for account in accounts),
+    }
+
+
+def dashboard_overview(user):
+    """The user's accounts, total balance and most recent transactions."""
+    def build():
+        return _dashboard_fragment(*(query() for query in _dashboard_queries(user)))
+    return _cached(user.pk, 'dashboard', build)
+
+
+async def adashboard_overview(user):
+    """dashboard_overview for async views, running its queries concurrently."""
+    async def build():
+        return _dashboard_fragment(*await gather_queries(*_dashboard_queries(user)))
+    return await _acached(user.pk, 'dashboard', build)
+
+
+def account_overview(user, account_id):
+    """
+    One of the user's accounts with its latest transactions and 30-day
+    income and expenses, or None if the user has no such account.
+    """
+    def build():
+        account = Account.objects.filter(account_id=account_id, user=user).only(*ACCOUNT_FIELDS).first()
+        if account is None:
+            return None
+        thirty_days = Q(date_posted__gte=timezone.now() - timedelta(days=30))
+        totals = Transaction.objects.filter(account=account).aggregate(
+            total_income=Sum('amount', filter=thirty_days & Q(amount__gt=0), default=0.0),
+            total_expenses=Sum('amount', filter=thirty_days & Q(amount__lt=0), default=0.0),
+        )
+        transactions = list(
+            Transaction.objects.filter(account=account)
+            .only(*TRANSACTION_FIELDS)
+            .order_by('-date_posted', '-transaction_id')[:ACCOUNT_TRANSACTIONS]
+        )
+        return {
+            'account': account,
+            'transactions': transactions,
+            'total_income': totals['total_income'],
+            'total_expenses': abs(totals['total_expenses']),
+        }
+    return _cached(user.pk, f"account{account_id}", build)
@@ -0,0 +1,58 @@
+"""
+Keep AccountMonthlyRollup in step with saved and deleted transactions, and
+drop a user's cached overview fragments when their accounts or
+transactions change.
+"""
+
+from django.db import transaction as db_transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from transactions.models import Transaction
+from .models import Account
+from .overview import bump_user_data
+from .statements import record
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_posted_amount(sender, instance, raw=False, **kwargs):
+    """Note what an edited transaction contributed before the edit."""
+    instance._rolled_up = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._rolled_up = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list('account_id', 'date_posted', 'amount')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Transaction)
+def roll_up_transaction(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rolled_up', None)
+    if previous and previous[0] is not None:
+        record(*previous, sign=-1)
+    if instance.account_id is not None:
+        record(instance.account_id, instance.date_posted, instance.amount)
+
+
+@receiver(post_delete, sender=Transaction)
+def remove_transaction(sender, instance, **kwargs):
+    if instance.account_id is not None:
+        record(instance.account_id, instance.date_posted, instance.amount, sign=-1)
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def user_data_changed(sender, instance, **kwargs):
+    """Bump the owner's data version once the change commits.
+
+    Bumping before the commit would let a concurrent request re-cache the
+    old rows in the gap.
+    """
+    user_id = instance.user_id
+    db_transaction.on_commit(lambda: bump_user_data(user_id))
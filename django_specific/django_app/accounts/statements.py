@@ -0,0 +1,211 @@
+"""
+Account statements from monthly rollups.
+
+A statement needs the opening balance, which depends on every transaction
+posted since the period start, and the period's credits and debits. Summing
+transactions costs O(transactions); here full calendar months come from
+AccountMonthlyRollup and only the partial months at the edges of the
+period are summed from transactions, so a statement costs O(months).
+
+Amounts follow the Flask convention: credits are positive, debits negative,
+and every row belongs to one account.
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum, Value, Window
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from bankarstvo.async_utils import gather_queries
+from transactions.models import Transaction
+from .models import AccountMonthlyRollup
+
+CENTS = Decimal('0.01')
+
+
+def to_money(value):
+    """Round a float sum from Transaction.amount to cents."""
+    return Decimal(str(value or 0)).quantize(CENTS)
+
+
+def month_of(moment):
+    """First day of the month moment falls in, in the current time zone."""
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def month_floor(moment):
+    """Start of the month moment falls in."""
+    return timezone.make_aware(datetime.combine(month_of(moment), time.min))
+
+
+def month_ceil(moment):
+    """Start of the first month beginning at or after moment."""
+    floor = month_floor(moment)
+    if floor == moment:
+        return floor
+    next_month = (floor.date() + timedelta(days=31)).replace(day=1)
+    return timezone.make_aware(datetime.combine(next_month, time.min))
+
+
+def record(account_id, date_posted, amount, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) one transaction from its month's rollup.
+    Increments are applied with F() so concurrent saves do not lose updates.
+    """
+    amount = to_money(amount)
+    changes = {
+        'credits': F('credits') + sign * max(amount, 0),
+        'debits': F('debits') + sign * max(-amount, 0),
+        'transaction_count': F('transaction_count') + sign,
+    }
+
+    rollup = AccountMonthlyRollup.objects.filter(account_id=account_id, month=month_of(date_posted))
+    if rollup.update(**changes) or sign < 0:
+        # Nothing to remove from: the rollup went with its account in a cascade
+        return
+    try:
+        with transaction.atomic():
+            AccountMonthlyRollup.objects.create(account_id=account_id, month=month_of(date_posted))
+    except IntegrityError:
+        pass  # Created concurrently
+    rollup.update(**changes)
+
+
+def rebuild_rollups(account_ids=None):
+    """
+    Recompute rollups from transactions, for all accounts or account_ids.
+    Returns the number of rollup rows written.
+    """
+    transactions = Transaction.objects.filter(account__isnull=False)
+    rollups = AccountMonthlyRollup.objects.all()
+    if account_ids is not None:
+        transactions = transactions.filter(account_id__in=account_ids)
+        rollups = rollups.filter(account_id__in=account_ids)
+
+    months = (
+        transactions.annotate(month=TruncMonth('date_posted'))
+        .values('account_id', 'month')
+        .annotate(
+            credits=Sum('amount', filter=Q(amount__gt=0), default=0.0),
+            debits=Sum('amount', filter=Q(amount__lt=0), default=0.0),
+            transaction_count=Count('pk'),
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        rollups.delete()
+        created = AccountMonthlyRollup.objects.bulk_create([
+            AccountMonthlyRollup(
+                account_id=row['account_id'],
+                month=row['month'].date() if isinstance(row['month'], datetime) else row['month'],
+                credits=to_money(row['credits']),
+                debits=-to_money(row['debits']),
+                transaction_count=row['transaction_count'],
+            )
+            for row in months.iterator(chunk_size=2000)
+        ], batch_size=2000)
+    return len(created)
+
+
+def _total_queries(account, start, end):
+    """
+    The two independent aggregates behind a statement's totals, as
+    callables: one over transactions of the partial months at the edges of
+    [start, end) and after it, one over the rollups of the full months.
+    """
+    first_full, last_full, after_full = month_ceil(start), month_floor(end), month_ceil(end)
+    if first_full <= last_full:
+        period = Q(date_posted__gte=start, date_posted__lt=first_full) | Q(date_posted__gte=last_full,
+                                                                          date_posted__lt=end)
+        rollup_from = first_full
+    else:
+        period = Q(date_posted__gte=start, date_posted__lt=end)
+        rollup_from = last_full = after_full
+    after = Q(date_posted__gte=end, date_posted__lt=after_full)
+    in_period, after_period = Q(month__lt=last_full.date()), Q(month__gte=after_full.date())
+
+    def posted():
+        return Transaction.objects.filter(period | after, account=account).aggregate(
+            period_credits=Sum('amount', filter=Q(period, amount__gt=0), default=0.0),
+            period_debits=Sum('amount', filter=Q(period, amount__lt=0), default=0.0),
+            period_count=Count('pk', filter=period),
+            after_net=Sum('amount', filter=after, default=0.0),
+        )
+
+    def rolled():
+        return AccountMonthlyRollup.objects.filter(account=account, month__gte=rollup_from.date()).aggregate(
+            period_credits=Sum('credits', filter=in_period, default=Decimal('0')),
+            period_debits=Sum('debits', filter=in_period, default=Decimal('0')),
+            period_count=Sum('transaction_count', filter=in_period, default=0),
+            after_net=Sum(F('credits') - F('debits'), filter=after_period, default=Decimal('0')),
+        )
+    return posted, rolled
+
+
+def _totals(posted, rolled):
+    """Credits, debits and count over the period, and the net amount posted since."""
+    return {
+        'credits': to_money(posted['period_credits']) + rolled['period_credits'],
+        'debits': -to_money(posted['period_debits']) + rolled['period_debits'],
+        'count': posted['period_count'] + rolled['period_count'],
+        'after': to_money(posted['after_net']) + rolled['after_net'],
+    }
+
+
+def _period_transactions(account, start, end):
+    """Transactions of [start, end) with their running total, newest first."""
+    running_total = Window(
+        Sum('amount'),
+        order_by=[F('date_posted').asc(), F('transaction_id').asc()],
+    )
+    return (
+        Transaction.objects.filter(account=account, date_posted__gte=start, date_posted__lt=end)
+        .annotate(running_total=running_total)
+        .order_by('-date_posted', '-transaction_id')
+    )
+
+
+def _balances(account, totals):
+    closing_balance = (account.balance or Decimal('0')) - totals['after']
+    opening_balance = closing_balance - totals['credits'] + totals['debits']
+    return {
+        'transaction_count': totals['count'],
+        'opening_balance': opening_balance,
+        'total_deposits': totals['credits'],
+        'total_withdrawals': totals['debits'],
+        'closing_balance': closing_balance,
+    }
+
+
+def build_statement(account, start, end):
+    """
+    Statement of account over [start, end).
+
+    The opening balance is worked back from the current balance. The
+    returned transactions carry a running_balance computed by the database
+    with a window function, newest first.
+    """
+    statement = _balances(account, _totals(*(query() for query in _total_queries(account, start, end))))
+    statement['transactions'] = _period_transactions(account, start, end).annotate(
+        running_balance=F('running_total') + Value(float(statement['opening_balance'])))
+    return statement
+
+
+async def abuild_statement(account, start, end):
+    """
+    build_statement for async views. The totals and the transactions are
+    read concurrently, so running balances are completed in Python and the
+    transactions are returned as a list.
+    """
+    posted, rolled = _total_queries(account, start, end)
+    posted, rolled, transactions = await gather_queries(
+        posted, rolled, lambda: list(_period_transactions(account, start, end)))
+    statement = _balances(account, _totals(posted, rolled))
+    opening_balance = float(statement['opening_balance'])
+    for transaction in transactions:
+        transaction.running_balance = opening_balance + transaction.running_total
+    statement['transactions'] = transactions
+    return statement
@@ -1,3 +1,213 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from transactions.models import Transaction
+from users.models import User
+from .models import Account, AccountMonthlyRollup
+from .overview import RECENT_TRANSACTIONS, account_overview, adashboard_overview, dashboard_overview
+from .statements import abuild_statement, build_statement, rebuild_rollups
+
+
+def at(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class AccountStatementTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='saver', email='saver@example.com')
+        self.account = Account.objects.create(account_type='checking', balance=Decimal('0'),
+                                              currency_code='USD', user=self.user)
+        self.other = Account.objects.create(account_type='savings', balance=Decimal('0'),
+                                            currency_code='USD', user=self.user)
+        # Every fifth day from November to April, alternating credits and debits
+        self.postings = []
+        day = at(2023, 11, 3, 12)
+        for i in range(36):
+            amount = 100.0 + i if i % 2 == 0 else -(40.25 + i)
+            self.post(self.account, day, amount)
+            day += timedelta(days=5)
+        self.post(self.other, at(2024, 1, 15), 999.0)
+
+    def post(self, account, when, amount):
+        Transaction.objects.create(user=self.user, account=account, date_posted=when,
+                                   amount=amount, type='deposit' if amount > 0 else 'withdraw')
+        account.balance += Decimal(str(amount))
+        account.save()
+        if account == self.account:
+            self.postings.append((when, Decimal(str(amount))))
+
+    def expected(self, start, end):
+        period = [amount for when, amount in self.postings if start <= when < end]
+        after = sum(amount for when, amount in self.postings if when >= end)
+        closing = self.account.balance - after
+        deposits = sum(amount for amount in period if amount > 0)
+        withdrawals = -sum(amount for amount in period if amount < 0)
+        return closing - deposits + withdrawals, deposits, withdrawals, closing, len(period)
+
+    def test_statement_matches_transactions(self):
+        for start, end in [
+            (at(2023, 11, 20), at(2024, 3, 10)),  # Partial months at both ends
+            (at(2023, 12, 1), at(2024, 3, 1)),  # Whole months only
+            (at(2024, 1, 4), at(2024, 1, 21)),  # Within one month
+            (at(2024, 2, 10), at(2024, 12, 1)),  # Past the last posting
+        ]:
+            statement = build_statement(self.account, start, end)
+            opening, deposits, withdrawals, closing, count = self.expected(start, end)
+            self.assertEqual(statement['opening_balance'], opening)
+            self.assertEqual(statement['total_deposits'], deposits)
+            self.assertEqual(statement['total_withdrawals'], withdrawals)
+            self.assertEqual(statement['closing_balance'], closing)
+            self.assertEqual(statement['transaction_count'], count)
+
+    def test_running_balances(self):
+        start, end = at(2024, 1, 1), at(2024, 2, 1)
+        statement = build_statement(self.account, start, end)
+        transactions = list(statement['transactions'])
+
+        self.assertEqual(transactions[0].running_balance, float(statement['closing_balance']))
+        balance = statement['opening_balance']
+        for transaction in reversed(transactions):
+            balance += Decimal(str(transaction.amount))
+            self.assertAlmostEqual(transaction.running_balance, float(balance), places=6)
+
+    def test_totals_cost_two_queries_for_any_period(self):
+        with self.assertNumQueries(2):
+            build_statement(self.account, at(2023, 11, 20), at(2024, 3, 10))
+        with self.assertNumQueries(2):
+            build_statement(self.account, at(2020, 1, 1), at(2030, 1, 1))
+
+    def test_rollups_follow_edits_and_deletes(self):
+        transaction = Transaction.objects.filter(account=self.account, date_posted__month=1).first()
+        transaction.date_posted = at(2024, 2, 29)
+        transaction.amount = 12.5
+        transaction.save()
+        Transaction.objects.filter(account=self.account, date_posted__month=3).first().delete()
+
+        live = list(AccountMonthlyRollup.objects.order_by('account_id', 'month')
+                    .values_list('account_id', 'month', 'credits', 'debits', 'transaction_count'))
+        rebuild_rollups()
+        rebuilt = list(AccountMonthlyRollup.objects.order_by('account_id', 'month')
+                       .values_list('account_id', 'month', 'credits', 'debits', 'transaction_count'))
+        self.assertEqual(live, rebuilt)
+        self.assertEqual(len(rebuilt), 7)
+
+    def test_deleting_an_account_drops_its_rollups(self):
+        self.account.delete()
+        self.assertFalse(AccountMonthlyRollup.objects.filter(account_id=self.account.pk).exists())
+        self.assertEqual(AccountMonthlyRollup.objects.filter(account=self.other).count(), 1)
+
+
+class OverviewCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='owner', email='owner@example.com')
+        self.other_user = User.objects.create(username='other', email='other@example.com')
+        self.accounts = [
+            Account.objects.create(account_type=kind, balance=Decimal('100.00'), currency_code='USD', user=self.user)
+            for kind in ('checking', 'savings', 'investment')
+        ]
+        for i in range(30):
+            Transaction.objects.create(user=self.user, account=self.accounts[i % 3], amount=10.0 if i % 2 else -5.0,
+                                       type='deposit' if i % 2 else 'withdraw')
+
+    def test_dashboard_queries_are_bounded(self):
+        with self.assertNumQueries(2):  # accounts + recent transactions with their account
+            overview = dashboard_overview(self.user)
+            [transaction.account.account_type for transaction in overview['recent_transactions']]
+
+        self.assertEqual(overview['total_balance'], Decimal('300.00'))
+        self.assertEqual(len(overview['recent_transactions']), RECENT_TRANSACTIONS)
+
+    def test_repeat_views_are_served_from_cache(self):
+        dashboard_overview(self.user)
+        account_overview(self.user, self.accounts[0].account_id)
+
+        with self.assertNumQueries(0):
+            dashboard_overview(self.user)
+            details = account_overview(self.user, self.accounts[0].account_id)
+        self.assertEqual((details['total_income'], details['total_expenses']), (50.0, 25.0))
+        self.assertIsNone(account_overview(self.other_user, self.accounts[0].account_id))
+
+    def test_changes_invalidate_only_the_owner(self):
+        dashboard_overview(self.user)
+        dashboard_overview(self.other_user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            account = self.accounts[1]
+            account.balance = Decimal('250.00')
+            account.save()
+
+        self.assertEqual(dashboard_overview(self.user)['total_balance'], Decimal('450.00'))
+        with self.assertNumQueries(0):
+            dashboard_overview(self.other_user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(user=self.user, account=account, amount=1.0, type='deposit', description='new')
+        self.assertEqual(dashboard_overview(self.user)['recent_transactions'][0].description, 'new')
+
+
+async def fake_arender(request, template_name, context):
+    response = HttpResponse(template_name)
+    response.context_data = context
+    return response
+
+
+class AsyncViewTests(TransactionTestCase):
+    """Async variants read on connections of their own, so the data must be committed."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='async', email='async@example.com')
+        self.account = Account.objects.create(account_type='checking', balance=Decimal('0'),
+                                              currency_code='USD', user=self.user)
+        for i in range(40):
+            amount = 25.5 if i % 3 else -10.0
+            Transaction.objects.create(user=self.user, account=self.account, amount=amount,
+                                       date_posted=at(2024, 1, 1) + timedelta(days=3 * i),
+                                       type='deposit' if amount > 0 else 'withdraw')
+            self.account.balance += Decimal(str(amount))
+        self.account.save()
+
+    def test_async_statement_matches_sync(self):
+        start, end = at(2024, 1, 20), at(2024, 3, 15)
+        expected = build_statement(self.account, start, end)
+        statement = async_to_sync(abuild_statement)(self.account, start, end)
+
+        for key in ('opening_balance', 'total_deposits', 'total_withdrawals', 'closing_balance', 'transaction_count'):
+            self.assertEqual(statement[key], expected[key])
+        self.assertEqual([(t.pk, t.running_balance) for t in statement['transactions']],
+                         [(t.pk, t.running_balance) for t in expected['transactions']])
+
+    def test_async_dashboard_matches_sync(self):
+        overview = async_to_sync(adashboard_overview)(self.user)
+        cache.clear()
+        expected = dashboard_overview(self.user)
+
+        self.assertEqual(overview['total_balance'], expected['total_balance'])
+        self.assertEqual([t.pk for t in overview['recent_transactions']],
+                         [t.pk for t in expected['recent_transactions']])
+
+    async def test_async_views_require_login_and_ownership(self):
+        url = reverse('accounts:account_statement_async', args=[self.account.pk])
+        with mock.patch('accounts.views.arender', fake_arender):
+            self.assertEqual((await self.async_client.get(url)).status_code, 302)
+
+            stranger = await User.objects.acreate(username='stranger', email='stranger@example.com')
+            await sync_to_async(self.async_client.force_login)(stranger)
+            self.assertEqual((await self.async_client.get(url)).status_code, 404)
+
+            await sync_to_async(self.async_client.force_login)(self.user)
+            response = await self.async_client.get(url, {'start_date': '2024-02-01', 'end_date': '2024-02-29'})
+
+        self.assertEqual(response.status_code, 200)
+        february = Transaction.objects.filter(account=self.account, date_posted__gte=at(2024, 2, 1),
+                                              date_posted__lt=at(2024, 3, 1))
+        self.assertEqual(len(response.context_data['transactions']), await february.acount())
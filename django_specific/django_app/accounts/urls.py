@@ -5,7 +5,9 @@ app_name = 'accounts'
 
 urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/async/', views.dashboard_async, name='dashboard_async'),
     path('create/', views.create_account, name='create_account'),
     path('details/<int:account_id>/', views.account_details, name='account_details'),
     path('statement/<int:account_id>/', views.account_statement, name='account_statement'),
+    path('statement/<int:account_id>/async/', views.account_statement_async, name='account_statement_async'),
 ]
\ No newline at end of file
@@ -1,38 +1,23 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 import json
 
 from .models import Account, Loan, Payment
-from transactions.models import Transaction
 from .forms import AccountCreationForm
+from .overview import account_overview, adashboard_overview, dashboard_overview
+from .statements import abuild_statement, build_statement
+from bankarstvo.async_utils import arender, async_login_required
 
 @login_required
 def dashboard(request):
     """
     User dashboard showing account overview and recent transactions.
     """
-    # Get all user accounts
-    accounts = Account.objects.filter(user=request.user)
-    
-    # Get recent transactions for all accounts
-    recent_transactions = Transaction.objects.filter(
-        user=request.user
-    ).order_by('-date_posted')[:10]
-    
-    # Get total balance across all accounts
-    total_balance = sum(account.balance or 0 for account in accounts)
-    
-    context = {
-        'accounts': accounts,
-        'recent_transactions': recent_transactions,
-        'total_balance': total_balance,
-    }
-    
-    return render(request, 'dashboard.html', context)
+    return render(request, 'dashboard.html', dashboard_overview(request.user))
 
 @login_required
 def create_account(request):
@@ -59,33 +44,9 @@ def account_details(request, account_id):
     """
     Show detailed information for a specific account.
     """
-    account = get_object_or_404(Account, account_id=account_id, user=request.user)
-    
-    # Get transactions for this account
-    transactions = Transaction.objects.filter(
-        user=request.user
-    ).order_by('-date_posted')[:20]
-    
-    # Calculate statistics
-    # Get transactions from the last 30 days
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_transactions = Transaction.objects.filter(
-        user=request.user,
-        date_posted__gte=thirty_days_ago
-    )
-    
-    # Calculate income (deposits)
-    total_income = sum(t.amount for t in recent_transactions if t.type == 'deposit')
-    
-    # Calculate expenses (withdrawals)
-    total_expenses = sum(t.amount for t in recent_transactions if t.type == 'withdraw')
-    
-    context = {
-        'account': account,
-        'transactions': transactions,
-        'total_income': total_income,
-        'total_expenses': total_expenses,
-    }
+    context = account_overview(request.user, account_id)
+    if context is None:
+        raise Http404("No such account")
     
     return render(request, 'account_details.html', context)
 
@@ -95,41 +56,57 @@ def account_statement(request, account_id):
     Generate account statement for a specific period.
     """
     account = get_object_or_404(Account, account_id=account_id, user=request.user)
+    start_date, end_date = _statement_dates(request)
     
-    # Default to last 30 days if not specified
-    start_date = request.GET.get('start_date', (timezone.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
-    end_date = request.GET.get('end_date', timezone.now().strftime('%Y-%m-%d'))
-    
-    # Convert to datetime objects
-    start_date = datetime.strptime(start_date, '%Y-%m-%d')
-    end_date = datetime.strptime(end_date, '%Y-%m-%d')
-    
-    # Get transactions within date range
-    transactions = Transaction.objects.filter(
-        user=request.user,
-        date_posted__gte=start_date,
-        date_posted__lte=end_date
-    ).order_by('-date_posted')
-    
-    # Calculate statement statistics
-    opening_balance = account.balance - sum(
-        t.amount if t.type == 'deposit' else -t.amount 
-        for t in transactions
-    )
+    context = {
+        'account': account,
+        'start_date': start_date,
+        'end_date': end_date,
+        **build_statement(account, *_statement_range(start_date, end_date)),
+    }
     
-    total_deposits = sum(t.amount for t in transactions if t.type == 'deposit')
-    total_withdrawals = sum(t.amount for t in transactions if t.type == 'withdraw')
-    closing_balance = opening_balance + total_deposits - total_withdrawals
+    return render(request, 'account_statement.html', context)
+
+@async_login_required
+async def dashboard_async(request):
+    """
+    Async dashboard: the cached overview, built with concurrent queries on a miss.
+    """
+    return await arender(request, 'dashboard.html', await adashboard_overview(request.user))
+
+@async_login_required
+async def account_statement_async(request, account_id):
+    """
+    Async account statement: totals and transactions are read concurrently.
+    """
+    account = await Account.objects.filter(account_id=account_id, user=request.user).afirst()
+    if account is None:
+        raise Http404("No such account")
+    start_date, end_date = _statement_dates(request)
     
     context = {
         'account': account,
-        'transactions': transactions,
         'start_date': start_date,
         'end_date': end_date,
-        'opening_balance': opening_balance,
-        'total_deposits': total_deposits,
-        'total_withdrawals': total_withdrawals,
-        'closing_balance': closing_balance,
+        **await abuild_statement(account, *_statement_range(start_date, end_date)),
     }
     
-    return render(request, 'account_statement.html', context)
+    return await arender(request, 'account_statement.html', context)
+
+def _statement_dates(request):
+    # Default to last 30 days if not specified; both days are included
+    today = timezone.localdate()
+    start_date = _parse_date(request.GET.get('start_date'), today - timedelta(days=30))
+    end_date = _parse_date(request.GET.get('end_date'), today)
+    return start_date, end_date
+
+def _statement_range(start_date, end_date):
+    start = timezone.make_aware(datetime.combine(start_date, time.min))
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    return start, end
+
+def _parse_date(value, default):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,188 @@
+"""
+Admin support for tables with tens of millions of rows.
+
+The stock changelist counts the whole table twice per page (once for the
+paginator and once for the "N total" link), which on InnoDB means a full
+index scan each time. LargeTableAdmin instead:
+
+* reads the size of an unfiltered table from the database's statistics
+  (information_schema on MySQL, pg_class on PostgreSQL, sqlite_stat1 after
+  ANALYZE on SQLite), exact counts only below ESTIMATE_ABOVE rows;
+* counts filtered or searched results up to FILTERED_COUNT_CAP and
+  paginates over those, so a broad search never scans the whole table;
+* skips the full result count;
+* answers a numeric search with exact lookups on search_id_fields, which
+  are primary or foreign keys, instead of a LIKE over every search field;
+* builds the date hierarchy drill-down from the first and last date,
+  each read with one index seek, instead of a SELECT DISTINCT over every
+  row. Every year, month or day between the two is offered,
+  including empty ones.
+
+Subclasses still choose index-backed search_fields ('^' prefix lookups on
+indexed columns), list_select_related and raw_id_fields.
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Max, Min, Q, QuerySet
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+# Tables estimated below this many rows are counted exactly
+ESTIMATE_ABOVE = 100000
+
+# Filtered changelists paginate over at most this many results
+FILTERED_COUNT_CAP = 10000
+
+
+def estimated_row_count(model, using='default'):
+    """
+    Row count of model's table according to the database's statistics, or
+    None if the backend keeps none for it.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'mysql': ('SELECT TABLE_ROWS FROM information_schema.TABLES '
+                  'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'),
+        'postgresql': 'SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)',
+        'sqlite': 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+    }
+    if connection.vendor not in queries:
+        return None
+    try:
+        # Savepoint, so a missing statistics table does not break an outer transaction
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(queries[connection.vendor], [table])
+            row = cursor.fetchone()
+    except DatabaseError as e:
+        logger.debug(f"No row estimate for {table}: {e}")
+        return None
+    if row is None or row[0] is None:
+        return None
+    # sqlite_stat1 stores "rows [rows per index key...]"; pg_class -1 means never analyzed
+    estimate = int(str(row[0]).split()[0]) if connection.vendor == 'sqlite' else int(row[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count never scans a large table."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, using=queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_ABOVE:
+                return estimate
+            return queryset.count()
+        # COUNT(*) over a LIMITed subquery stops after FILTERED_COUNT_CAP rows
+        return queryset.order_by()[:FILTERED_COUNT_CAP].count()
+
+
+def _periods(first, last, kind):
+    """Every year, month or day from first to last, as dates."""
+    current = date(first.year, 1 if kind == 'year' else first.month, first.day if kind == 'day' else 1)
+    periods = []
+    while current <= last:
+        periods.append(current)
+        if kind == 'year':
+            current = current.replace(year=current.year + 1)
+        elif kind == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=1)
+    return periods
+
+
+class SpanDatesQuerySet(QuerySet):
+    """
+    QuerySet whose dates() and datetimes() list periods between the first
+    and last date, and whose MIN/MAX-only aggregates are answered by index
+    seeks (not every backend optimizes MIN and MAX in one query).
+    """
+
+    def aggregate(self, *args, **kwargs):
+        if args or not kwargs or not all(_is_edge(expression) for expression in kwargs.values()):
+            return super().aggregate(*args, **kwargs)
+        return {alias: self._edge(expression.source_expressions[0].name, isinstance(expression, Max))
+                for alias, expression in kwargs.items()}
+
+    def _edge(self, field_name, last):
+        return (self.exclude(**{f"{field_name}__isnull": True})
+                .order_by(f"-{field_name}" if last else field_name)
+                .values_list(field_name, flat=True)
+                .first())
+
+    def _span(self, field_name):
+        return self._edge(field_name, False), self._edge(field_name, True)
+
+    def dates(self, field_name, kind, order='ASC'):
+        if kind not in ('year', 'month', 'day'):
+            return super().dates(field_name, kind, order)
+        first, last = self._span(field_name)
+        if first is None:
+            return []
+        periods = _periods(first, last, kind)
+        return periods if order == 'ASC' else periods[::-1]
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None, **kwargs):
+        if kind not in ('year', 'month', 'day'):
+            return super().datetimes(field_name, kind, order, tzinfo, **kwargs)
+        first, last = self._span(field_name)
+        if first is None:
+            return []
+        if timezone.is_aware(first):
+            first, last = timezone.localtime(first, tzinfo), timezone.localtime(last, tzinfo)
+        periods = [datetime.combine(day, time.min) for day in _periods(first.date(), last.date(), kind)]
+        if timezone.is_aware(first):
+            periods = [timezone.make_aware(moment, tzinfo) for moment in periods]
+        return periods if order == 'ASC' else periods[::-1]
+
+
+def _is_edge(expression):
+    """Whether expression is a plain, unfiltered MIN or MAX of a field."""
+    return (type(expression) in (Min, Max) and expression.filter is None
+            and isinstance(expression.source_expressions[0], F))
+
+
+@lru_cache(maxsize=None)
+def _span_dates_class(queryset_class):
+    if issubclass(queryset_class, SpanDatesQuerySet):
+        return queryset_class
+    return type(f"SpanDates{queryset_class.__name__}", (SpanDatesQuerySet, queryset_class), {})
+
+
+class LargeTableChangeList(ChangeList):
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # The subclass only overrides dates() and datetimes(), so the swap keeps all state
+        queryset.__class__ = _span_dates_class(type(queryset))
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Key columns matched exactly when the search term is a number
+    search_id_fields = ()
+
+    def get_changelist(self, request, **kwargs):
+        return LargeTableChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if term.isdigit() and self.search_id_fields:
+            lookups = Q()
+            for field in self.search_id_fields:
+                lookups |= Q(**{field: int(term)})
+            return queryset.filter(lookups), False
+        return super().get_search_results(request, queryset, search_term)
@@ -4,14 +4,18 @@ ASGI config for bankarstvo project with WebSocket support.
 
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-import users.routing  # We will create this module later
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bankarstvo.settings')
 
+# Set up Django before importing anything that loads models
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+import users.routing  # noqa: E402
+
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
         URLRouter(
             users.routing.websocket_urlpatterns
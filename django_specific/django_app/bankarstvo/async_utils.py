@@ -0,0 +1,55 @@
+"""
+Helpers for async views.
+
+Django's async ORM methods (aget, afirst, aaggregate, async for, ...) run
+the sync query through sync_to_async in the request's single
+thread-sensitive worker, so awaiting several of them with asyncio.gather
+still runs them one after another. gather_queries runs independent
+read-only queries in threads of their own instead, each on its own
+database connection, so their round trips overlap.
+"""
+
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+from django.shortcuts import render
+
+
+def _on_own_connection(query):
+    def run():
+        # Same connection housekeeping as a request: honour CONN_MAX_AGE
+        # and drop broken connections, before and after the query
+        close_old_connections()
+        try:
+            return query()
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+async def gather_queries(*queries):
+    """
+    Run callables that each evaluate one read-only query concurrently and
+    return their results in order. Callables must return evaluated results
+    (lists, aggregates), not lazy querysets.
+    """
+    return await asyncio.gather(*(_on_own_connection(query)() for query in queries))
+
+
+def async_login_required(view):
+    """login_required for async views, which Django 4.2's decorator does not wrap."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # request.user is lazy; resolving it reads the session and the user
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def arender(request, template_name, context):
+    """render() off the event loop, as context processors may touch the session."""
+    return await sync_to_async(render)(request, template_name, context)
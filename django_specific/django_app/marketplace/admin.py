@@ -1,4 +1,5 @@
 from django.contrib import admin
+from bankarstvo.admin_utils import LargeTableAdmin
 from .models import MarketplaceItem, MarketplaceTransaction
 
 @admin.register(MarketplaceItem)
@@ -6,11 +7,16 @@ class MarketplaceItemAdmin(admin.ModelAdmin):
     list_display = ('item_id', 'name', 'price', 'seller', 'buyer', 'status', 'created_at')
     list_filter = ('status', 'created_at')
     search_fields = ('name', 'description', 'seller__username', 'buyer__username')
+    raw_id_fields = ('seller', 'buyer')
     readonly_fields = ('item_id', 'created_at', 'updated_at')
 
 @admin.register(MarketplaceTransaction)
-class MarketplaceTransactionAdmin(admin.ModelAdmin):
+class MarketplaceTransactionAdmin(LargeTableAdmin):
     list_display = ('transaction_id', 'item', 'buyer', 'seller', 'amount', 'timestamp')
-    list_filter = ('timestamp',)
-    search_fields = ('item__name', 'buyer__username', 'seller__username')
+    list_select_related = ('item', 'buyer', 'seller')
+    search_id_fields = ('transaction_id', 'item_id')
+    search_fields = ('^buyer__username', '^seller__username')
+    date_hierarchy = 'timestamp'
+    ordering = ('-timestamp',)
+    raw_id_fields = ('item', 'buyer', 'seller')
     readonly_fields = ('transaction_id', 'timestamp')
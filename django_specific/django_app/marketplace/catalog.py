@@ -0,0 +1,164 @@
+"""
+Paginated querysets for the marketplace pages.
+
+Every listing is paginated and loads only the columns the pages show, with
+the related seller, buyer or item joined in, so rendering a page costs a
+fixed number of queries however many items or orders exist.
+
+The public catalog (available items, newest first) is the same for every
+visitor and is cached per page for CATALOG_CACHE_TTL seconds. Cached pages
+are keyed by a catalog version that signals.py bumps whenever an item is
+listed, changes status or is removed, so a sold item drops out of the
+catalog as soon as the sale commits rather than when the TTL runs out.
+Signed-in sellers get their pages cut from the same cached pages without
+their own listings (catalog_page_for).
+"""
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db.models import Q
+
+from .models import MarketplaceItem, MarketplaceTransaction
+
+CATALOG_PAGE_SIZE = 24
+LISTINGS_PAGE_SIZE = 20
+ORDERS_PAGE_SIZE = 20
+
+# Short enough that a missed invalidation is never visible for long
+CATALOG_CACHE_TTL = 30
+
+CATALOG_VERSION_KEY = 'marketplace:catalog:version'
+
+ITEM_FIELDS = ('item_id', 'name', 'price', 'status', 'created_at')
+
+
+def catalog_queryset():
+    """Available items with their seller, newest first."""
+    return (MarketplaceItem.objects
+            .filter(status='available')
+            .select_related('seller')
+            .only(*ITEM_FIELDS, 'seller__username')
+            .order_by('-created_at', '-item_id'))
+
+
+def listings_queryset(user):
+    """Every item the user has listed, with the buyer of those sold."""
+    return (MarketplaceItem.objects
+            .filter(seller=user)
+            .select_related('buyer')
+            .only(*ITEM_FIELDS, 'buyer__username')
+            .order_by('-created_at', '-item_id'))
+
+
+def purchases_queryset(user):
+    return (MarketplaceTransaction.objects
+            .filter(buyer=user)
+            .select_related('item', 'seller')
+            .only('transaction_id', 'timestamp', 'amount', 'item__name', 'seller__username')
+            .order_by('-timestamp', '-transaction_id'))
+
+
+def sales_queryset(user):
+    return (MarketplaceTransaction.objects
+            .filter(seller=user)
+            .select_related('item', 'buyer')
+            .only('transaction_id', 'timestamp', 'amount', 'item__name', 'buyer__username')
+            .order_by('-timestamp', '-transaction_id'))
+
+
+def paginate(queryset, page_number, per_page):
+    """Return the requested page, falling back to the first or last page."""
+    return Paginator(queryset, per_page).get_page(page_number)
+
+
+def catalog_version():
+    return cache.get_or_set(CATALOG_VERSION_KEY, 1, timeout=None)
+
+
+def invalidate_catalog():
+    """Drop every cached catalog page."""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Key evicted or never set; any fresh version orphans the old pages
+        cache.set(CATALOG_VERSION_KEY, 1, timeout=None)
+
+
+def _page_number(page_number):
+    try:
+        return max(int(page_number), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def _cached_catalog_page(number):
+    """Items, number and total count of one page of the public catalog.
+
+    Pages past the end come back as the last page, as with get_page.
+    """
+    key = f"marketplace:catalog:v{catalog_version()}:page{number}"
+    cached = cache.get(key)
+    if cached is None:
+        paginator = Paginator(catalog_queryset(), CATALOG_PAGE_SIZE)
+        page = paginator.get_page(number)
+        cached = {'count': paginator.count, 'number': page.number, 'items': list(page.object_list)}
+        cache.set(key, cached, CATALOG_CACHE_TTL)
+    return cached
+
+
+def catalog_page(page_number=1):
+    """Return a page of the public catalog, served from cache when possible.
+
+    Only the page's items and the total count are cached; the Page is
+    rebuilt around them so templates can use it like any other page.
+    """
+    cached = _cached_catalog_page(_page_number(page_number))
+    paginator = Paginator(catalog_queryset(), CATALOG_PAGE_SIZE)
+    # Seed the paginator's count so the rebuilt page needs no query
+    paginator.__dict__['count'] = cached['count']
+    return Page(cached['items'], cached['number'], paginator)
+
+
+def catalog_page_for(user, page_number=1):
+    """Return a page of the public catalog without user's own listings.
+
+    The page is cut from the shared cached pages, so it stays full and its
+    count and page links agree with its contents. It starts at the same
+    offset in the public catalog, moved past as many items as the user has
+    listed ahead of that offset, and skips the user's items as it fills.
+    Per request this costs a count of the user's available listings and,
+    past the first page, a count of those ahead of the offset.
+    """
+    own = MarketplaceItem.objects.filter(seller=user, status='available')
+    paginator = Paginator(catalog_queryset().exclude(seller=user), CATALOG_PAGE_SIZE)
+    paginator.__dict__['count'] = max(_cached_catalog_page(1)['count'] - own.count(), 0)
+    try:
+        number = paginator.validate_number(_page_number(page_number))
+    except EmptyPage:
+        number = paginator.num_pages
+
+    offset = (number - 1) * CATALOG_PAGE_SIZE
+    shared_number, index = divmod(offset, CATALOG_PAGE_SIZE)
+    shared_number += 1
+    skip = 0 if offset == 0 else None  # The user's items ahead of offset, counted once it is known
+    items = []
+    while len(items) < CATALOG_PAGE_SIZE:
+        cached = _cached_catalog_page(shared_number)
+        if cached['number'] != shared_number:
+            break  # Past the end of the catalog
+        for item in cached['items'][index:]:
+            if skip is None:
+                skip = own.filter(Q(created_at__gt=item.created_at)
+                                  | Q(created_at=item.created_at, item_id__gt=item.item_id)).count()
+            if item.seller_id == user.pk:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            items.append(item)
+            if len(items) == CATALOG_PAGE_SIZE:
+                break
+        if len(cached['items']) < CATALOG_PAGE_SIZE:
+            break
+        shared_number, index = shared_number + 1, 0
+    return Page(items, number, paginator)
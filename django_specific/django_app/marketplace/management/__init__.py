@@ -0,0 +1 @@
+# Initialize management module
\ No newline at end of file
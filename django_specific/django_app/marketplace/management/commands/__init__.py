@@ -0,0 +1 @@
+# Initialize commands module
\ No newline at end of file
@@ -0,0 +1,140 @@
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction as db_transaction
+
+from accounts.models import Account
+from marketplace.models import MarketplaceItem, MarketplaceTransaction
+from marketplace.services import PurchaseError, purchase_item
+from users.models import User
+
+ITEM_PRICE = Decimal('10.00')
+
+
+def legacy_purchase(buyer, item_id, account_id):
+    """The original product_detail flow: checks outside the transaction, no row locks."""
+    item = MarketplaceItem.objects.get(item_id=item_id)
+    account = Account.objects.get(account_id=account_id)
+    if item.status != 'available':
+        raise PurchaseError('This item is no longer available')
+    if account.balance < item.price:
+        raise PurchaseError('Insufficient funds')
+    with db_transaction.atomic():
+        account.balance -= item.price
+        account.save()
+        item.status = 'sold'
+        item.buyer = buyer
+        item.save()
+        return MarketplaceTransaction.objects.create(
+            item=item, buyer=buyer, seller_id=item.seller_id, amount=item.price)
+
+
+class Command(BaseCommand):
+    help = ('Race concurrent buyers for one hot marketplace item and report double-sells '
+            'and purchase throughput. Needs a database with row locks (MySQL/PostgreSQL).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=16, help='Concurrent buyers per round')
+        parser.add_argument('--rounds', type=int, default=50, help='Times the hot item is relisted')
+        parser.add_argument('--legacy', action='store_true',
+                            help='Also run the original unlocked purchase flow for comparison')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stderr.write(self.style.WARNING(
+                'SQLite ignores select_for_update and serializes writers; results are not representative'))
+
+        fixtures = self.create_fixtures(options['buyers'], options['rounds'])
+        try:
+            self.run('locked', purchase_item, fixtures, options['rounds'])
+            if options['legacy']:
+                self.reset_balances(fixtures, options['rounds'])
+                self.run('legacy', legacy_purchase, fixtures, options['rounds'])
+        finally:
+            self.delete_fixtures(fixtures)
+
+    def create_fixtures(self, buyer_count, rounds):
+        prefix = f"bench_{uuid.uuid4().hex[:8]}"
+        seller = User.objects.create(username=f"{prefix}_seller", email=f"{prefix}_seller@example.com")
+        buyers = [
+            User.objects.create(username=f"{prefix}_buyer{i}", email=f"{prefix}_buyer{i}@example.com")
+            for i in range(buyer_count)
+        ]
+        accounts = [
+            Account.objects.create(account_type='checking', balance=ITEM_PRICE * rounds,
+                                   currency_code='USD', user=buyer)
+            for buyer in buyers
+        ]
+        item = MarketplaceItem.objects.create(name=f"{prefix} hot item", price=ITEM_PRICE, seller=seller)
+        return {'seller': seller, 'buyers': buyers, 'accounts': accounts, 'item': item}
+
+    def reset_balances(self, fixtures, rounds):
+        Account.objects.filter(pk__in=[account.pk for account in fixtures['accounts']]).update(
+            balance=ITEM_PRICE * rounds)
+
+    def delete_fixtures(self, fixtures):
+        MarketplaceTransaction.objects.filter(item=fixtures['item']).delete()
+        fixtures['item'].delete()
+        Account.objects.filter(pk__in=[account.pk for account in fixtures['accounts']]).delete()
+        User.objects.filter(pk__in=[fixtures['seller'].pk] + [buyer.pk for buyer in fixtures['buyers']]).delete()
+
+    def run(self, name, purchase, fixtures, rounds):
+        item = fixtures['item']
+        pairs = list(zip(fixtures['buyers'], fixtures['accounts']))
+        MarketplaceTransaction.objects.filter(item=item).delete()
+
+        attempts = sales = rejected = errors = double_sells = 0
+        elapsed = 0.0
+        for _ in range(rounds):
+            MarketplaceItem.objects.filter(pk=item.pk).update(status='available', buyer=None)
+            before = MarketplaceTransaction.objects.filter(item=item).count()
+
+            outcomes = []
+            lock = threading.Lock()
+            barrier = threading.Barrier(len(pairs))
+
+            def buy(buyer, account):
+                try:
+                    barrier.wait()
+                    try:
+                        purchase(buyer, item.pk, account.pk)
+                        outcome = 'sold'
+                    except PurchaseError:
+                        outcome = 'rejected'
+                    except Exception:
+                        outcome = 'error'
+                    with lock:
+                        outcomes.append(outcome)
+                finally:
+                    connection.close()
+
+            threads = [threading.Thread(target=buy, args=pair) for pair in pairs]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed += time.perf_counter() - start
+
+            recorded = MarketplaceTransaction.objects.filter(item=item).count() - before
+            attempts += len(outcomes)
+            sales += outcomes.count('sold')
+            rejected += outcomes.count('rejected')
+            errors += outcomes.count('error')
+            double_sells += max(recorded - 1, 0)
+
+        debited = sum(ITEM_PRICE * rounds - account.balance
+                      for account in Account.objects.filter(pk__in=[a.pk for a in fixtures['accounts']]))
+        self.stdout.write(
+            f"{name:>6}: {rounds} rounds x {len(pairs)} buyers, {sales} sales, {rejected} rejected, "
+            f"{errors} errors, {double_sells} double-sells, {debited} debited for "
+            f"{MarketplaceTransaction.objects.filter(item=item).count()} recorded sales\n"
+            f"        {sales / elapsed:.1f} purchases/s, {attempts / elapsed:.1f} attempts/s on one hot item"
+        )
+        if double_sells == 0 and debited == ITEM_PRICE * sales:
+            self.stdout.write(self.style.SUCCESS("        consistent"))
+        else:
+            self.stdout.write(self.style.ERROR("        INCONSISTENT: item sold more than once or balances off"))
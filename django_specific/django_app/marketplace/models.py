@@ -39,3 +39,4 @@ class MarketplaceTransaction(models.Model):
     
     class Meta:
         db_table = 'marketplace_transactions'  # Match the existing table name
+        indexes = [models.Index(fields=['timestamp'], name='ix_mkt_transactions_timestamp')]
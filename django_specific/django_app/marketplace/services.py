@@ -0,0 +1,105 @@
+"""
+Purchase engine for marketplace items.
+
+A purchase locks the item row and then the buyer's account row with
+SELECT ... FOR UPDATE, checks availability and funds while holding both
+locks, and applies the sale in the same transaction. Of two buyers racing
+for an item the second waits on the item lock and then finds it sold, so
+an item can never be sold twice or an account overdrawn.
+
+Rows are always locked item first, then account (the gRPC
+MarketplaceService claims them in the same order), so two purchases can
+never wait on each other in a cycle. The database may still pick a
+transaction as a deadlock or lock-wait victim; those are retried a
+bounded number of times.
+"""
+
+import logging
+import time
+
+from django.db import OperationalError, transaction as db_transaction
+from django.db.models import F
+
+from accounts.models import Account
+from accounts.overview import bump_user_data
+from .models import MarketplaceItem, MarketplaceTransaction
+
+logger = logging.getLogger(__name__)
+
+# Attempts before a purchase that keeps losing lock conflicts gives up
+MAX_PURCHASE_ATTEMPTS = 3
+RETRY_BACKOFF = 0.05
+
+# MySQL error codes for a deadlock victim and a lock wait timeout
+RETRYABLE_DB_ERRORS = (1213, 1205)
+
+
+class PurchaseError(Exception):
+    """A purchase that cannot go ahead; the message is safe to show the buyer."""
+
+
+class ItemUnavailable(PurchaseError):
+    pass
+
+
+class InsufficientFunds(PurchaseError):
+    pass
+
+
+def purchase_item(buyer, item_id, account_id):
+    """Buy a marketplace item, paying from one of the buyer's accounts.
+
+    Args:
+        buyer: The purchasing User
+        item_id: ID of the MarketplaceItem to buy
+        account_id: ID of the buyer's Account to pay from
+
+    Returns:
+        The MarketplaceTransaction recording the sale
+
+    Raises:
+        PurchaseError: If the item is unavailable, the account is not the
+            buyer's or its balance does not cover the price
+    """
+    for attempt in range(1, MAX_PURCHASE_ATTEMPTS + 1):
+        try:
+            return _purchase_once(buyer, item_id, account_id)
+        except OperationalError as e:
+            if e.args and e.args[0] in RETRYABLE_DB_ERRORS and attempt < MAX_PURCHASE_ATTEMPTS:
+                logger.warning(f"Purchase of item {item_id} hit lock conflict {e.args[0]}, retrying")
+                time.sleep(RETRY_BACKOFF * attempt)
+                continue
+            raise
+
+
+def _purchase_once(buyer, item_id, account_id):
+    with db_transaction.atomic():
+        # Item first, then account: every purchase locks in this order
+        item = MarketplaceItem.objects.select_for_update().filter(item_id=item_id).first()
+        if item is None:
+            raise ItemUnavailable("This item does not exist")
+        if item.status != 'available':
+            raise ItemUnavailable("This item is no longer available")
+        if item.seller_id == buyer.pk:
+            raise ItemUnavailable("You cannot buy your own item")
+
+        account = Account.objects.select_for_update().filter(account_id=account_id, user=buyer).first()
+        if account is None:
+            raise PurchaseError("Payment account not found")
+        if (account.balance or 0) < item.price:
+            raise InsufficientFunds(f"Insufficient funds in selected account. Available: {account.balance}")
+
+        Account.objects.filter(account_id=account.account_id).update(balance=F('balance') - item.price)
+        # update() skips the signal that drops the buyer's cached balances
+        db_transaction.on_commit(lambda: bump_user_data(buyer.pk))
+
+        item.status = 'sold'
+        item.buyer = buyer
+        item.save(update_fields=['status', 'buyer', 'updated_at'])
+
+        return MarketplaceTransaction.objects.create(
+            item=item,
+            buyer=buyer,
+            seller_id=item.seller_id,
+            amount=item.price
+        )
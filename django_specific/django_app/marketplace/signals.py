@@ -0,0 +1,17 @@
+from django.db import transaction as db_transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import invalidate_catalog
+from .models import MarketplaceItem
+
+
+@receiver(post_save, sender=MarketplaceItem)
+@receiver(post_delete, sender=MarketplaceItem)
+def item_changed(sender, instance, **kwargs):
+    """Invalidate the cached catalog once a listing or status change commits.
+
+    Invalidating before the commit would let a concurrent request re-cache
+    the old rows in the gap.
+    """
+    db_transaction.on_commit(invalidate_catalog)
@@ -1,3 +1,149 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import Account
+from users.models import User
+from .models import MarketplaceItem, MarketplaceTransaction
+from .catalog import (
+    CATALOG_PAGE_SIZE, catalog_page, catalog_page_for, paginate, purchases_queryset, sales_queryset,
+)
+from .services import InsufficientFunds, ItemUnavailable, PurchaseError, purchase_item
+
+
+class PurchaseItemTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create(username='seller', email='seller@example.com')
+        self.buyer = User.objects.create(username='buyer', email='buyer@example.com')
+        self.account = Account.objects.create(account_type='checking', balance=Decimal('150.00'),
+                                              currency_code='USD', user=self.buyer)
+        self.item = MarketplaceItem.objects.create(name='Lamp', price=Decimal('100.00'), seller=self.seller)
+
+    def test_purchase_marks_item_sold_and_debits_account(self):
+        sale = purchase_item(self.buyer, self.item.item_id, self.account.account_id)
+
+        self.item.refresh_from_db()
+        self.account.refresh_from_db()
+        self.assertEqual(sale.amount, Decimal('100.00'))
+        self.assertEqual((self.item.status, self.item.buyer_id), ('sold', self.buyer.pk))
+        self.assertEqual(self.account.balance, Decimal('50.00'))
+
+    def test_item_cannot_be_sold_twice(self):
+        purchase_item(self.buyer, self.item.item_id, self.account.account_id)
+        self.account.balance = Decimal('500.00')
+        self.account.save()
+
+        with self.assertRaises(ItemUnavailable):
+            purchase_item(self.buyer, self.item.item_id, self.account.account_id)
+        self.assertEqual(MarketplaceTransaction.objects.count(), 1)
+
+    def test_insufficient_funds_leave_item_available(self):
+        self.account.balance = Decimal('99.99')
+        self.account.save()
+
+        with self.assertRaises(InsufficientFunds):
+            purchase_item(self.buyer, self.item.item_id, self.account.account_id)
+
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.status, 'available')
+        self.assertFalse(MarketplaceTransaction.objects.exists())
+
+    def test_cannot_pay_from_someone_elses_account(self):
+        other = User.objects.create(username='other', email='other@example.com')
+        other_account = Account.objects.create(account_type='checking', balance=Decimal('1000.00'),
+                                               currency_code='USD', user=other)
+
+        with self.assertRaises(PurchaseError):
+            purchase_item(self.buyer, self.item.item_id, other_account.account_id)
+        other_account.refresh_from_db()
+        self.assertEqual(other_account.balance, Decimal('1000.00'))
+
+    def test_seller_cannot_buy_own_item(self):
+        account = Account.objects.create(account_type='checking', balance=Decimal('500.00'),
+                                         currency_code='USD', user=self.seller)
+
+        with self.assertRaises(ItemUnavailable):
+            purchase_item(self.seller, self.item.item_id, account.account_id)
+
+
+class CatalogQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sellers = [User.objects.create(username=f'seller{i}', email=f'seller{i}@example.com') for i in range(3)]
+        self.buyer = User.objects.create(username='buyer', email='buyer@example.com')
+        self.account = Account.objects.create(account_type='checking', balance=Decimal('100000.00'),
+                                              currency_code='USD', user=self.buyer)
+        MarketplaceItem.objects.bulk_create([
+            MarketplaceItem(name=f'Item {i}', price=Decimal('10.00'), seller=self.sellers[i % 3])
+            for i in range(CATALOG_PAGE_SIZE + 5)
+        ])
+
+    def test_catalog_page_does_not_query_per_item(self):
+        with self.assertNumQueries(2):  # count + page
+            page = catalog_page(1)
+            sellers = [item.seller.username for item in page]
+
+        self.assertEqual(len(sellers), CATALOG_PAGE_SIZE)
+        self.assertEqual(page.paginator.num_pages, 2)
+        self.assertEqual(len(catalog_page(2)), 5)
+
+    def test_catalog_page_is_served_from_cache(self):
+        catalog_page(1)
+
+        with self.assertNumQueries(0):
+            page = catalog_page(1)
+            [item.seller.username for item in page]
+            self.assertTrue(page.has_next())
+
+    def test_sale_invalidates_cached_catalog(self):
+        item = catalog_page(1)[0]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            purchase_item(self.buyer, item.item_id, self.account.account_id)
+
+        page = catalog_page(1)
+        self.assertNotIn(item.item_id, [i.item_id for i in page])
+        self.assertEqual(page.paginator.count, CATALOG_PAGE_SIZE + 4)
+
+    @mock.patch('marketplace.catalog.CATALOG_PAGE_SIZE', 4)
+    def test_catalog_pages_for_a_seller_leave_out_their_listings(self):
+        seller = self.sellers[0]
+        expected = [item.item_id for item in catalog_page(1).paginator.object_list if item.seller_id != seller.pk]
+        pages = [catalog_page_for(seller, number) for number in range(1, 7)]
+
+        self.assertEqual(len(expected), CATALOG_PAGE_SIZE + 5 - 10)
+        self.assertEqual([len(page) for page in pages[:5]], [4, 4, 4, 4, 3])
+        self.assertEqual([item.item_id for page in pages[:5] for item in page], expected)
+        self.assertEqual((pages[0].paginator.count, pages[0].paginator.num_pages), (len(expected), 5))
+        # Past the end falls back to the last page
+        self.assertEqual([item.item_id for item in pages[5]], [item.item_id for item in pages[4]])
+        # Buyers see the public catalog unchanged
+        self.assertEqual([item.item_id for item in catalog_page_for(self.buyer, 2)],
+                         [item.item_id for item in catalog_page(2)])
+
+    @mock.patch('marketplace.catalog.CATALOG_PAGE_SIZE', 4)
+    def test_catalog_pages_for_a_seller_reuse_the_cached_pages(self):
+        for number in range(1, 9):
+            catalog_page(number)
+
+        with self.assertNumQueries(1):  # The seller's listings
+            catalog_page_for(self.sellers[0], 1)
+        with self.assertNumQueries(2):  # And those ahead of the page
+            page = catalog_page_for(self.sellers[0], 3)
+            [item.seller.username for item in page]
+
+    def test_order_pages_do_not_query_per_order(self):
+        items = list(MarketplaceItem.objects.all()[:5])
+        for item in items:
+            purchase_item(self.buyer, item.item_id, self.account.account_id)
+
+        with self.assertNumQueries(2):  # count + page
+            page = paginate(purchases_queryset(self.buyer), 1, 20)
+            rows = [(tx.item.name, tx.seller.username, tx.amount) for tx in page]
+        self.assertEqual(len(rows), 5)
+
+        with self.assertNumQueries(2):
+            page = paginate(sales_queryset(self.sellers[0]), 1, 20)
+            [(tx.item.name, tx.buyer.username) for tx in page]
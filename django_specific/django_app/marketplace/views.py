@@ -1,18 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import transaction as db_transaction
-from decimal import Decimal
 
 from .models import MarketplaceItem, MarketplaceTransaction
-from accounts.models import Account
 from .forms import ListItemForm, PurchaseItemForm
+from .catalog import (
+    LISTINGS_PAGE_SIZE, ORDERS_PAGE_SIZE, catalog_page_for, listings_queryset,
+    paginate, purchases_queryset, sales_queryset,
+)
+from .services import PurchaseError, purchase_item
 
 @login_required
 def marketplace_home(request):
     """Home page for the marketplace."""
-    items = MarketplaceItem.objects.filter(status='available').exclude(seller=request.user)
-    my_listings = MarketplaceItem.objects.filter(seller=request.user)
+    items = catalog_page_for(request.user, request.GET.get('page'))
+    my_listings = paginate(listings_queryset(request.user), request.GET.get('listings_page'), LISTINGS_PAGE_SIZE)
     
     return render(request, 'marketplace/home.html', {
         'items': items,
@@ -22,7 +24,7 @@ def marketplace_home(request):
 @login_required
 def product_list(request):
     """View all available marketplace items."""
-    items = MarketplaceItem.objects.filter(status='available').exclude(seller=request.user)
+    items = catalog_page_for(request.user, request.GET.get('page'))
     return render(request, 'marketplace/product_list.html', {'items': items})
 
 @login_required
@@ -35,35 +37,14 @@ def product_detail(request, product_id):
         if form.is_valid():
             account = form.cleaned_data['account']
             
-            # Check if item is still available
-            if item.status != 'available':
-                messages.error(request, 'This item is no longer available')
+            # Availability and funds are checked under row locks, so two
+            # buyers can never both get the item
+            try:
+                purchase_item(request.user, item.item_id, account.account_id)
+            except PurchaseError as e:
+                messages.error(request, str(e))
                 return redirect('marketplace:product_detail', product_id=product_id)
             
-            # Check if user has sufficient funds
-            if account.balance < item.price:
-                messages.error(request, f'Insufficient funds in selected account. Available: {account.balance}')
-                return redirect('marketplace:product_detail', product_id=product_id)
-            
-            # Process the purchase
-            with db_transaction.atomic():
-                # Update the account balance
-                account.balance -= item.price
-                account.save()
-                
-                # Update the item status
-                item.status = 'sold'
-                item.buyer = request.user
-                item.save()
-                
-                # Create a marketplace transaction record
-                MarketplaceTransaction.objects.create(
-                    item=item,
-                    buyer=request.user,
-                    seller=item.seller,
-                    amount=item.price
-                )
-            
             messages.success(request, f'Successfully purchased {item.name} for {item.price}')
             return redirect('marketplace:orders')
     else:
@@ -77,8 +58,8 @@ def product_detail(request, product_id):
 @login_required
 def order_list(request):
     """View list of user's marketplace orders."""
-    purchases = MarketplaceTransaction.objects.filter(buyer=request.user).order_by('-timestamp')
-    sales = MarketplaceTransaction.objects.filter(seller=request.user).order_by('-timestamp')
+    purchases = paginate(purchases_queryset(request.user), request.GET.get('purchases_page'), ORDERS_PAGE_SIZE)
+    sales = paginate(sales_queryset(request.user), request.GET.get('sales_page'), ORDERS_PAGE_SIZE)
     
     return render(request, 'marketplace/order_list.html', {
         'purchases': purchases,
@@ -89,7 +70,7 @@ def order_list(request):
 def order_detail(request, order_id):
     """View details of a specific marketplace order."""
     transaction = get_object_or_404(
-        MarketplaceTransaction, 
+        MarketplaceTransaction.objects.select_related('item', 'seller'),
         transaction_id=order_id,
         buyer=request.user
     )
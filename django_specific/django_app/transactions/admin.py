@@ -1,11 +1,17 @@
 from django.contrib import admin
+from bankarstvo.admin_utils import LargeTableAdmin
 from .models import Transaction, SignedDocument, CryptoAsset, StockAsset
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
-    list_display = ('transaction_id', 'user', 'type', 'amount', 'date_posted', 'description')
-    list_filter = ('type', 'date_posted')
-    search_fields = ('user__username', 'description')
+class TransactionAdmin(LargeTableAdmin):
+    list_display = ('transaction_id', 'user', 'account', 'type', 'amount', 'date_posted', 'description')
+    list_filter = ('type',)
+    list_select_related = ('user', 'account')
+    search_id_fields = ('transaction_id', 'account_id')
+    search_fields = ('^user__username',)
+    date_hierarchy = 'date_posted'
+    ordering = ('-date_posted',)
+    raw_id_fields = ('user', 'account')
     readonly_fields = ('transaction_id', 'date_posted')
 
 @admin.register(SignedDocument)
@@ -13,6 +19,7 @@ class SignedDocumentAdmin(admin.ModelAdmin):
     list_display = ('document_id', 'user', 'document_type', 'timestamp', 'sender', 'receiver')
     list_filter = ('document_type', 'timestamp')
     search_fields = ('user__username', 'sender', 'receiver')
+    raw_id_fields = ('user', 'transaction')
     readonly_fields = ('document_id', 'timestamp')
 
 @admin.register(CryptoAsset)
@@ -0,0 +1,125 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction as db_transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import Account
+from bankarstvo.admin_utils import estimated_row_count
+from transactions.models import Transaction
+from users.models import User
+
+SEED_BATCH = 10000
+
+
+class Command(BaseCommand):
+    help = ('Seed the transactions table with --rows rows and time the admin changelist on it '
+            'against a plain COUNT(*). Run against a copy of the production database engine.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000000, help='Transactions to seed')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed loads per page')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows for later runs')
+        parser.add_argument('--baseline', action='store_true',
+                            help='Also time a stock ModelAdmin with the original list options')
+
+    def handle(self, *args, **options):
+        fixtures = self.create_fixtures(options['rows'])
+        try:
+            self.analyze()
+            self.report(fixtures, options['repeat'], options['baseline'])
+        finally:
+            if not options['keep']:
+                self.delete_fixtures(fixtures)
+
+    def create_fixtures(self, rows):
+        prefix = f"bench_{uuid.uuid4().hex[:8]}"
+        user = User.objects.create(username=prefix, email=f"{prefix}@example.com",
+                                   is_staff=True, is_superuser=True)
+        account = Account.objects.create(account_type='checking', balance=0, currency_code='USD', user=user)
+
+        # bulk_create skips the rollup and cache signals, which a benchmark does not need
+        start = timezone.now() - timedelta(days=5 * 365)
+        step = timedelta(days=5 * 365) / max(rows, 1)
+        seeded = time.perf_counter()
+        for offset in range(0, rows, SEED_BATCH):
+            with db_transaction.atomic():
+                Transaction.objects.bulk_create([
+                    Transaction(user=user, account=account, date_posted=start + step * i,
+                                description=f"{prefix} {i}", amount=1.0 if i % 2 else -1.0,
+                                type='deposit' if i % 2 else 'withdraw')
+                    for i in range(offset, min(offset + SEED_BATCH, rows))
+                ])
+            if offset and offset % (100 * SEED_BATCH) == 0:
+                self.stdout.write(f"  seeded {offset} rows")
+        self.stdout.write(f"Seeded {rows} transactions in {time.perf_counter() - seeded:.1f}s")
+        return {'user': user, 'account': account, 'year': (start + step * (rows // 2)).year}
+
+    def analyze(self):
+        """Refresh the table statistics the estimated count reads."""
+        table = connection.ops.quote_name(Transaction._meta.db_table)
+        statement = {'mysql': f"ANALYZE TABLE {table}", 'postgresql': f"ANALYZE {table}",
+                     'sqlite': "ANALYZE"}.get(connection.vendor)
+        if statement:
+            with connection.cursor() as cursor:
+                cursor.execute(statement)
+
+    def report(self, fixtures, repeat, baseline):
+        started = time.perf_counter()
+        total = Transaction.objects.count()
+        self.stdout.write(f"{'COUNT(*)':>28}: {(time.perf_counter() - started) * 1000:8.1f} ms "
+                          f"for {total} rows (estimate {estimated_row_count(Transaction)})")
+
+        admins = [('tuned', admin.site._registry[Transaction])]
+        if baseline:
+            stock = admin.ModelAdmin(Transaction, admin.site)
+            stock.list_display = ('transaction_id', 'user', 'type', 'amount', 'date_posted', 'description')
+            stock.list_filter = ('type', 'date_posted')
+            stock.search_fields = ('user__username', 'description')
+            stock.date_hierarchy = 'date_posted'
+            admins.append(('stock', stock))
+        factory = RequestFactory()
+        pages = [
+            ('first page', {}),
+            ('page 1000', {'p': '1000'}),
+            ('search by account', {'q': str(fixtures['account'].pk)}),
+            ('search by username prefix', {'q': fixtures['user'].username[:10]}),
+            ('year drill-down', {'date_posted__year': str(fixtures['year'])}),
+            ('filter by type', {'type__exact': 'deposit'}),
+        ]
+        for label, model_admin in admins:
+            self.stdout.write(f"{label} admin:")
+            for name, params in pages:
+                timings = []
+                for _ in range(repeat):
+                    request = factory.get('/admin/transactions/transaction/', params)
+                    request.user = fixtures['user']
+                    reset_queries()
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        response = model_admin.changelist_view(request)
+                        response.render()
+                        timings.append(time.perf_counter() - started)
+                self.stdout.write(f"{name:>28}: {min(timings) * 1000:8.1f} ms best of {repeat}, "
+                                  f"{len(queries)} queries, HTTP {response.status_code}")
+
+    def delete_fixtures(self, fixtures):
+        # Deleting through the ORM would load every seeded row to run its signals
+        table = connection.ops.quote_name(Transaction._meta.db_table)
+        with connection.cursor() as cursor:
+            while True:
+                with db_transaction.atomic():
+                    cursor.execute(
+                        f"DELETE FROM {table} WHERE transaction_id IN "
+                        f"(SELECT transaction_id FROM (SELECT transaction_id FROM {table} "
+                        f"WHERE account_id = %s LIMIT {SEED_BATCH * 10}) AS batch)",
+                        [fixtures['account'].pk])
+                    if cursor.rowcount <= 0:
+                        break
+        fixtures['account'].delete()
+        fixtures['user'].delete()
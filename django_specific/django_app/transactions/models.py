@@ -12,6 +12,9 @@ class Transaction(models.Model):
     transaction_id = models.AutoField(primary_key=True)
     date_posted = models.DateTimeField(default=timezone.now)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transactions')
+    # Flask rows belong to an account and carry signed amounts (withdrawals are negative)
+    account = models.ForeignKey('accounts.Account', on_delete=models.CASCADE, related_name='transactions',
+                                null=True, blank=True)
     description = models.CharField(max_length=100, null=True, blank=True)
     amount = models.FloatField()
     type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
@@ -22,6 +25,11 @@ class Transaction(models.Model):
     class Meta:
         db_table = 'transactions'  # Match the existing table name
         ordering = ['-date_posted']
+        indexes = [
+            # Created by the Flask migrations, which own this table
+            models.Index(fields=['account', 'date_posted'], name='ix_transactions_account_date'),
+            models.Index(fields=['date_posted'], name='ix_transactions_date_posted'),
+        ]
 
 class SignedDocument(models.Model):
     document_id = models.AutoField(primary_key=True)
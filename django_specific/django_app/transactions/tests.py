@@ -1,3 +1,63 @@
+from datetime import datetime
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Account
+from bankarstvo import admin_utils
+from bankarstvo.admin_utils import EstimatedCountPaginator
+from users.models import User
+from .models import Transaction
+
+
+def at(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class TransactionAdminTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create(username='root', email='root@example.com',
+                                              is_staff=True, is_superuser=True)
+        self.account = Account.objects.create(account_type='checking', balance=0, currency_code='USD',
+                                              user=self.admin_user)
+        Transaction.objects.bulk_create([
+            Transaction(user=self.admin_user, account=self.account, date_posted=at(2022 + i % 3, 1 + i % 12, 10),
+                        amount=1.0, type='deposit')
+            for i in range(30)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.client.force_login(self.admin_user)
+
+    def test_unfiltered_count_comes_from_table_statistics(self):
+        paginator = EstimatedCountPaginator(Transaction.objects.order_by('-date_posted'), 10)
+        with mock.patch.object(admin_utils, 'ESTIMATE_ABOVE', 10), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(paginator.count, 30)
+        self.assertNotIn('COUNT', ' '.join(query['sql'] for query in queries.captured_queries))
+
+    def test_filtered_count_is_capped(self):
+        paginator = EstimatedCountPaginator(Transaction.objects.filter(type='deposit'), 2)
+        with mock.patch.object(admin_utils, 'FILTERED_COUNT_CAP', 5):
+            self.assertEqual(paginator.count, 5)
+            self.assertEqual(paginator.num_pages, 3)
+
+    def test_changelist_avoids_table_scans(self):
+        url = reverse('admin:transactions_transaction_changelist')
+        for params in [{}, {'date_posted__year': '2023'}, {'q': str(self.account.pk)}, {'q': 'ro'}]:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            statements = ' '.join(query['sql'] for query in queries.captured_queries)
+            self.assertNotIn('DISTINCT', statements)
+            self.assertNotIn('MIN(', statements)
+            self.assertNotIn("LIKE '%", statements)
 
-# Create your tests here.
+        response = self.client.get(url, {'date_posted__year': '2023'})
+        # Every month between the first and the last posting of the year
+        self.assertContains(response, 'February 2023')
+        self.assertContains(response, 'March 2023')
+        self.assertContains(response, 'November 2023')
@@ -5,6 +5,7 @@ app_name = 'transactions'
 
 urlpatterns = [
     path('', views.transaction_history, name='history'),
+    path('async/', views.transaction_history_async, name='history_async'),
     path('deposit/', views.deposit, name='deposit'),
     path('withdraw/', views.withdraw, name='withdraw'),
     path('transfer/', views.transfer, name='transfer'),
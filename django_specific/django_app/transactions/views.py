@@ -9,6 +9,7 @@ from .models import Transaction, CryptoAsset, StockAsset
 from accounts.models import Account
 from .forms import DepositForm, WithdrawForm, TransferForm
 from users.models import User
+from bankarstvo.async_utils import arender, async_login_required
 
 @login_required
 def transaction_history(request):
@@ -16,6 +17,12 @@ def transaction_history(request):
     transactions = Transaction.objects.filter(user=request.user).order_by('-date_posted')
     return render(request, 'transaction_history.html', {'transactions': transactions})
 
+@async_login_required
+async def transaction_history_async(request):
+    """Async transaction history, read with the async ORM."""
+    transactions = [t async for t in Transaction.objects.filter(user=request.user).order_by('-date_posted')]
+    return await arender(request, 'transaction_history.html', {'transactions': transactions})
+
 @login_required
 def deposit(request):
     """Handle deposit operation."""
@@ -35,6 +42,7 @@ def deposit(request):
                 # Create transaction record
                 transaction_record = Transaction.objects.create(
                     user=request.user,
+                    account=account,
                     amount=amount,
                     description=description,
                     type='deposit'
@@ -77,7 +85,8 @@ def withdraw(request):
                 # Create transaction record
                 transaction_record = Transaction.objects.create(
                     user=request.user,
-                    amount=amount,
+                    account=account,
+                    amount=-amount,  # Negative amount for withdrawal
                     description=description,
                     type='withdraw'
                 )
@@ -121,9 +130,17 @@ def transfer(request):
             
             # Create the transaction and update account balances
             with transaction.atomic():
-                # Create transaction record
+                # Create one transaction record per account
                 transaction_record = Transaction.objects.create(
                     user=request.user,
+                    account=from_account,
+                    amount=-amount,  # Negative amount for sender
+                    description=description,
+                    type='transfer'
+                )
+                Transaction.objects.create(
+                    user=request.user,
+                    account=to_account,
                     amount=amount,
                     description=description,
                     type='transfer'
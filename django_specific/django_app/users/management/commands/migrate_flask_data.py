@@ -1,14 +1,19 @@
+import json
 import os
-import sys
 import logging
-from django.core.management.base import BaseCommand
-from django.db import connection, transaction
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timezone as dt_timezone
 from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from users.models import User
 from accounts.models import Account, Loan, Payment
+from accounts.statements import rebuild_rollups
 from transactions.models import Transaction, SignedDocument, CryptoAsset, StockAsset
 from marketplace.models import MarketplaceItem, MarketplaceTransaction
-from django.contrib.auth.hashers import make_password
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -18,6 +23,74 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
+# Rows read from the Flask database and committed to Django per chunk
+CHUNK_SIZE = 5000
+
+# Rows per INSERT statement within a chunk
+BATCH_SIZE = 1000
+
+DEFAULT_WORKERS = 4
+DEFAULT_CHECKPOINT = 'migrate_flask_data.checkpoint.json'
+
+# Tables in one stage only depend on tables of earlier stages, so each
+# stage's tables are migrated in parallel
+STAGES = (
+    ('user',),
+    ('accounts', 'crypto_assets', 'stock_assets', 'marketplace_items', 'loans'),
+    ('transactions', 'marketplace_transactions', 'payments'),
+    ('signed_documents',),
+)
+
+
+def aware(value):
+    """Flask stores naive UTC datetimes, which SQLite returns as strings"""
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value is not None and settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+class Checkpoint:
+    """
+    Per-table migration progress, saved to a JSON file after every chunk
+
+    Each table records the last Flask primary key committed to Django, so
+    a restarted migration resumes after it. A chunk committed just before
+    a crash, but not yet checkpointed, is skipped as already present.
+    """
+
+    def __init__(self, path, restart=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {}
+        if restart and os.path.exists(path):
+            os.remove(path)
+        elif os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def table(self, name):
+        return self.state.get(name, {'last_id': 0, 'rows': 0, 'done': False})
+
+    def advance(self, name, last_id, rows):
+        with self.lock:
+            progress = self.table(name)
+            self.state[name] = {'last_id': last_id, 'rows': progress['rows'] + rows, 'done': False}
+            self._save()
+
+    def finish(self, name):
+        with self.lock:
+            self.state[name] = dict(self.table(name), done=True)
+            self._save()
+
+    def _save(self):
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(temporary, self.path)
+
+
 class Command(BaseCommand):
     help = 'Migrates data from Flask SQLAlchemy database to Django'
 
@@ -27,355 +100,334 @@ class Command(BaseCommand):
             type=str,
             help='URI of the Flask database to migrate from. If not provided, will use the DATABASE_URI env variable.',
         )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help=f'Rows streamed and committed per chunk (default {CHUNK_SIZE})')
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                            help=f'Tables migrated in parallel (default {DEFAULT_WORKERS})')
+        parser.add_argument('--checkpoint', type=str, default=DEFAULT_CHECKPOINT,
+                            help=f'Progress file used to resume an interrupted migration (default {DEFAULT_CHECKPOINT})')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the progress file and start from the beginning')
 
     def handle(self, *args, **options):
         try:
             flask_db_uri = options['flask_db_uri'] or os.environ.get('SQLALCHEMY_DATABASE_URI')
-            
+
             if not flask_db_uri:
                 self.stderr.write(self.style.ERROR('No Flask database URI provided. Set --flask-db-uri or DATABASE_URI env variable.'))
                 return
-                
+
             self.stdout.write(self.style.SUCCESS(f'Starting migration from {flask_db_uri}'))
-            
+
             # Import SQLAlchemy and setup Flask database connection
             try:
-                from sqlalchemy import create_engine
-                from sqlalchemy.orm import sessionmaker
-                
-                engine = create_engine(flask_db_uri)
-                Session = sessionmaker(bind=engine)
-                flask_session = Session()
-                
+                from sqlalchemy import create_engine, inspect
+
+                self.engine = create_engine(flask_db_uri, pool_size=options['workers'] + 1)
+                self.flask_tables = set(inspect(self.engine).get_table_names())
+
                 self.stdout.write(self.style.SUCCESS('Successfully connected to Flask database'))
             except Exception as e:
                 self.stderr.write(self.style.ERROR(f'Failed to connect to Flask database: {e}'))
                 return
-            
-            # Start a transaction for all Django operations
-            with transaction.atomic():
-                # 1. Migrate users
-                self.migrate_users(flask_session)
-                
-                # 2. Migrate accounts
-                self.migrate_accounts(flask_session)
-                
-                # 3. Migrate transactions
-                self.migrate_transactions(flask_session)
-                
-                # 4. Migrate crypto and stock assets
-                self.migrate_assets(flask_session)
-                
-                # 5. Migrate marketplace items and transactions
-                self.migrate_marketplace(flask_session)
-                
-                # 6. Migrate loans and payments
-                self.migrate_loans(flask_session)
-            
+
+            self.chunk_size = options['chunk_size']
+            self.checkpoint = Checkpoint(options['checkpoint'], restart=options['restart'])
+            if any(progress['rows'] for progress in self.checkpoint.state.values()):
+                self.stdout.write(f"Resuming from {options['checkpoint']}")
+
+            for stage, tables in enumerate(STAGES):
+                if stage == 1:
+                    # Later tables reference users and accounts by Flask ID
+                    self.user_map = self.build_user_map()
+                    self.account_users = self.build_account_user_map()
+                with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                    # Re-raise the first failure once the stage's other tables finish
+                    for future in [executor.submit(self.migrate_table, table) for table in tables]:
+                        future.result()
+
+            # Bulk inserts skip the signals that keep statement rollups current
+            self.stdout.write(f'Rebuilt {rebuild_rollups()} monthly account rollups')
             self.stdout.write(self.style.SUCCESS('Data migration completed successfully'))
-            
+
         except Exception as e:
             logger.error(f"Migration failed: {e}", exc_info=True)
             self.stderr.write(self.style.ERROR(f'Migration failed: {e}'))
-    
-    def migrate_users(self, flask_session):
-        """Migrate users from Flask to Django"""
+
+    def migrate_table(self, table):
+        """
+        Stream one Flask table in primary key order from its checkpoint and
+        bulk insert each chunk into Django in its own transaction
+        """
         from sqlalchemy import text
-        
-        self.stdout.write('Migrating users...')
-        # Get all users from Flask database
-        flask_users = flask_session.execute(text('SELECT * FROM user')).fetchall()
-        
-        count = 0
-        for flask_user in flask_users:
-            # Check if user already exists
-            if not User.objects.filter(username=flask_user.username).exists():
-                # Create new Django user from Flask user
-                user = User(
-                    username=flask_user.username,
-                    email=flask_user.email,
-                    password=flask_user.password_hash,  # Django will expect a hashed password
-                    two_factor_auth=flask_user.two_factor_auth if hasattr(flask_user, 'two_factor_auth') else False,
-                    two_factor_auth_code=flask_user.two_factor_auth_code if hasattr(flask_user, 'two_factor_auth_code') else None,
-                    two_factor_auth_expiry=flask_user.two_factor_auth_expiry if hasattr(flask_user, 'two_factor_auth_expiry') else None,
-                    two_factor_auth_secret=flask_user.two_factor_auth_secret if hasattr(flask_user, 'two_factor_auth_secret') else None,
-                    account_created=flask_user.account_created if hasattr(flask_user, 'account_created') else None,
-                    last_login=flask_user.last_login if hasattr(flask_user, 'last_login') else None,
+
+        model, pk, build = {
+            'user': (User, 'user_id', self.build_users),
+            'accounts': (Account, 'account_id', self.build_accounts),
+            'transactions': (Transaction, 'transaction_id', self.build_transactions),
+            'signed_documents': (SignedDocument, 'document_id', self.build_signed_documents),
+            'crypto_assets': (CryptoAsset, 'asset_id', self.build_crypto_assets),
+            'stock_assets': (StockAsset, 'asset_id', self.build_stock_assets),
+            'marketplace_items': (MarketplaceItem, 'item_id', self.build_marketplace_items),
+            'marketplace_transactions': (MarketplaceTransaction, 'transaction_id', self.build_marketplace_transactions),
+            'loans': (Loan, 'loan_id', self.build_loans),
+            'payments': (Payment, 'payment_id', self.build_payments),
+        }[table]
+
+        progress = self.checkpoint.table(table)
+        if progress['done']:
+            self.stdout.write(f"{table}: already migrated ({progress['rows']} rows)")
+            return
+        if table not in self.flask_tables:
+            self.stdout.write(self.style.WARNING(f'{table}: not in the Flask database, skipping'))
+            return
+
+        self.stdout.write(f'Migrating {table}...')
+        quote = self.engine.dialect.identifier_preparer.quote
+        query = text(f'SELECT * FROM {quote(table)} WHERE {pk} > :after ORDER BY {pk}')
+        created = skipped = 0
+        try:
+            with self.engine.connect() as conn:
+                # Server-side cursor: rows are fetched as they are consumed
+                result = conn.execution_options(stream_results=True, max_row_buffer=self.chunk_size).execute(
+                    query, {'after': progress['last_id']}
                 )
-                user.save()
-                count += 1
-        
-        self.stdout.write(self.style.SUCCESS(f'Migrated {count} users'))
-    
-    def migrate_accounts(self, flask_session):
-        """Migrate accounts from Flask to Django"""
-        from sqlalchemy import text
-        
-        self.stdout.write('Migrating accounts...')
-        # Get all accounts from Flask database
-        flask_accounts = flask_session.execute(text('SELECT * FROM accounts')).fetchall()
-        
-        count = 0
-        for flask_account in flask_accounts:
-            # Get the Django user for this account
-            try:
-                user = User.objects.get(id=flask_account.user_id)
-                
-                # Check if account already exists
-                if not Account.objects.filter(account_id=flask_account.account_id).exists():
-                    # Create new Django account from Flask account
-                    account = Account(
-                        account_id=flask_account.account_id,
-                        account_type=flask_account.account_type,
-                        balance=flask_account.balance,
-                        currency_code=flask_account.currency_code,
-                        user=user
-                    )
-                    account.save()
-                    count += 1
-            except User.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f'User with ID {flask_account.user_id} not found, skipping account'))
-        
-        self.stdout.write(self.style.SUCCESS(f'Migrated {count} accounts'))
-    
-    def migrate_transactions(self, flask_session):
-        """Migrate transactions from Flask to Django"""
-        from sqlalchemy import text
-        
-        self.stdout.write('Migrating transactions...')
-        # Get all transactions from Flask database
-        flask_transactions = flask_session.execute(text('SELECT * FROM transactions')).fetchall()
-        
-        count = 0
-        for flask_tx in flask_transactions:
-            # Get the Django user for this transaction
-            try:
-                user = User.objects.get(id=flask_tx.user_id)
-                
-                # Check if transaction already exists
-                if not Transaction.objects.filter(transaction_id=flask_tx.transaction_id).exists():
-                    # Create new Django transaction from Flask transaction
-                    tx = Transaction(
-                        transaction_id=flask_tx.transaction_id,
-                        date_posted=flask_tx.date_posted,
-                        user=user,
-                        description=flask_tx.description,
-                        amount=flask_tx.amount,
-                        type=flask_tx.type
-                    )
-                    tx.save()
-                    count += 1
-            except User.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f'User with ID {flask_tx.user_id} not found, skipping transaction'))
-        
-        self.stdout.write(self.style.SUCCESS(f'Migrated {count} transactions'))
-        
-        # Migrate signed documents
-        self.stdout.write('Migrating signed documents...')
-        flask_documents = flask_session.execute(text('SELECT * FROM signed_documents')).fetchall()
-        
-        count = 0
-        for flask_doc in flask_documents:
-            try:
-                user = User.objects.get(id=flask_doc.user_id)
-                transaction = None
-                
-                if flask_doc.transaction_id:
-                    try:
-                        transaction = Transaction.objects.get(transaction_id=flask_doc.transaction_id)
-                    except Transaction.DoesNotExist:
-                        pass
-                
-                if not SignedDocument.objects.filter(document_id=flask_doc.document_id).exists():
-                    doc = SignedDocument(
-                        document_id=flask_doc.document_id,
-                        user=user,
-                        transaction=transaction,
-                        timestamp=flask_doc.timestamp,
-                        document_type=flask_doc.document_type,
-                        additional_info=flask_doc.additional_info,
-                        sender=flask_doc.sender,
-                        receiver=flask_doc.receiver,
-                        image_data=flask_doc.image_data
-                    )
-                    doc.save()
-                    count += 1
-            except User.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f'User with ID {flask_doc.user_id} not found, skipping document'))
-        
-        self.stdout.write(self.style.SUCCESS(f'Migrated {count} signed documents'))
-    
-    def migrate_assets(self, flask_session):
-        """Migrate crypto and stock assets from Flask to Django"""
-        from sqlalchemy import text
-        
-        # Migrate crypto assets
-        self.stdout.write('Migrating crypto assets...')
-        flask_crypto = flask_session.execute(text('SELECT * FROM crypto_assets')).fetchall()
-        
-        crypto_count = 0
-        for flask_asset in flask_crypto:
-            try:
-                user = User.objects.get(id=flask_asset.user_id)
-                
-                if not CryptoAsset.objects.filter(asset_id=flask_asset.asset_id).exists():
-                    asset = CryptoAsset(
-                        asset_id=flask_asset.asset_id,
-                        name=flask_asset.name,
-                        symbol=flask_asset.symbol,
-                        user=user,
-                        balance=flask_asset.balance
-                    )
-                    asset.save()
-                    crypto_count += 1
-            except User.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f'User with ID {flask_asset.user_id} not found, skipping crypto asset'))
-        
-        self.stdout.write(self.style.SUCCESS(f'Migrated {crypto_count} crypto assets'))
-        
-        # Migrate stock assets
-        self.stdout.write('Migrating stock assets...')
-        flask_stocks = flask_session.execute(text('SELECT * FROM stock_assets')).fetchall()
-        
-        stock_count = 0
-        for flask_asset in flask_stocks:
-            try:
-                user = User.objects.get(id=flask_asset.user_id)
-                
-                if not StockAsset.objects.filter(asset_id=flask_asset.asset_id).exists():
-                    asset = StockAsset(
-                        asset_id=flask_asset.asset_id,
-                        name=flask_asset.name,
-                        symbol=flask_asset.symbol,
-                        user=user,
-                        shares=flask_asset.shares
-                    )
-                    asset.save()
-                    stock_count += 1
-            except User.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f'User with ID {flask_asset.user_id} not found, skipping stock asset'))
-        
-        self.stdout.write(self.style.SUCCESS(f'Migrated {stock_count} stock assets'))
-    
-    def migrate_marketplace(self, flask_session):
-        """Migrate marketplace items and transactions from Flask to Django"""
+                for rows in result.mappings().partitions(self.chunk_size):
+                    objects, chunk_skipped = build(rows)
+                    with transaction.atomic():
+                        model.objects.bulk_create(objects, batch_size=BATCH_SIZE, ignore_conflicts=True)
+                    self.checkpoint.advance(table, rows[-1][pk], len(rows))
+                    created += len(objects)
+                    skipped += chunk_skipped
+            self.checkpoint.finish(table)
+        finally:
+            # Worker threads each hold their own Django connection
+            connections.close_all()
+
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'{table}: skipped {skipped} rows with missing references'))
+        self.stdout.write(self.style.SUCCESS(f'Migrated {created} rows of {table}'))
+
+    def build_user_map(self):
+        """Map every Flask user_id to the ID of the Django user with the same username"""
         from sqlalchemy import text
-        
-        # Migrate marketplace items
-        self.stdout.write('Migrating marketplace items...')
-        flask_items = flask_session.execute(text('SELECT * FROM marketplace_items')).fetchall()
-        
-        item_count = 0
-        for flask_item in flask_items:
-            try:
-                seller = User.objects.get(id=flask_item.seller_id)
-                buyer = None
-                
-                if flask_item.buyer_id:
-                    try:
-                        buyer = User.objects.get(id=flask_item.buyer_id)
-                    except User.DoesNotExist:
-                        pass
-                
-                if not MarketplaceItem.objects.filter(item_id=flask_item.item_id).exists():
-                    item = MarketplaceItem(
-                        item_id=flask_item.item_id,
-                        name=flask_item.name,
-                        description=flask_item.description,
-                        price=flask_item.price,
-                        seller=seller,
-                        buyer=buyer,
-                        status=flask_item.status
-                    )
-                    item.save()
-                    item_count += 1
-            except User.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f'User with ID {flask_item.seller_id} not found, skipping marketplace item'))
-        
-        self.stdout.write(self.style.SUCCESS(f'Migrated {item_count} marketplace items'))
-        
-        # Migrate marketplace transactions
-        self.stdout.write('Migrating marketplace transactions...')
-        flask_transactions = flask_session.execute(text('SELECT * FROM marketplace_transactions')).fetchall()
-        
-        transaction_count = 0
-        for flask_tx in flask_transactions:
-            try:
-                buyer = User.objects.get(id=flask_tx.buyer_id)
-                seller = User.objects.get(id=flask_tx.seller_id)
-                
-                try:
-                    item = MarketplaceItem.objects.get(item_id=flask_tx.item_id)
-                    
-                    if not MarketplaceTransaction.objects.filter(transaction_id=flask_tx.transaction_id).exists():
-                        tx = MarketplaceTransaction(
-                            transaction_id=flask_tx.transaction_id,
-                            item=item,
-                            buyer=buyer,
-                            seller=seller,
-                            timestamp=flask_tx.timestamp,
-                            amount=flask_tx.amount
-                        )
-                        tx.save()
-                        transaction_count += 1
-                except MarketplaceItem.DoesNotExist:
-                    self.stdout.write(self.style.WARNING(f'Item with ID {flask_tx.item_id} not found, skipping marketplace transaction'))
-            except User.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f'User not found, skipping marketplace transaction'))
-        
-        self.stdout.write(self.style.SUCCESS(f'Migrated {transaction_count} marketplace transactions'))
-    
-    def migrate_loans(self, flask_session):
-        """Migrate loans and payments from Flask to Django"""
+
+        user_map = {}
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(
+                text(f"SELECT user_id, username FROM {self.engine.dialect.identifier_preparer.quote('user')}")
+            )
+            for rows in result.partitions(self.chunk_size):
+                django_ids = dict(User.objects.filter(username__in=[row.username for row in rows])
+                                  .values_list('username', 'id'))
+                for row in rows:
+                    if row.username in django_ids:
+                        user_map[row.user_id] = django_ids[row.username]
+        return user_map
+
+    def build_account_user_map(self):
+        """Map every Flask account_id to the Django ID of its owner"""
         from sqlalchemy import text
-        
-        # Migrate loans
-        self.stdout.write('Migrating loans...')
-        flask_loans = flask_session.execute(text('SELECT * FROM loans')).fetchall()
-        
-        loan_count = 0
-        for flask_loan in flask_loans:
-            try:
-                user = User.objects.get(id=flask_loan.user_id)
-                
-                if not Loan.objects.filter(loan_id=flask_loan.loan_id).exists():
-                    loan = Loan(
-                        loan_id=flask_loan.loan_id,
-                        user=user,
-                        amount=flask_loan.amount,
-                        interest_rate=flask_loan.interest_rate,
-                        term=flask_loan.term,
-                        start_date=flask_loan.start_date,
-                        end_date=flask_loan.end_date,
-                        status=flask_loan.status
-                    )
-                    loan.save()
-                    loan_count += 1
-            except User.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f'User with ID {flask_loan.user_id} not found, skipping loan'))
-        
-        self.stdout.write(self.style.SUCCESS(f'Migrated {loan_count} loans'))
-        
-        # Migrate payments
-        self.stdout.write('Migrating payments...')
-        flask_payments = flask_session.execute(text('SELECT * FROM payments')).fetchall()
-        
-        payment_count = 0
-        for flask_payment in flask_payments:
-            try:
-                loan = Loan.objects.get(loan_id=flask_payment.loan_id)
-                
-                if not Payment.objects.filter(payment_id=flask_payment.payment_id).exists():
-                    payment = Payment(
-                        payment_id=flask_payment.payment_id,
-                        loan=loan,
-                        amount=flask_payment.amount,
-                        payment_date=flask_payment.payment_date,
-                        status=flask_payment.status
-                    )
-                    payment.save()
-                    payment_count += 1
-            except Loan.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f'Loan with ID {flask_payment.loan_id} not found, skipping payment'))
-        
-        self.stdout.write(self.style.SUCCESS(f'Migrated {payment_count} payments'))
\ No newline at end of file
+
+        if 'accounts' not in self.flask_tables:
+            return {}
+        account_users = {}
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(text('SELECT account_id, user_id FROM accounts'))
+            for rows in result.partitions(self.chunk_size):
+                for row in rows:
+                    if row.user_id in self.user_map:
+                        account_users[row.account_id] = self.user_map[row.user_id]
+        return account_users
+
+    def existing(self, model, ids):
+        """Primary keys among ids already present in Django, one query per chunk"""
+        return set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+
+    def build_users(self, rows):
+        """Users are matched by username; Django assigns their IDs"""
+        present = set(User.objects.filter(username__in=[row['username'] for row in rows])
+                      .values_list('username', flat=True))
+        users = [
+            User(
+                username=row['username'],
+                email=row['email'],
+                password=row['password_hash'],  # Django will expect a hashed password
+                two_factor_auth=row.get('two_factor_auth') or False,
+                two_factor_auth_code=row.get('two_factor_auth_code'),
+                two_factor_auth_expiry=aware(row.get('two_factor_auth_expiry')),
+                two_factor_auth_secret=row.get('two_factor_auth_secret'),
+                account_created=aware(row.get('account_created')) or timezone.now(),
+                last_login=aware(row.get('last_login')),
+            )
+            for row in rows if row['username'] not in present
+        ]
+        return users, 0
+
+    def build_accounts(self, rows):
+        present = self.existing(Account, [row['account_id'] for row in rows])
+        accounts, skipped = [], 0
+        for row in rows:
+            if row['account_id'] in present:
+                continue
+            if row['user_id'] not in self.user_map:
+                skipped += 1
+                continue
+            accounts.append(Account(
+                account_id=row['account_id'],
+                account_type=row['account_type'],
+                balance=row['balance'],
+                currency_code=row['currency_code'],
+                user_id=self.user_map[row['user_id']]
+            ))
+        return accounts, skipped
+
+    def build_transactions(self, rows):
+        """Flask transactions belong to an account; Django ones also to its owner"""
+        present = self.existing(Transaction, [row['transaction_id'] for row in rows])
+        transactions, skipped = [], 0
+        for row in rows:
+            if row['transaction_id'] in present:
+                continue
+            user_id = self.account_users.get(row['account_id'])
+            if user_id is None:
+                skipped += 1
+                continue
+            transactions.append(Transaction(
+                transaction_id=row['transaction_id'],
+                date_posted=aware(row['date_posted']),
+                user_id=user_id,
+                account_id=row['account_id'],
+                description=row['description'],
+                amount=row['amount'],
+                type=row['type']
+            ))
+        return transactions, skipped
+
+    def build_signed_documents(self, rows):
+        present = self.existing(SignedDocument, [row['document_id'] for row in rows])
+        migrated = self.existing(Transaction, [row['transaction_id'] for row in rows if row['transaction_id']])
+        documents, skipped = [], 0
+        for row in rows:
+            if row['document_id'] in present:
+                continue
+            if row['user_id'] not in self.user_map:
+                skipped += 1
+                continue
+            documents.append(SignedDocument(
+                document_id=row['document_id'],
+                user_id=self.user_map[row['user_id']],
+                transaction_id=row['transaction_id'] if row['transaction_id'] in migrated else None,
+                timestamp=aware(row['timestamp']),
+                document_type=row['document_type'],
+                additional_info=row['additional_info'],
+                sender=row.get('sender') or '',
+                receiver=row.get('receiver') or '',
+                image_data=row.get('image_data') or ''
+            ))
+        return documents, skipped
+
+    def build_assets(self, model, rows, quantity_field):
+        present = self.existing(model, [row['asset_id'] for row in rows])
+        assets, skipped = [], 0
+        for row in rows:
+            if row['asset_id'] in present:
+                continue
+            if row['user_id'] not in self.user_map:
+                skipped += 1
+                continue
+            assets.append(model(
+                asset_id=row['asset_id'],
+                name=row['name'],
+                symbol=row['symbol'],
+                user_id=self.user_map[row['user_id']],
+                **{quantity_field: row[quantity_field]}
+            ))
+        return assets, skipped
+
+    def build_crypto_assets(self, rows):
+        return self.build_assets(CryptoAsset, rows, 'balance')
+
+    def build_stock_assets(self, rows):
+        return self.build_assets(StockAsset, rows, 'shares')
+
+    def build_marketplace_items(self, rows):
+        present = self.existing(MarketplaceItem, [row['item_id'] for row in rows])
+        items, skipped = [], 0
+        for row in rows:
+            if row['item_id'] in present:
+                continue
+            if row['seller_id'] not in self.user_map:
+                skipped += 1
+                continue
+            items.append(MarketplaceItem(
+                item_id=row['item_id'],
+                name=row['name'],
+                description=row['description'],
+                price=row['price'],
+                seller_id=self.user_map[row['seller_id']],
+                buyer_id=self.user_map.get(row['buyer_id']),
+                status=row['status']
+            ))
+        return items, skipped
+
+    def build_marketplace_transactions(self, rows):
+        present = self.existing(MarketplaceTransaction, [row['transaction_id'] for row in rows])
+        items = self.existing(MarketplaceItem, [row['item_id'] for row in rows])
+        sales, skipped = [], 0
+        for row in rows:
+            if row['transaction_id'] in present:
+                continue
+            if (row['item_id'] not in items or row['buyer_id'] not in self.user_map
+                    or row['seller_id'] not in self.user_map):
+                skipped += 1
+                continue
+            sales.append(MarketplaceTransaction(
+                transaction_id=row['transaction_id'],
+                item_id=row['item_id'],
+                buyer_id=self.user_map[row['buyer_id']],
+                seller_id=self.user_map[row['seller_id']],
+                timestamp=aware(row['timestamp']),
+                amount=row['amount']
+            ))
+        return sales, skipped
+
+    def build_loans(self, rows):
+        present = self.existing(Loan, [row['loan_id'] for row in rows])
+        loans, skipped = [], 0
+        for row in rows:
+            if row['loan_id'] in present:
+                continue
+            if row['user_id'] not in self.user_map:
+                skipped += 1
+                continue
+            loans.append(Loan(
+                loan_id=row['loan_id'],
+                user_id=self.user_map[row['user_id']],
+                amount=row['amount'],
+                interest_rate=row['interest_rate'],
+                term=row['term'],
+                start_date=aware(row['start_date']),
+                end_date=aware(row['end_date']),
+                status=row['status']
+            ))
+        return loans, skipped
+
+    def build_payments(self, rows):
+        present = self.existing(Payment, [row['payment_id'] for row in rows])
+        loans = self.existing(Loan, [row['loan_id'] for row in rows])
+        payments, skipped = [], 0
+        for row in rows:
+            if row['payment_id'] in present:
+                continue
+            if row['loan_id'] not in loans:
+                skipped += 1
+                continue
+            payments.append(Payment(
+                payment_id=row['payment_id'],
+                loan_id=row['loan_id'],
+                amount=row['amount'],
+                payment_date=aware(row['payment_date']),
+                status=row['status']
+            ))
+        return payments, skipped
@@ -1,3 +1,88 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from accounts.models import Account
+from transactions.models import Transaction
+from users.models import User
+
+
+FLASK_SCHEMA = (
+    'CREATE TABLE user (user_id INTEGER PRIMARY KEY, username VARCHAR(255), email VARCHAR(128), '
+    'password_hash VARCHAR(255), account_created DATETIME)',
+    'CREATE TABLE accounts (account_id INTEGER PRIMARY KEY, account_type VARCHAR(255), balance NUMERIC(20, 2), '
+    'currency_code VARCHAR(3), user_id INTEGER)',
+    'CREATE TABLE transactions (transaction_id INTEGER PRIMARY KEY, date_posted DATETIME, account_id INTEGER, '
+    'description VARCHAR(100), amount FLOAT, type VARCHAR(10), recipient_account_id INTEGER)',
+)
+
+
+class MigrateFlaskDataTests(TransactionTestCase):
+    """Streams a small Flask SQLite database through migrate_flask_data."""
+
+    def setUp(self):
+        from sqlalchemy import create_engine, text
+
+        self.directory = tempfile.mkdtemp()
+        self.checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        self.uri = f"sqlite:///{os.path.join(self.directory, 'flask.db')}"
+        engine = create_engine(self.uri)
+        with engine.begin() as conn:
+            for statement in FLASK_SCHEMA:
+                conn.execute(text(statement))
+            conn.execute(text("INSERT INTO user VALUES (10, 'alice', 'alice@example.com', 'hash', NULL), "
+                              "(20, 'bob', 'bob@example.com', 'hash', '2024-01-01 00:00:00')"))
+            conn.execute(text("INSERT INTO accounts VALUES (1, 'checking', 100.00, 'USD', 10), "
+                              "(2, 'checking', 50.00, 'EUR', 20), (3, 'checking', 5.00, 'USD', 99)"))
+            conn.execute(text('INSERT INTO transactions VALUES (:id, :date, :account, :description, 1.5, :type, NULL)'), [
+                {'id': i, 'date': '2024-01-01 00:00:00', 'account': 1 if i % 2 else 2,
+                 'description': f'tx {i}', 'type': 'deposit'}
+                for i in range(1, 26)
+            ] + [{'id': 26, 'date': '2024-01-01 00:00:00', 'account': 3, 'description': 'orphan', 'type': 'deposit'}])
+        engine.dispose()
+
+        # Bob already exists in Django under another ID
+        self.bob = User.objects.create(username='bob', email='bob@example.com', password='hash')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def migrate(self, **options):
+        call_command('migrate_flask_data', flask_db_uri=self.uri, checkpoint=self.checkpoint,
+                     chunk_size=10, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def test_migrates_and_maps_ids(self):
+        self.migrate(workers=2)
+
+        alice = User.objects.get(username='alice')
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Account.objects.get(account_id=1).user_id, alice.id)
+        self.assertEqual(Account.objects.get(account_id=2).user_id, self.bob.id)
+        self.assertEqual(Account.objects.get(account_id=2).balance, Decimal('50.00'))
+        self.assertFalse(Account.objects.filter(account_id=3).exists())
+        self.assertEqual(Transaction.objects.filter(user=alice).count(), 13)
+        self.assertEqual(Transaction.objects.filter(user=self.bob).count(), 12)
+
+        with open(self.checkpoint) as f:
+            progress = json.load(f)
+        self.assertEqual(progress['transactions'], {'last_id': 26, 'rows': 26, 'done': True})
+
+    def test_resumes_after_checkpoint(self):
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'transactions': {'last_id': 20, 'rows': 20, 'done': False}}, f)
+
+        self.migrate(workers=1)
+        self.assertEqual(sorted(Transaction.objects.values_list('transaction_id', flat=True)), [21, 22, 23, 24, 25])
+
+        # Finished tables are not read again; --restart starts over
+        Transaction.objects.all().delete()
+        self.migrate(workers=1)
+        self.assertEqual(Transaction.objects.count(), 0)
+        self.migrate(workers=1, restart=True)
+        self.assertEqual(Transaction.objects.count(), 25)
@@ -0,0 +1,7 @@
+# grpc_client package
+#
+# Clients for the banking gRPC services sharing pooled channels, see
+# grpc_client.client for usage.
+from grpc_client.channels import ChannelPool, build_service_config, default_pool
+from grpc_client.client import AccountClient, ServiceClient, TransactionClient, UserClient
+from grpc_client.hedging import HedgingPolicy
@@ -0,0 +1,104 @@
+"""
+Coalescing of GetBalance calls into GetBalances.
+
+Pages and jobs often look up many balances at once from several threads.
+Each lookup made through a BalanceBatcher waits for a short window; every
+lookup for the same user made in that window is sent as one GetBalances
+call, which the server resolves with a single query.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+from proto import account_service_pb2
+
+# Seconds the first lookup of a batch waits for others to join
+DEFAULT_BATCH_WINDOW = 0.002
+
+# Matches MAX_BATCH_BALANCE_ACCOUNTS in api/grpc/account_service.py
+MAX_BATCH_SIZE = 1000
+
+
+class _Batch:
+    def __init__(self):
+        self.waiters = {}
+        self.sent = False
+
+
+class BalanceBatcher:
+    """Send concurrent GetBalance lookups as GetBalances calls."""
+
+    def __init__(self, stub, window=DEFAULT_BATCH_WINDOW, max_batch_size=MAX_BATCH_SIZE, timeout=None):
+        """Initialize the batcher.
+
+        Args:
+            stub: An AccountServiceStub, or anything with a GetBalances method
+            window: Seconds to collect lookups before the batch is sent
+            max_batch_size: Distinct accounts after which a batch is sent early
+            timeout: Deadline in seconds for each GetBalances call
+        """
+        self.stub = stub
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._batches = {}
+
+    def get_balance(self, account_id, user_id, timeout=None):
+        """Return the BalanceResponse for one account.
+
+        Unlike GetBalance, a missing or foreign account does not raise: the
+        response has success=False and the reason in message, as returned
+        by GetBalances.
+
+        Raises:
+            grpc.RpcError: If the GetBalances call carrying it failed
+        """
+        account_id = str(account_id)
+        with self._lock:
+            batch = self._batches.get(user_id)
+            # A full batch is already being sent, start the next one
+            leader = batch is None or (
+                len(batch.waiters) >= self.max_batch_size and account_id not in batch.waiters)
+            if leader:
+                batch = self._batches[user_id] = _Batch()
+            future = batch.waiters.get(account_id)
+            if future is None:
+                future = batch.waiters[account_id] = Future()
+            full = len(batch.waiters) >= self.max_batch_size
+
+        if full:
+            self._send(user_id, batch)
+        elif leader:
+            # The first caller waits out the window and sends for everyone
+            time.sleep(self.window)
+            self._send(user_id, batch)
+        return future.result(timeout=timeout)
+
+    def _send(self, user_id, batch):
+        with self._lock:
+            if batch.sent:
+                return
+            batch.sent = True
+            if self._batches.get(user_id) is batch:
+                del self._batches[user_id]
+
+        account_ids = list(batch.waiters)
+        try:
+            response = self.stub.GetBalances(
+                account_service_pb2.GetBalancesRequest(account_ids=account_ids, user_id=user_id),
+                timeout=self.timeout)
+        except Exception as e:
+            for future in batch.waiters.values():
+                future.set_exception(e)
+            return
+
+        balances = dict(zip(account_ids, response.balances))
+        for account_id, future in batch.waiters.items():
+            balance = balances.get(account_id)
+            if balance is None:
+                # The whole batch was rejected
+                balance = account_service_pb2.BalanceResponse(
+                    success=False, message=response.message, account_id=account_id)
+            future.set_result(balance)
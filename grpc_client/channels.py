@@ -0,0 +1,130 @@
+"""
+Pooled, long-lived gRPC channels with the retry policy for idempotent RPCs.
+
+A channel multiplexes every call over one HTTP/2 connection and is
+expensive to set up, so each target gets a single channel per process,
+shared by all stubs. Retries are configured through the channel's service
+config and are only enabled for read methods, which are safe to repeat.
+"""
+
+import json
+import logging
+import os
+import threading
+
+import grpc
+
+logger = logging.getLogger(__name__)
+
+# Address of the combined gRPC server, see grpc_utils.server
+DEFAULT_TARGET = os.environ.get('GRPC_TARGET', 'localhost:50051')
+
+# Methods that only read and can be retried or hedged without side effects,
+# by full service name
+IDEMPOTENT_METHODS = {
+    'banking.account.AccountService': (
+        'GetAccount', 'GetAccounts', 'GetBalance', 'GetBalances', 'GetBalanceHistory',
+        'GetAccountStatement', 'GetAccountDetails', 'ListAllAccounts',
+    ),
+    'banking.TransactionService': (
+        'GetTransaction', 'ListTransactions', 'GetTransactionHistory',
+    ),
+    'banking.user.UserService': (
+        'GetUserProfile', 'ListUsers', 'GetUserByID',
+    ),
+    'banking.MarketplaceService': (
+        'GetProduct', 'ListProducts', 'SuggestProducts', 'GetOrder', 'ListOrders',
+    ),
+}
+
+# Retry transient failures only: the server being unreachable or shedding
+# load once maximum_concurrent_rpcs is reached. The deadline covers all
+# attempts, so DEADLINE_EXCEEDED is never retried
+DEFAULT_RETRY_POLICY = {
+    'maxAttempts': 4,
+    'initialBackoff': '0.1s',
+    'maxBackoff': '2s',
+    'backoffMultiplier': 2,
+    'retryableStatusCodes': ['UNAVAILABLE', 'RESOURCE_EXHAUSTED'],
+}
+
+DEFAULT_CHANNEL_OPTIONS = (
+    ('grpc.enable_retries', 1),
+    # Detect dead connections on idle channels instead of on the next call
+    ('grpc.keepalive_time_ms', 30000),
+    ('grpc.keepalive_timeout_ms', 10000),
+    ('grpc.max_receive_message_length', 16 * 1024 * 1024),
+)
+
+
+def build_service_config(idempotent_methods=None, retry_policy=None):
+    """Return the service config JSON enabling retries for idempotent methods.
+
+    Args:
+        idempotent_methods: Dict of full service name to method names,
+            defaults to IDEMPOTENT_METHODS
+        retry_policy: gRPC retryPolicy dict, defaults to DEFAULT_RETRY_POLICY
+    """
+    methods = IDEMPOTENT_METHODS if idempotent_methods is None else idempotent_methods
+    names = [
+        {'service': service, 'method': method}
+        for service, method_names in methods.items()
+        for method in method_names
+    ]
+    return json.dumps({
+        'methodConfig': [{
+            'name': names,
+            'retryPolicy': retry_policy or DEFAULT_RETRY_POLICY,
+        }]
+    })
+
+
+class ChannelPool:
+    """One shared channel per target, recreated after fork."""
+
+    def __init__(self, options=None, service_config=None, credentials=None):
+        """Initialize the pool.
+
+        Args:
+            options: Extra channel arguments, as (name, value) pairs
+            service_config: Service config JSON, see build_service_config
+            credentials: grpc.ChannelCredentials for secure channels,
+                insecure channels are created if omitted
+        """
+        self.options = list(DEFAULT_CHANNEL_OPTIONS) + list(options or [])
+        self.options.append(('grpc.service_config', service_config or build_service_config()))
+        self.credentials = credentials
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def channel(self, target=None):
+        """Return the channel for target, creating it on first use."""
+        target = target or DEFAULT_TARGET
+        with self._lock:
+            if self._pid != os.getpid():
+                # Channels do not survive fork; the parent still owns the
+                # inherited ones, so drop them without closing
+                self._channels = {}
+                self._pid = os.getpid()
+
+            channel = self._channels.get(target)
+            if channel is None:
+                if self.credentials is not None:
+                    channel = grpc.secure_channel(target, self.credentials, options=self.options)
+                else:
+                    channel = grpc.insecure_channel(target, options=self.options)
+                self._channels[target] = channel
+                logger.info(f"Opened gRPC channel to {target}")
+            return channel
+
+    def close(self):
+        """Close every pooled channel."""
+        with self._lock:
+            channels, self._channels = self._channels, {}
+        for channel in channels.values():
+            channel.close()
+
+
+# Pool shared by every client in the process
+default_pool = ChannelPool()
@@ -0,0 +1,127 @@
+"""
+Service clients built on the pooled channels.
+
+A ServiceClient wraps a generated stub. Every method gets a default
+deadline unless the caller passes one, and idempotent unary methods can be
+hedged. Calls otherwise behave exactly like the stub's.
+"""
+
+import grpc
+
+from grpc_client.batching import BalanceBatcher
+from grpc_client.channels import IDEMPOTENT_METHODS, default_pool
+from grpc_client.hedging import hedged_call
+from proto import account_service_pb2, account_service_pb2_grpc
+from proto import transaction_service_pb2, transaction_service_pb2_grpc
+from proto import user_service_pb2, user_service_pb2_grpc
+
+# Seconds a unary call may take when the caller gives no timeout
+DEFAULT_DEADLINE = 10.0
+
+# Per-method overrides; None leaves long-lived streams without a deadline
+DEFAULT_DEADLINES = {
+    'GetBalance': 2.0,
+    'GetBalances': 5.0,
+    'GetAccount': 2.0,
+    'GetTransaction': 2.0,
+    'ListAllAccounts': 30.0,
+    'GetAccountStatement': 30.0,
+    'GetTransactionHistory': 30.0,
+    # Autocomplete is useless once the user has typed on
+    'SuggestProducts': 1.0,
+    'StreamAllAccounts': None,
+    'StreamTransactionHistory': None,
+}
+
+
+class ServiceClient:
+    """A generated stub with default deadlines and optional hedging."""
+
+    service_name = None
+    stub_class = None
+
+    def __init__(self, target=None, pool=None, deadlines=None, hedging=None):
+        """Initialize the client.
+
+        Args:
+            target: Server address, defaults to $GRPC_TARGET
+            pool: ChannelPool to take the channel from, defaults to the
+                process-wide pool
+            deadlines: Per-method deadline overrides in seconds
+            hedging: HedgingPolicy applied to the service's idempotent
+                unary methods, no hedging if omitted
+        """
+        self.channel = (pool or default_pool).channel(target)
+        self.stub = self.stub_class(self.channel)
+        self.deadlines = dict(DEFAULT_DEADLINES, **(deadlines or {}))
+        self.hedging = hedging
+        self.hedged_methods = frozenset(IDEMPOTENT_METHODS.get(self.service_name, ()))
+
+    def deadline(self, method_name):
+        return self.deadlines.get(method_name, DEFAULT_DEADLINE)
+
+    def __getattr__(self, method_name):
+        if method_name.startswith('_') or 'stub' not in self.__dict__:
+            raise AttributeError(method_name)
+        multicallable = getattr(self.stub, method_name)
+        default_timeout = self.deadline(method_name)
+        hedge = (
+            self.hedging is not None
+            and method_name in self.hedged_methods
+            and isinstance(multicallable, grpc.UnaryUnaryMultiCallable)
+        )
+
+        def call(request, timeout=None, metadata=None, **kwargs):
+            timeout = default_timeout if timeout is None else timeout
+            if hedge and not kwargs:
+                return hedged_call(multicallable, request, timeout, self.hedging, metadata)
+            return multicallable(request, timeout=timeout, metadata=metadata, **kwargs)
+
+        return call
+
+
+class AccountClient(ServiceClient):
+    """Client for AccountService, with batched balance lookups."""
+
+    service_name = account_service_pb2.DESCRIPTOR.services_by_name['AccountService'].full_name
+    stub_class = account_service_pb2_grpc.AccountServiceStub
+
+    def __init__(self, target=None, pool=None, deadlines=None, hedging=None, batch_window=None):
+        """Initialize the client.
+
+        Args:
+            batch_window: Seconds get_balance waits to batch concurrent
+                lookups into one GetBalances call; 0 sends GetBalance directly
+            Other arguments as for ServiceClient
+        """
+        super().__init__(target, pool, deadlines, hedging)
+        self.batcher = None
+        if batch_window != 0:
+            batcher_args = {} if batch_window is None else {'window': batch_window}
+            self.batcher = BalanceBatcher(self.stub, timeout=self.deadline('GetBalances'), **batcher_args)
+
+    def get_balance(self, account_id, user_id, timeout=None):
+        """Return the BalanceResponse for one account.
+
+        With batching on, concurrent lookups are coalesced into GetBalances
+        and a missing account yields success=False instead of NOT_FOUND.
+        """
+        if self.batcher is None:
+            return self.GetBalance(
+                account_service_pb2.GetBalanceRequest(account_id=str(account_id), user_id=user_id),
+                timeout=timeout)
+        return self.batcher.get_balance(account_id, user_id, timeout=timeout)
+
+
+class TransactionClient(ServiceClient):
+    """Client for TransactionService."""
+
+    service_name = transaction_service_pb2.DESCRIPTOR.services_by_name['TransactionService'].full_name
+    stub_class = transaction_service_pb2_grpc.TransactionServiceStub
+
+
+class UserClient(ServiceClient):
+    """Client for UserService."""
+
+    service_name = user_service_pb2.DESCRIPTOR.services_by_name['UserService'].full_name
+    stub_class = user_service_pb2_grpc.UserServiceStub
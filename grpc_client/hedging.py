@@ -0,0 +1,90 @@
+"""
+Request hedging for read RPCs.
+
+When a read has not answered within a short delay, the same request is sent
+again and whichever attempt answers first wins; the rest are cancelled.
+This trims tail latency caused by one slow server or connection at the cost
+of a few duplicate reads. The C-core ignores hedgingPolicy in the service
+config, so hedging is done here on top of the call futures.
+"""
+
+import queue
+import time
+
+import grpc
+
+# Codes after which another attempt may still succeed; any other failure
+# is returned straight away
+NON_FATAL_STATUS_CODES = frozenset({
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+})
+
+
+class HedgingPolicy:
+    """How aggressively read RPCs are hedged."""
+
+    def __init__(self, delay=0.05, max_attempts=2, non_fatal_status_codes=NON_FATAL_STATUS_CODES):
+        """Initialize the policy.
+
+        Args:
+            delay: Seconds to wait for an answer before sending the next attempt
+            max_attempts: Attempts in flight at most, including the first
+            non_fatal_status_codes: Failures that immediately trigger the next
+                attempt instead of failing the call
+        """
+        self.delay = delay
+        self.max_attempts = max_attempts
+        self.non_fatal_status_codes = frozenset(non_fatal_status_codes)
+
+
+def hedged_call(multicallable, request, timeout, policy, metadata=None):
+    """Call a unary-unary method with hedging and return the first response.
+
+    Args:
+        multicallable: The stub method, e.g. stub.GetBalance
+        request: The request message
+        timeout: Deadline in seconds shared by all attempts
+        policy: A HedgingPolicy
+        metadata: Optional call metadata
+
+    Raises:
+        grpc.RpcError: The error of the last attempt if none succeeded
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    done = queue.Queue()
+    calls = []
+
+    def launch():
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        call = multicallable.future(request, timeout=remaining, metadata=metadata)
+        call.add_done_callback(done.put)
+        calls.append(call)
+
+    launch()
+    failed = 0
+    try:
+        while True:
+            can_hedge = len(calls) < policy.max_attempts
+            try:
+                # Once every attempt is out, their deadlines bound the wait
+                call = done.get(timeout=policy.delay if can_hedge else None)
+            except queue.Empty:
+                if deadline is None or time.monotonic() < deadline:
+                    launch()
+                continue
+
+            error = call.exception()
+            if error is None:
+                return call.result()
+
+            failed += 1
+            if call.code() not in policy.non_fatal_status_codes:
+                raise error
+            if can_hedge:
+                launch()
+            elif failed == len(calls):
+                raise error
+    finally:
+        for call in calls:
+            call.cancel()
@@ -0,0 +1,269 @@
+"""
+asyncio gRPC server mode for the banking services.
+
+The servicers in api/grpc are written against the blocking ORM. In this mode
+they are hosted on a grpc.aio server: each call is a coroutine, and only the
+blocking work (a unary handler, or producing the next message of a streaming
+handler) is handed to a bounded thread pool. A long-lived stream that is
+waiting on its client holds no thread, so the number of open streams is no
+longer capped by the number of workers.
+
+Select this mode with GRPC_SERVER_MODE=aio or run this module directly.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import inspect
+import logging
+import os
+import signal
+
+import grpc
+from grpc_reflection.v1alpha import reflection
+
+from utils.extensions import db
+from grpc_utils.server import DEFAULT_GRACE_PERIOD, DEFAULT_SERVICES, create_db_app, default_max_workers
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a synchronous iterator advanced from the event loop
+_EXHAUSTED = object()
+
+
+class _SyncContext:
+    """Expose the parts of the sync ServicerContext API the servicers use."""
+
+    def __init__(self, context):
+        self._context = context
+
+    def is_active(self):
+        return not self._context.done()
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
+
+
+def _sync_request_iterator(request_iterator, loop):
+    """Let a worker thread consume an async request stream as a plain iterator."""
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(request_iterator.__anext__(), loop).result()
+        except StopAsyncIteration:
+            return
+
+
+class AsyncServicerAdapter:
+    """Serve a synchronous servicer from a grpc.aio server.
+
+    Attribute access returns coroutine (or async generator) versions of the
+    servicer's methods, which is all the generated add_*Servicer_to_server
+    functions need.
+
+    Every call gets its own Flask application context, pushed inside a
+    dedicated contextvars.Context. All of the call's blocking steps run in
+    that context, so a streaming handler keeps one database session (and its
+    open cursor) across messages even when the steps land on different
+    worker threads.
+    """
+
+    def __init__(self, servicer, app, executor, calls=None):
+        """
+        Args:
+            servicer: The synchronous servicer instance
+            app: Flask app whose context every call runs in
+            executor: Thread pool for the blocking steps
+            calls: Set the tasks of unfinished calls are kept in, so the
+                server can wait for their cleanup before shutting down
+                the executor
+        """
+        self._servicer = servicer
+        self._app = app
+        self._executor = executor
+        self._calls = calls if calls is not None else set()
+
+    def __getattr__(self, name):
+        behavior = getattr(self._servicer, name)
+        if inspect.isgeneratorfunction(behavior):
+            return self._wrap_streaming(behavior)
+        return self._wrap_unary(behavior)
+
+    def _call_context(self):
+        call_context = contextvars.Context()
+        app_context = self._app.app_context()
+        call_context.run(app_context.push)
+        return call_context, app_context
+
+    def _prepare(self, request, loop):
+        if hasattr(request, '__aiter__'):
+            return _sync_request_iterator(request, loop)
+        return request
+
+    def _submit(self, call_context, func, *args):
+        return self._executor.submit(call_context.run, func, *args)
+
+    def _track(self):
+        task = asyncio.current_task()
+        self._calls.add(task)
+        return task
+
+    async def _finish(self, task, call_context, pending, *cleanups):
+        """Run cleanups in the call's context once its last step is done.
+
+        A cancelled call stops awaiting its step, but the worker thread keeps
+        running it inside call_context, which cannot be entered twice.
+        """
+        try:
+            if pending is not None:
+                await asyncio.wait([asyncio.wrap_future(pending)])
+            for cleanup in cleanups:
+                await asyncio.wrap_future(self._submit(call_context, cleanup))
+        finally:
+            self._calls.discard(task)
+
+    def _wrap_unary(self, behavior):
+        async def unary_behavior(request, context):
+            loop = asyncio.get_running_loop()
+            task = self._track()
+            call_context, app_context = self._call_context()
+            pending = None
+            try:
+                pending = self._submit(call_context, behavior,
+                                       self._prepare(request, loop), _SyncContext(context))
+                return await asyncio.wrap_future(pending)
+            finally:
+                await self._finish(task, call_context, pending, app_context.pop)
+        return unary_behavior
+
+    def _wrap_streaming(self, behavior):
+        async def streaming_behavior(request, context):
+            loop = asyncio.get_running_loop()
+            task = self._track()
+            call_context, app_context = self._call_context()
+            responses = behavior(self._prepare(request, loop), _SyncContext(context))
+            pending = None
+            try:
+                while True:
+                    pending = self._submit(call_context, next, responses, _EXHAUSTED)
+                    response = await asyncio.wrap_future(pending)
+                    if response is _EXHAUSTED:
+                        return
+                    # Waiting for the client to accept the message happens
+                    # here, on the event loop, not in a worker thread
+                    yield response
+            finally:
+                await self._finish(task, call_context, pending, responses.close, app_context.pop)
+        return streaming_behavior
+
+
+class AsyncGrpcServer:
+    """grpc.aio counterpart of grpc_utils.server.GrpcServer."""
+
+    def __init__(self, address=None, db_workers=None, app=None, interceptors=None,
+                 maximum_concurrent_rpcs=None, grace=DEFAULT_GRACE_PERIOD):
+        """Initialize the server.
+
+        Args:
+            address: The server address in the format 'host:port', defaults
+                to [::]:$GRPC_PORT
+            db_workers: Threads available for blocking ORM work, and the size
+                of the database pool; defaults to default_max_workers()
+            app: Flask app providing the database, created on start if omitted
+            interceptors: grpc.aio server interceptors
+            maximum_concurrent_rpcs: RPCs accepted at once, defaults to
+                $GRPC_AIO_MAX_CONCURRENT_RPCS or unbounded
+            grace: Seconds in-flight RPCs get to finish on shutdown
+        """
+        self.address = address or f"[::]:{os.environ.get('GRPC_PORT', '50051')}"
+        self.db_workers = db_workers or default_max_workers()
+        configured_limit = os.environ.get('GRPC_AIO_MAX_CONCURRENT_RPCS')
+        self.maximum_concurrent_rpcs = maximum_concurrent_rpcs or (
+            int(configured_limit) if configured_limit else None)
+        self.app = app
+        self.interceptors = list(interceptors or [])
+        self.grace = grace
+        self.server = None
+        self.port = None
+        self.executor = None
+        self.services = {}
+        self.calls = set()
+
+    def add_service(self, service_name, servicer, add_to_server):
+        """Add a synchronous servicer to the server.
+
+        Args:
+            service_name: The full name of the service (package.ServiceName)
+            servicer: The servicer instance
+            add_to_server: The generated add_*Servicer_to_server function
+        """
+        self.services[service_name] = (servicer, add_to_server)
+        logger.info(f"Added service: {service_name}")
+
+    def add_default_services(self):
+        """Add every banking service implemented in api/grpc."""
+        for service_name, servicer_class, add_to_server in DEFAULT_SERVICES:
+            self.add_service(service_name, servicer_class(), add_to_server)
+        return self
+
+    async def start(self):
+        """Start the server on the running event loop."""
+        if self.app is None:
+            self.app = create_db_app(pool_size=self.db_workers)
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.db_workers,
+            thread_name_prefix='grpc-aio-db'
+        )
+        self.server = grpc.aio.server(
+            interceptors=self.interceptors,
+            maximum_concurrent_rpcs=self.maximum_concurrent_rpcs
+        )
+
+        service_names = []
+        for service_name, (servicer, add_to_server) in self.services.items():
+            add_to_server(AsyncServicerAdapter(servicer, self.app, self.executor, self.calls), self.server)
+            service_names.append(service_name)
+            logger.info(f"Registered service: {service_name}")
+
+        service_names.append(reflection.SERVICE_NAME)
+        reflection.enable_server_reflection(service_names, self.server)
+
+        self.port = self.server.add_insecure_port(self.address)
+        await self.server.start()
+        logger.info(f"Async server started on {self.address} with {self.db_workers} database workers")
+
+    async def stop(self, grace=None):
+        """Stop accepting RPCs, drain in-flight ones, then release resources."""
+        if self.server is not None:
+            logger.info("Stopping async server...")
+            await self.server.stop(grace)
+            # Cancelled calls clean up on the executor, so it must outlive them
+            if self.calls:
+                await asyncio.wait(list(self.calls))
+            self.executor.shutdown(wait=True)
+            with self.app.app_context():
+                db.engine.dispose()
+            logger.info("Async server stopped")
+
+    async def serve_forever(self):
+        """Start the server and block until SIGTERM or SIGINT, then drain."""
+        await self.start()
+
+        shutdown = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, shutdown.set)
+
+        await shutdown.wait()
+        logger.info("Shutdown requested, draining in-flight RPCs")
+        await self.stop(self.grace)
+
+
+def serve():
+    """Start the async gRPC server with all banking services"""
+    asyncio.run(AsyncGrpcServer().add_default_services().serve_forever())
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    serve()
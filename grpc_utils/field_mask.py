@@ -0,0 +1,79 @@
+"""
+Read-mask support for the gRPC read RPCs.
+
+A FieldProjection maps each field of a response message to the model
+columns it is built from and a function producing its value. A request's
+google.protobuf.FieldMask then selects both the columns to load (as a
+load_only option or a column list for a projected query) and the fields
+to populate, so narrow reads neither fetch nor serialize the rest.
+
+Mask paths name fields of the resource message itself (for example
+``account_id`` and ``balance`` for Account), also in list responses. An
+empty mask selects every field.
+"""
+
+from sqlalchemy.orm import load_only
+
+
+class FieldProjection:
+    """Column and value mapping for one proto message."""
+
+    def __init__(self, message_class, fields, always=()):
+        """Initialize the projection.
+
+        Args:
+            message_class: The generated proto message class
+            fields: Dict of proto field name to (columns, getter), where
+                columns is a tuple of model columns the value is read from
+                and getter takes a model instance or row and returns the value
+            always: Columns loaded whatever the mask, such as keyset cursor
+                columns
+        """
+        self.message_class = message_class
+        self.fields = fields
+        self.always = tuple(always)
+
+    def resolve(self, read_mask):
+        """Return the field names selected by a FieldMask, or None for all fields.
+
+        Raises:
+            ValueError: If the mask names a field the message does not have
+        """
+        if read_mask is None or not read_mask.paths:
+            return None
+
+        selected = set()
+        for path in read_mask.paths:
+            name = path.split('.', 1)[0]
+            if name not in self.fields:
+                raise ValueError(f"Unknown field in read_mask: {path}")
+            selected.add(name)
+        return selected
+
+    def columns(self, selected=None):
+        """Model columns needed to populate the selected fields, without duplicates."""
+        columns = {}
+        names = self.fields if selected is None else selected
+        for column in self.always:
+            columns[column.key] = column
+        for name in names:
+            for column in self.fields[name][0]:
+                columns.setdefault(column.key, column)
+        return list(columns.values())
+
+    def load_only(self, selected=None):
+        """A load_only query option for the selected fields."""
+        return load_only(*self.columns(selected))
+
+    def to_proto(self, obj, selected=None, **values):
+        """Build the message, calling only the getters of selected fields.
+
+        Keyword arguments give values for fields that do not come from the
+        model, such as the caller's user ID; they are also only set when
+        the field is selected.
+        """
+        names = self.fields if selected is None else selected
+        return self.message_class(**{
+            name: values[name] if name in values else self.fields[name][1](obj)
+            for name in names
+        })
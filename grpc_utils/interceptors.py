@@ -0,0 +1,227 @@
+"""
+Server interceptors shared by every service hosted on the gRPC server.
+"""
+
+import logging
+import os
+import time
+
+import grpc
+
+from grpc_utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Calls taking longer than this many seconds are logged, override with
+# GRPC_SLOW_CALL_SECONDS
+DEFAULT_SLOW_CALL_SECONDS = 1.0
+
+# Metadata keys whose values are never written to the log
+REDACTED_METADATA_KEYS = frozenset({'authorization', 'cookie', 'x-api-key'})
+
+
+def wrap_rpc_handler(handler, wrapper):
+    """Return a copy of an RPC method handler with its behavior wrapped.
+
+    Args:
+        handler: The grpc.RpcMethodHandler returned by the continuation
+        wrapper: Callable taking (behavior, response_streaming) and returning
+            the replacement behavior
+
+    Returns:
+        A new handler, or None if there was no handler for the method
+    """
+    if handler is None:
+        return None
+
+    if handler.unary_unary:
+        return grpc.unary_unary_rpc_method_handler(
+            wrapper(handler.unary_unary, False),
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer)
+    if handler.unary_stream:
+        return grpc.unary_stream_rpc_method_handler(
+            wrapper(handler.unary_stream, True),
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer)
+    if handler.stream_unary:
+        return grpc.stream_unary_rpc_method_handler(
+            wrapper(handler.stream_unary, False),
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer)
+    return grpc.stream_stream_rpc_method_handler(
+        wrapper(handler.stream_stream, True),
+        request_deserializer=handler.request_deserializer,
+        response_serializer=handler.response_serializer)
+
+
+class AppContextInterceptor(grpc.ServerInterceptor):
+    """Run every RPC inside a Flask application context.
+
+    The servicers use the Flask-SQLAlchemy ``db.session``, which needs an
+    application context. Pushing one per call also means the scoped session
+    is removed, and its connection returned to the shared pool, when the
+    call finishes. For streaming responses the context stays pushed until
+    the last message has been produced.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def intercept_service(self, continuation, handler_call_details):
+        return wrap_rpc_handler(continuation(handler_call_details), self._wrap)
+
+    def _wrap(self, behavior, response_streaming):
+        app = self.app
+
+        if response_streaming:
+            def streaming_behavior(request, context):
+                with app.app_context():
+                    yield from behavior(request, context)
+            return streaming_behavior
+
+        def unary_behavior(request, context):
+            with app.app_context():
+                return behavior(request, context)
+        return unary_behavior
+
+
+def _redact_metadata(metadata):
+    """Metadata as a dict with credentials and binary values hidden."""
+    result = {}
+    for key, value in metadata or ():
+        if key.lower() in REDACTED_METADATA_KEYS:
+            value = '<redacted>'
+        elif key.endswith('-bin'):
+            value = f'<{len(value)} bytes>'
+        result[key] = value
+    return result
+
+
+def _message_size(message):
+    byte_size = getattr(message, 'ByteSize', None)
+    return byte_size() if byte_size else 0
+
+
+class _CallRecorder:
+    """Metrics for a single call, from the moment it is queued until it ends."""
+
+    def __init__(self, interceptor, handler_call_details, received):
+        self.registry = interceptor.registry
+        self.slow_call_threshold = interceptor.slow_call_threshold
+        self.details = handler_call_details
+        self.labels = {'method': handler_call_details.method}
+        self.received = received
+        self.started = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.registry.histogram('grpc_server_queue_wait_seconds', self.labels).observe(
+            self.started - self.received)
+        self.registry.gauge('grpc_server_in_flight', self.labels).inc()
+
+    def count_request(self, message):
+        size = _message_size(message)
+        self.request_bytes += size
+        self.registry.histogram('grpc_server_request_bytes', self.labels,
+                                buckets=metrics.DEFAULT_SIZE_BUCKETS).observe(size)
+        return message
+
+    def count_response(self, message):
+        size = _message_size(message)
+        self.response_bytes += size
+        self.registry.histogram('grpc_server_response_bytes', self.labels,
+                                buckets=metrics.DEFAULT_SIZE_BUCKETS).observe(size)
+        return message
+
+    def count_requests(self, request_iterator):
+        for message in request_iterator:
+            yield self.count_request(message)
+
+    def finish(self, context, failed, cancelled=False):
+        duration = time.perf_counter() - self.started
+        code = getattr(context, 'code', lambda: None)()
+        if isinstance(code, grpc.StatusCode):
+            status = code.name
+        elif cancelled:
+            status = 'CANCELLED'
+        else:
+            status = 'UNKNOWN' if failed else 'OK'
+
+        self.registry.gauge('grpc_server_in_flight', self.labels).dec()
+        self.registry.histogram('grpc_server_handling_seconds', self.labels).observe(duration)
+        self.registry.counter('grpc_server_handled_total',
+                              {'method': self.details.method, 'code': status}).inc()
+
+        if duration >= self.slow_call_threshold:
+            logger.warning(
+                f"Slow gRPC call {self.details.method}: {duration:.3f}s "
+                f"(queued {self.started - self.received:.3f}s, status {status}, "
+                f"request {self.request_bytes} bytes, response {self.response_bytes} bytes, "
+                f"peer {context.peer()}) metadata={_redact_metadata(self.details.invocation_metadata)}")
+
+
+class MetricsInterceptor(grpc.ServerInterceptor):
+    """Record per-method latency, concurrency and payload metrics.
+
+    For every method the registry gets a handling-time histogram, an
+    in-flight gauge, request and response size histograms, a counter per
+    status code, and the time the call waited for a worker thread. The
+    sync server calls intercept_service on its polling thread before the
+    call is queued on the executor, so the gap until the behavior starts
+    is the executor queue wait (plus request deserialization).
+
+    Calls slower than slow_call_threshold seconds are logged with their
+    peer and request metadata, credentials redacted.
+    """
+
+    def __init__(self, registry=None, slow_call_threshold=None):
+        self.registry = registry or metrics.registry
+        if slow_call_threshold is None:
+            slow_call_threshold = float(os.environ.get('GRPC_SLOW_CALL_SECONDS', DEFAULT_SLOW_CALL_SECONDS))
+        self.slow_call_threshold = slow_call_threshold
+
+    def intercept_service(self, continuation, handler_call_details):
+        received = time.perf_counter()
+        return wrap_rpc_handler(
+            continuation(handler_call_details),
+            lambda behavior, response_streaming: self._wrap(
+                behavior, response_streaming, handler_call_details, received))
+
+    def _wrap(self, behavior, response_streaming, handler_call_details, received):
+        def observe_requests(recorder, request):
+            # Client-streaming calls receive an iterator instead of a message
+            if hasattr(request, 'ByteSize'):
+                return recorder.count_request(request)
+            return recorder.count_requests(request)
+
+        if response_streaming:
+            def streaming_behavior(request, context):
+                recorder = _CallRecorder(self, handler_call_details, received)
+                recorder.start()
+                failed, cancelled = True, False
+                try:
+                    for response in behavior(observe_requests(recorder, request), context):
+                        yield recorder.count_response(response)
+                    failed = False
+                except GeneratorExit:
+                    # The client went away before the stream was exhausted
+                    cancelled = True
+                    raise
+                finally:
+                    recorder.finish(context, failed, cancelled)
+            return streaming_behavior
+
+        def unary_behavior(request, context):
+            recorder = _CallRecorder(self, handler_call_details, received)
+            recorder.start()
+            failed = True
+            try:
+                response = recorder.count_response(behavior(observe_requests(recorder, request), context))
+                failed = False
+                return response
+            finally:
+                recorder.finish(context, failed)
+        return unary_behavior
@@ -0,0 +1,146 @@
+"""
+In-process metrics registry for the gRPC server.
+
+Counters, gauges and fixed-bucket histograms keyed by name and labels. The
+registry can be read as a dict with snapshot() or rendered in the Prometheus
+text exposition format with render_text().
+"""
+
+import bisect
+import threading
+
+# Latency buckets in seconds
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Payload size buckets in bytes
+DEFAULT_SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Counter:
+    """Monotonically increasing value."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """Value that can go up and down, such as calls in flight."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a running sum and count."""
+
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket containing it."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = q * self.count
+            seen = 0
+            for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+                seen += count
+                if seen >= target:
+                    return bound
+        return float('inf')
+
+
+class MetricsRegistry:
+    """Thread-safe collection of named, labelled metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get(self, kind, name, labels, factory):
+        key = (name, tuple(sorted((labels or {}).items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = (kind, factory())
+                    self._metrics[key] = metric
+        return metric[1]
+
+    def counter(self, name, labels=None):
+        return self._get('counter', name, labels, Counter)
+
+    def gauge(self, name, labels=None):
+        return self._get('gauge', name, labels, Gauge)
+
+    def histogram(self, name, labels=None, buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._get('histogram', name, labels, lambda: Histogram(buckets))
+
+    def snapshot(self):
+        """Return every metric as {name: [{'labels': ..., ...values}]}."""
+        result = {}
+        with self._lock:
+            items = list(self._metrics.items())
+        for (name, labels), (kind, metric) in items:
+            entry = {'labels': dict(labels), 'type': kind}
+            if kind == 'histogram':
+                entry.update(count=metric.count, sum=metric.sum,
+                             p50=metric.quantile(0.5), p99=metric.quantile(0.99))
+            else:
+                entry['value'] = metric.value
+            result.setdefault(name, []).append(entry)
+        return result
+
+    def render_text(self):
+        """Render the registry in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            items = sorted(self._metrics.items())
+        for (name, labels), (kind, metric) in items:
+            label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+            if kind == 'histogram':
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), metric.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float('inf') else repr(bound)
+                    bucket_labels = f'{label_text},le="{le}"' if label_text else f'le="{le}"'
+                    lines.append(f"{name}_bucket{{{bucket_labels}}} {cumulative}")
+                lines.append(f"{name}_sum{{{label_text}}} {metric.sum}")
+                lines.append(f"{name}_count{{{label_text}}} {metric.count}")
+            else:
+                lines.append(f"{name}{{{label_text}}} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+# Registry shared by every interceptor in the process
+registry = MetricsRegistry()
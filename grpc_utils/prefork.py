@@ -0,0 +1,167 @@
+"""
+Pre-fork launcher for the gRPC services.
+
+A Python gRPC server is bound by the GIL to roughly one core however many
+threads it runs. This launcher imports the generated protos, servicers and
+models once in the parent, then forks one worker process per core. Every
+worker binds the same port with SO_REUSEPORT, so the kernel spreads incoming
+connections across them. The parent only supervises: it restarts workers
+that die (with backoff if they keep crashing) and forwards SIGTERM/SIGINT so
+every worker drains its in-flight RPCs before exiting.
+
+The parent must not create a gRPC server or channel, or open a database
+connection, before forking: gRPC's internal threads and pooled sockets do
+not survive fork. Each worker disposes of the inherited engine pool and
+builds its own.
+
+Usage:
+    python -m grpc_utils.prefork --workers 4 --port 50051
+"""
+
+import argparse
+import logging
+import os
+import signal
+import sys
+import time
+
+from utils.extensions import db
+from grpc_utils.server import GrpcServer, create_db_app, default_max_workers
+
+logger = logging.getLogger(__name__)
+
+# A worker that exits sooner than this after starting counts as a crash loop
+MIN_HEALTHY_UPTIME = 5.0
+MAX_RESTART_BACKOFF = 30.0
+
+
+def default_worker_processes():
+    """One worker process per core, override with GRPC_WORKER_PROCESSES."""
+    configured = os.environ.get('GRPC_WORKER_PROCESSES')
+    if configured:
+        return int(configured)
+    return os.cpu_count() or 1
+
+
+class PreforkServer:
+    """Fork and supervise gRPC worker processes sharing one port."""
+
+    def __init__(self, workers=None, address=None, threads_per_worker=None, server_factory=None):
+        """Initialize the launcher.
+
+        Args:
+            workers: Number of worker processes, see default_worker_processes
+            address: Address every worker binds, defaults to [::]:$GRPC_PORT
+            threads_per_worker: Worker threads (and pooled DB connections) in
+                each process, see default_max_workers
+            server_factory: Callable taking (address, app, max_workers) and
+                returning a GrpcServer with its services added; defaults to
+                all banking services
+        """
+        self.workers = workers or default_worker_processes()
+        self.address = address or f"[::]:{os.environ.get('GRPC_PORT', '50051')}"
+        self.threads_per_worker = threads_per_worker or default_max_workers()
+        self.server_factory = server_factory or self._default_server
+        self.children = {}
+        self._stopping = False
+
+    @staticmethod
+    def _default_server(address, app, max_workers):
+        return GrpcServer(
+            address=address,
+            app=app,
+            max_workers=max_workers,
+            options=[('grpc.so_reuseport', 1)]
+        ).add_default_services()
+
+    def run(self):
+        """Fork the workers and supervise them until told to stop."""
+        # Configuration is loaded once here; no connection is opened until a
+        # worker handles its first call
+        self.app = create_db_app(pool_size=self.threads_per_worker)
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        for slot in range(self.workers):
+            self._spawn(slot)
+        logger.info(f"Started {self.workers} gRPC worker processes on {self.address}")
+
+        backoff = {slot: 0.0 for slot in range(self.workers)}
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            if pid not in self.children:
+                continue
+
+            slot, started = self.children.pop(pid)
+            if self._stopping:
+                continue
+
+            uptime = time.monotonic() - started
+            logger.warning(f"Worker {pid} (slot {slot}) exited with status {status} "
+                           f"after {uptime:.1f}s, restarting")
+            if uptime < MIN_HEALTHY_UPTIME:
+                backoff[slot] = min(max(backoff[slot] * 2, 1.0), MAX_RESTART_BACKOFF)
+                time.sleep(backoff[slot])
+            else:
+                backoff[slot] = 0.0
+            if not self._stopping:
+                self._spawn(slot)
+
+        logger.info("All gRPC worker processes stopped")
+
+    def _spawn(self, slot):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = (slot, time.monotonic())
+            return
+
+        # Worker process from here on
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            with self.app.app_context():
+                # Drop the inherited pool without closing the parent's sockets
+                db.engine.dispose(close=False)
+            server = self.server_factory(self.address, self.app, self.threads_per_worker)
+            logger.info(f"Worker {os.getpid()} (slot {slot}) serving")
+            server.serve_forever()
+        except Exception:
+            logger.exception(f"Worker {os.getpid()} (slot {slot}) failed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _handle_stop(self, signum, frame):
+        if self._stopping:
+            return
+        self._stopping = True
+        logger.info(f"Received signal {signum}, stopping {len(self.children)} workers")
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the gRPC services in pre-forked worker processes")
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per core)')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('GRPC_PORT', '50051')))
+    parser.add_argument('--threads', type=int, default=None, help='Threads per worker process')
+    args = parser.parse_args(argv)
+
+    PreforkServer(
+        workers=args.workers,
+        address=f"[::]:{args.port}",
+        threads_per_worker=args.threads
+    ).run()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -1,24 +1,32 @@
 """
 Core gRPC server implementation for the banking system.
 This module provides the base server and service implementation.
+
+All services are hosted on a single port and share one worker pool and one
+SQLAlchemy engine, so a deployment runs one well-sized process per core
+instead of a separate under-used server per service.
 """
 
 import concurrent.futures
 import logging
+import os
+import signal
+import threading
 import time
+
 import grpc
+from flask import Flask
 from grpc_reflection.v1alpha import reflection
-import os
-import sys
 
-# Import generated gRPC modules
-sys.path.append('./grpc_utils')  # Add the path to generated modules
+from utils.config import load_configuration
+from utils.extensions import db
+from grpc_utils.interceptors import AppContextInterceptor, MetricsInterceptor
 
 # Import gRPC service implementations
-from grpc_services.user_service import UserServiceServicer
-from grpc_services.account_service import AccountServiceServicer
-from grpc_services.transaction_service import TransactionServiceServicer
-from grpc_services.marketplace_service import MarketplaceServiceServicer
+from api.grpc.user_service import UserServicer
+from api.grpc.account_service import AccountServicer
+from api.grpc.transaction_service import TransactionServicer
+from api.grpc.marketplace_service import MarketplaceServicer
 
 # Import generated gRPC code
 from proto import user_service_pb2, user_service_pb2_grpc
@@ -33,87 +41,194 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Services hosted by default: (full service name, servicer class, registration function)
+DEFAULT_SERVICES = (
+    (user_service_pb2.DESCRIPTOR.services_by_name['UserService'].full_name,
+     UserServicer, user_service_pb2_grpc.add_UserServiceServicer_to_server),
+    (account_service_pb2.DESCRIPTOR.services_by_name['AccountService'].full_name,
+     AccountServicer, account_service_pb2_grpc.add_AccountServiceServicer_to_server),
+    (transaction_service_pb2.DESCRIPTOR.services_by_name['TransactionService'].full_name,
+     TransactionServicer, transaction_service_pb2_grpc.add_TransactionServiceServicer_to_server),
+    (marketplace_service_pb2.DESCRIPTOR.services_by_name['MarketplaceService'].full_name,
+     MarketplaceServicer, marketplace_service_pb2_grpc.add_MarketplaceServiceServicer_to_server),
+)
+
+# Seconds in-flight RPCs get to finish on shutdown
+DEFAULT_GRACE_PERIOD = 30
+
+
+def default_max_workers():
+    """Worker threads for the shared executor.
+
+    The RPCs spend most of their time waiting on the database, so a few
+    threads per core keeps the core busy. Override with GRPC_MAX_WORKERS.
+    """
+    configured = os.environ.get('GRPC_MAX_WORKERS')
+    if configured:
+        return int(configured)
+    return min(32, (os.cpu_count() or 1) * 4)
+
+
+def create_db_app(pool_size):
+    """Create a minimal Flask app that owns the engine shared by all services.
+
+    Only configuration and the database extension are initialised; the web
+    blueprints, Keycloak and SocketIO are not needed to serve gRPC.
+
+    Args:
+        pool_size: Connections to keep in the pool, one per worker thread
+    """
+    app = Flask(__name__)
+    load_configuration(app)
+
+    if not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "pool_size": pool_size,
+            # Every worker already has a pooled connection, overflow would
+            # only hide a leak
+            "max_overflow": 0,
+            "pool_pre_ping": True,
+            "pool_recycle": int(os.environ.get("DATABASE_POOL_RECYCLE", 3600)),
+        }
+
+    db.init_app(app)
+    return app
+
+
 class GrpcServer:
     """Base gRPC server that can host multiple services."""
-    
-    def __init__(self, address='[::]:50051', max_workers=10):
+
+    def __init__(self, address=None, max_workers=None, app=None, interceptors=None,
+                 maximum_concurrent_rpcs=None, grace=DEFAULT_GRACE_PERIOD, options=None,
+                 metrics_registry=None, slow_call_threshold=None):
         """Initialize the gRPC server.
-        
+
         Args:
-            address: The server address in the format 'host:port'
-            max_workers: Maximum number of worker threads
+            address: The server address in the format 'host:port', defaults
+                to [::]:$GRPC_PORT
+            max_workers: Maximum number of worker threads, see default_max_workers
+            app: Flask app providing the database, created on start if omitted
+            interceptors: Additional server interceptors, run after the
+                application context has been pushed
+            maximum_concurrent_rpcs: RPCs accepted at once before new calls
+                are rejected with RESOURCE_EXHAUSTED instead of queueing
+            grace: Seconds in-flight RPCs get to finish on shutdown
+            options: Extra grpc channel arguments, as (name, value) pairs
+            metrics_registry: Registry the MetricsInterceptor records into,
+                defaults to the process-wide grpc_utils.metrics.registry
+            slow_call_threshold: Seconds after which a call is logged as
+                slow, defaults to $GRPC_SLOW_CALL_SECONDS or 1 second
         """
-        self.address = address
-        self.max_workers = max_workers
+        self.address = address or f"[::]:{os.environ.get('GRPC_PORT', '50051')}"
+        self.max_workers = max_workers or default_max_workers()
+        self.maximum_concurrent_rpcs = maximum_concurrent_rpcs or int(
+            os.environ.get('GRPC_MAX_CONCURRENT_RPCS', self.max_workers * 4))
+        self.app = app
+        self.interceptors = list(interceptors or [])
+        self.grace = grace
+        self.options = list(options or [])
+        self.metrics_interceptor = MetricsInterceptor(metrics_registry, slow_call_threshold)
         self.server = None
+        self.port = None
         self.services = {}
         self._is_running = False
-        
-    def add_service(self, service_name, service_class):
+
+    def add_service(self, service_name, servicer, add_to_server):
         """Add a service to the server.
-        
+
         Args:
             service_name: The full name of the service (package.ServiceName)
-            service_class: The service class implementation
+            servicer: The servicer instance
+            add_to_server: The generated add_*Servicer_to_server function
         """
-        self.services[service_name] = service_class
+        self.services[service_name] = (servicer, add_to_server)
         logger.info(f"Added service: {service_name}")
-        
+
+    def add_default_services(self):
+        """Add every banking service implemented in api/grpc."""
+        for service_name, servicer_class, add_to_server in DEFAULT_SERVICES:
+            self.add_service(service_name, servicer_class(), add_to_server)
+        return self
+
     def start(self):
         """Start the gRPC server."""
+        if self.app is None:
+            self.app = create_db_app(pool_size=self.max_workers)
+
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='grpc-worker'
+        )
         self.server = grpc.server(
-            concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+            executor,
+            # Metrics run outermost so handling time includes the app context
+            interceptors=[self.metrics_interceptor, AppContextInterceptor(self.app)] + self.interceptors,
+            options=self.options,
+            maximum_concurrent_rpcs=self.maximum_concurrent_rpcs
         )
-        
+
         # Add all registered services
         service_names = []
-        for service_name, service_class in self.services.items():
-            service_class.add_to_server(self.server)
+        for service_name, (servicer, add_to_server) in self.services.items():
+            add_to_server(servicer, self.server)
             service_names.append(service_name)
             logger.info(f"Registered service: {service_name}")
-        
+
         # Add reflection service
         service_names.append(reflection.SERVICE_NAME)
         reflection.enable_server_reflection(service_names, self.server)
-        
+
         # Start the server
-        self.server.add_insecure_port(self.address)
+        self.port = self.server.add_insecure_port(self.address)
         self.server.start()
         self._is_running = True
-        logger.info(f"Server started on {self.address}")
-        
+        logger.info(f"Server started on {self.address} with {self.max_workers} workers")
+
     def stop(self, grace=None):
         """Stop the gRPC server.
-        
+
+        New RPCs are rejected immediately; in-flight RPCs get up to grace
+        seconds to finish before they are cancelled. Blocks until the server
+        has stopped, then closes the pooled database connections.
+
         Args:
             grace: Optional grace period for clean shutdown
         """
         if self.server is not None:
             logger.info("Stopping server...")
-            self.server.stop(grace)
+            self.server.stop(grace).wait()
             self._is_running = False
+            with self.app.app_context():
+                db.engine.dispose()
             logger.info("Server stopped")
-            
+
     def wait_for_termination(self):
         """Block until the server terminates."""
         if self.server is not None:
             self.server.wait_for_termination()
-            
+
     def serve_forever(self):
-        """Start the server and block until it terminates."""
+        """Start the server and block until SIGTERM or SIGINT, then drain."""
         self.start()
-        try:
-            self.wait_for_termination()
-        except KeyboardInterrupt:
-            logger.info("Server interrupted")
-            self.stop(5)  # 5 seconds grace period
+
+        shutdown = threading.Event()
+
+        def request_shutdown(signum, frame):
+            logger.info(f"Received signal {signum}, draining in-flight RPCs")
+            shutdown.set()
+
+        signal.signal(signal.SIGTERM, request_shutdown)
+        signal.signal(signal.SIGINT, request_shutdown)
+
+        shutdown.wait()
+        self.stop(self.grace)
 
 def health_check_response(context):
     """Generate a health check response.
-    
+
     Args:
         context: The gRPC context
-        
+
     Returns:
         A dictionary with server health status
     """
@@ -124,44 +239,16 @@ def health_check_response(context):
     }
 
 def serve():
-    """Start gRPC server with all banking services"""
-    # Create a gRPC server
-    server = grpc.server(concurrent.futures.ThreadPoolExecutor(max_workers=10))
-    
-    # Add services to the server
-    user_service_pb2_grpc.add_UserServiceServicer_to_server(
-        UserServiceServicer(), server)
-    
-    account_service_pb2_grpc.add_AccountServiceServicer_to_server(
-        AccountServiceServicer(), server)
-    
-    transaction_service_pb2_grpc.add_TransactionServiceServicer_to_server(
-        TransactionServiceServicer(), server)
-    
-    marketplace_service_pb2_grpc.add_MarketplaceServiceServicer_to_server(
-        MarketplaceServiceServicer(), server)
-    
-    # Enable reflection for tools like grpcurl
-    SERVICE_NAMES = (
-        user_service_pb2.DESCRIPTOR.services_by_name['UserService'].full_name,
-        account_service_pb2.DESCRIPTOR.services_by_name['AccountService'].full_name,
-        transaction_service_pb2.DESCRIPTOR.services_by_name['TransactionService'].full_name,
-        marketplace_service_pb2.DESCRIPTOR.services_by_name['MarketplaceService'].full_name,
-        reflection.SERVICE_NAME,
-    )
-    reflection.enable_server_reflection(SERVICE_NAMES, server)
-    
-    # Define port
-    port = os.environ.get('GRPC_PORT', '50051')
-    server.add_insecure_port(f'[::]:{port}')
-    
-    # Start the server
-    server.start()
-    logger.info(f"gRPC server started on port {port}")
-    
-    # Keep the server running
-    server.wait_for_termination()
+    """Start gRPC server with all banking services
+
+    GRPC_SERVER_MODE=aio selects the asyncio server in grpc_utils.aio_server.
+    """
+    if os.environ.get('GRPC_SERVER_MODE', 'sync').lower() == 'aio':
+        from grpc_utils.aio_server import serve as serve_aio
+        serve_aio()
+        return
+    GrpcServer().add_default_services().serve_forever()
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
-    serve()
\ No newline at end of file
+    serve()
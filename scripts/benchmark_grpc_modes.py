@@ -0,0 +1,227 @@
+"""
+Benchmark the thread-per-RPC gRPC server against the grpc.aio server mode.
+
+Both servers host the same servicer and get the same number of threads for
+blocking work. The servicer simulates database latency with a sleep, so the
+numbers reflect how each mode schedules work rather than database speed.
+
+While a number of long-lived StreamTransactionHistory calls are held open by
+slow consumers, unary GetBalance calls are fired at the server and their
+throughput and latency recorded. In the sync server every open stream pins
+a worker thread, so once the streams outnumber the workers the unary calls
+queue behind them; the aio server only borrows a thread while a batch is
+being produced.
+
+Usage:
+    python scripts/benchmark_grpc_modes.py --workers 8 --streams 32 --calls 2000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent import futures
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grpc
+from flask import Flask
+
+from utils.extensions import db
+from grpc_utils.server import GrpcServer
+from grpc_utils.aio_server import AsyncGrpcServer
+from api.grpc.account_service import AccountServicer
+from api.grpc.transaction_service import TransactionServicer
+from proto import account_service_pb2, account_service_pb2_grpc
+from proto import transaction_service_pb2, transaction_service_pb2_grpc
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class BenchAccountServicer(AccountServicer):
+    """GetBalance with a fixed simulated database latency."""
+
+    def __init__(self, db_latency):
+        self.db_latency = db_latency
+
+    def GetBalance(self, request, context):
+        time.sleep(self.db_latency)
+        return account_service_pb2.BalanceResponse(
+            success=True,
+            account_id=request.account_id,
+            balance=100.0,
+            available_balance=100.0,
+            currency="USD"
+        )
+
+
+class BenchTransactionServicer(TransactionServicer):
+    """StreamTransactionHistory producing synthetic batches until cancelled."""
+
+    def __init__(self, db_latency, batch_size):
+        self.db_latency = db_latency
+        self.batch = [
+            transaction_service_pb2.Transaction(
+                transaction_id=str(i), account_id="1", transaction_type="deposit",
+                amount="10.00", description="benchmark transaction", status="completed")
+            for i in range(batch_size)
+        ]
+
+    def StreamTransactionHistory(self, request, context):
+        while context.is_active():
+            time.sleep(self.db_latency)
+            yield transaction_service_pb2.TransactionHistoryBatch(transactions=self.batch)
+
+
+def bench_app():
+    """Flask app for the per-call application context, no database is touched."""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    return app
+
+
+def add_bench_services(server, args):
+    server.add_service(
+        account_service_pb2.DESCRIPTOR.services_by_name['AccountService'].full_name,
+        BenchAccountServicer(args.db_latency),
+        account_service_pb2_grpc.add_AccountServiceServicer_to_server)
+    server.add_service(
+        transaction_service_pb2.DESCRIPTOR.services_by_name['TransactionService'].full_name,
+        BenchTransactionServicer(args.db_latency, args.batch_size),
+        transaction_service_pb2_grpc.add_TransactionServiceServicer_to_server)
+
+
+def start_sync_server(args):
+    server = GrpcServer(address='127.0.0.1:0', max_workers=args.workers, app=bench_app(),
+                        maximum_concurrent_rpcs=args.streams + args.concurrency + 16)
+    add_bench_services(server, args)
+    server.start()
+    return server.port, server.stop
+
+
+def start_aio_server(args):
+    """Run the aio server on its own event loop thread."""
+    loop = asyncio.new_event_loop()
+    server = AsyncGrpcServer(address='127.0.0.1:0', db_workers=args.workers, app=bench_app())
+    add_bench_services(server, args)
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+
+    def stop(grace=None):
+        asyncio.run_coroutine_threadsafe(server.stop(grace), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    return server.port, stop
+
+
+def hold_streams(channel, count, read_interval, stop_event):
+    """Open streams whose consumers read one batch every read_interval seconds."""
+    stub = transaction_service_pb2_grpc.TransactionServiceStub(channel)
+    calls = []
+
+    def consume(call):
+        try:
+            for _ in call:
+                if stop_event.wait(read_interval):
+                    break
+        except grpc.RpcError:
+            pass
+
+    threads = []
+    for i in range(count):
+        call = stub.StreamTransactionHistory(
+            transaction_service_pb2.StreamTransactionHistoryRequest(user_id="1"))
+        calls.append(call)
+        thread = threading.Thread(target=consume, args=(call,), daemon=True)
+        thread.start()
+        threads.append(thread)
+    return calls, threads
+
+
+def fire_unary_calls(channel, total, concurrency, timeout):
+    stub = account_service_pb2_grpc.AccountServiceStub(channel)
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def call(i):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            stub.GetBalance(account_service_pb2.GetBalanceRequest(account_id=str(i), user_id=1),
+                            timeout=timeout)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+        except grpc.RpcError:
+            with lock:
+                errors += 1
+
+    start = time.perf_counter()
+    with futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(total)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def run_mode(name, start_server, args):
+    port, stop = start_server(args)
+    channel = grpc.insecure_channel(f'127.0.0.1:{port}')
+    grpc.channel_ready_future(channel).result(timeout=10)
+
+    stop_streams = threading.Event()
+    calls, threads = hold_streams(channel, args.streams, args.stream_read_interval, stop_streams)
+    # Let every stream get scheduled before measuring
+    time.sleep(1)
+
+    elapsed, latencies, errors = fire_unary_calls(channel, args.calls, args.concurrency, args.timeout)
+
+    stop_streams.set()
+    for call in calls:
+        call.cancel()
+    for thread in threads:
+        thread.join(timeout=5)
+    channel.close()
+    stop(1)
+
+    latencies.sort()
+    result = {
+        'mode': name,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else float('nan'),
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else float('nan'),
+        'errors': errors,
+    }
+    print(f"{name:>5}: {result['rps']:8.1f} unary rps  p50 {result['p50_ms']:8.1f} ms  "
+          f"p99 {result['p99_ms']:8.1f} ms  errors {errors}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8, help='Threads for blocking work in both modes')
+    parser.add_argument('--streams', type=int, default=32, help='Long-lived streams held open during the run')
+    parser.add_argument('--stream-read-interval', type=float, default=0.5,
+                        help='Seconds each stream consumer waits between batches')
+    parser.add_argument('--batch-size', type=int, default=200, help='Transactions per streamed batch')
+    parser.add_argument('--calls', type=int, default=2000, help='Unary GetBalance calls to fire')
+    parser.add_argument('--concurrency', type=int, default=64, help='Concurrent unary callers')
+    parser.add_argument('--db-latency', type=float, default=0.005, help='Simulated database latency in seconds')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Deadline for each unary call')
+    parser.add_argument('--mode', choices=['sync', 'aio', 'both'], default='both')
+    args = parser.parse_args()
+
+    print(f"workers={args.workers} streams={args.streams} calls={args.calls} "
+          f"concurrency={args.concurrency} db_latency={args.db_latency * 1000:.1f}ms")
+    if args.mode in ('sync', 'both'):
+        run_mode('sync', start_sync_server, args)
+    if args.mode in ('aio', 'both'):
+        run_mode('aio', start_aio_server, args)
+
+
+if __name__ == '__main__':
+    main()
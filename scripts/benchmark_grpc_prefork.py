@@ -0,0 +1,161 @@
+"""
+Benchmark how gRPC throughput scales with pre-forked worker processes.
+
+For each worker count the script starts grpc_utils.prefork in a subprocess,
+with a GetBalance handler that burns a fixed amount of CPU per call, and
+drives it from several client processes (each with its own connection, so
+SO_REUSEPORT can spread them across workers). A single process is capped at
+about one core by the GIL; RPS should grow roughly linearly with workers
+until the cores, or the client processes, run out.
+
+Usage:
+    python scripts/benchmark_grpc_prefork.py --max-workers 8 --duration 10
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grpc
+
+from proto import account_service_pb2, account_service_pb2_grpc
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve(workers, port, cpu_iterations, max_rpcs):
+    """Run the pre-fork launcher with a CPU-bound GetBalance."""
+    import hashlib
+    from grpc_utils.prefork import PreforkServer
+    from grpc_utils.server import GrpcServer
+    from api.grpc.account_service import AccountServicer
+
+    class CpuBoundAccountServicer(AccountServicer):
+        def GetBalance(self, request, context):
+            digest = request.account_id.encode()
+            for _ in range(cpu_iterations):
+                digest = hashlib.sha256(digest).digest()
+            return account_service_pb2.BalanceResponse(
+                success=True, account_id=request.account_id, balance=100.0, currency="USD")
+
+    def server_factory(address, app, max_workers):
+        # Connections may all land on one worker, which must not shed the load
+        server = GrpcServer(address=address, app=app, max_workers=max_workers,
+                            maximum_concurrent_rpcs=max_rpcs, options=[('grpc.so_reuseport', 1)])
+        server.add_service(
+            account_service_pb2.DESCRIPTOR.services_by_name['AccountService'].full_name,
+            CpuBoundAccountServicer(),
+            account_service_pb2_grpc.add_AccountServiceServicer_to_server)
+        return server
+
+    PreforkServer(workers=workers, address=f'127.0.0.1:{port}', threads_per_worker=4,
+                  server_factory=server_factory).run()
+
+
+def client_worker(port, duration, concurrency, results):
+    """Issue calls on one connection for duration seconds, report calls and errors."""
+    from concurrent import futures
+
+    # A local subchannel pool gives this process its own TCP connection
+    channel = grpc.insecure_channel(f'127.0.0.1:{port}', options=[('grpc.use_local_subchannel_pool', 1)])
+    grpc.channel_ready_future(channel).result(timeout=10)
+    stub = account_service_pb2_grpc.AccountServiceStub(channel)
+    deadline = time.monotonic() + duration
+
+    def loop(i):
+        count = errors = 0
+        request = account_service_pb2.GetBalanceRequest(account_id=str(i), user_id=1)
+        while time.monotonic() < deadline:
+            try:
+                stub.GetBalance(request, timeout=10)
+                count += 1
+            except grpc.RpcError:
+                errors += 1
+        return count, errors
+
+    with futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        counts = list(pool.map(loop, range(concurrency)))
+    results.put((sum(count for count, _ in counts), sum(errors for _, errors in counts)))
+    channel.close()
+
+
+def measure(workers, args):
+    port = free_port()
+    clients = args.clients_per_worker * workers
+    server = subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), '--serve', str(workers),
+        '--port', str(port), '--cpu-iterations', str(args.cpu_iterations),
+        '--max-rpcs', str(clients * args.client_threads)
+    ])
+    try:
+        channel = grpc.insecure_channel(f'127.0.0.1:{port}')
+        grpc.channel_ready_future(channel).result(timeout=30)
+        channel.close()
+        # Give every worker time to bind before the clients connect
+        time.sleep(1)
+
+        # The parent already has gRPC threads running, so clients must be
+        # spawned rather than forked
+        spawn = multiprocessing.get_context('spawn')
+        results = spawn.Queue()
+        clients = [
+            spawn.Process(target=client_worker,
+                          args=(port, args.duration, args.client_threads, results))
+            for _ in range(clients)
+        ]
+        for client in clients:
+            client.start()
+        # A client that crashed never reports, so do not wait for it forever
+        reports = [results.get(timeout=args.duration + 60) for _ in clients]
+        for client in clients:
+            client.join()
+        return sum(count for count, _ in reports) / args.duration, sum(errors for _, errors in reports)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per worker count')
+    parser.add_argument('--clients-per-worker', type=int, default=2, help='Client processes per server worker')
+    parser.add_argument('--client-threads', type=int, default=8, help='Concurrent calls per client process')
+    parser.add_argument('--cpu-iterations', type=int, default=2000, help='SHA-256 rounds per call')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--max-rpcs', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.cpu_iterations, args.max_rpcs)
+        return
+
+    counts = []
+    count = 1
+    while count <= args.max_workers:
+        counts.append(count)
+        count *= 2
+    if counts[-1] != args.max_workers:
+        counts.append(args.max_workers)
+
+    baseline = None
+    print(f"{'workers':>7} {'rps':>10} {'speedup':>8} {'errors':>7}")
+    for workers in counts:
+        rps, errors = measure(workers, args)
+        baseline = baseline or rps
+        print(f"{workers:>7} {rps:>10.1f} {rps / baseline:>7.2f}x {errors:>7}")
+
+
+if __name__ == '__main__':
+    main()
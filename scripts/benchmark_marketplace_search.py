@@ -0,0 +1,134 @@
+"""
+Benchmark marketplace search on a synthetic catalog.
+
+Builds the in-process inverted index over generated listings, with a
+Zipf-distributed vocabulary so a few terms match a large share of the
+catalog the way "new" or "black" would, then times ranked keyword
+queries, price-filtered queries and prefix autocomplete. Queries are drawn
+from the listings themselves, so most of them match something.
+
+Needs no database or gRPC; it measures the index alone, which is the part
+of a search request that grows with the catalog. The page of results is
+then read by primary key.
+
+Usage:
+    python scripts/benchmark_marketplace_search.py --listings 1000000 --queries 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.search_index import InvertedIndex
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "vo", "zi", "pe", "sa", "do", "fu", "gi", "ha", "je"]
+
+
+def make_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_listings(count, vocabulary, rng):
+    """Yield (item_id, name, description, price) with Zipf-distributed words."""
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    cumulative = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    for item_id in range(1, count + 1):
+        words = rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(10, 24))
+        name_length = rng.randint(2, 4)
+        price = round(rng.lognormvariate(3.5, 1.2), 2) + 0.01
+        yield item_id, " ".join(words[:name_length]), " ".join(words[name_length:]), price
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(name, samples):
+    print(f"{name:<28} p50 {percentile(samples, 0.50) * 1000:7.2f} ms   "
+          f"p95 {percentile(samples, 0.95) * 1000:7.2f} ms   "
+          f"p99 {percentile(samples, 0.99) * 1000:7.2f} ms   "
+          f"max {max(samples) * 1000:7.2f} ms   "
+          f"mean {statistics.mean(samples) * 1000:6.2f} ms")
+
+
+def time_calls(calls):
+    samples = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark marketplace search")
+    parser.add_argument('--listings', type=int, default=1_000_000, help='Synthetic listings to index')
+    parser.add_argument('--vocabulary', type=int, default=50_000, help='Distinct words in the catalog')
+    parser.add_argument('--queries', type=int, default=5000, help='Queries per query kind')
+    parser.add_argument('--page-size', type=int, default=20, help='Results per query')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--memory', action='store_true', help='Trace index memory (slows the build)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    listings = list(make_listings(args.listings, vocabulary, rng))
+
+    if args.memory:
+        tracemalloc.start()
+    index = InvertedIndex()
+    start = time.perf_counter()
+    index.bulk_load(listings)
+    print(f"Indexed {len(index)} listings with {len(vocabulary)} words in {time.perf_counter() - start:.1f}s")
+    if args.memory:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Index memory: {current / 2 ** 20:.0f} MiB")
+
+    samples = [listings[rng.randrange(len(listings))] for _ in range(args.queries)]
+    del listings
+
+    def query(listing):
+        words = (listing[1] + " " + listing[2]).split()
+        return " ".join(rng.sample(words, min(len(words), rng.randint(1, 3))))
+
+    keyword = [query(listing) for listing in samples]
+    priced = [(query(listing), listing[3] * 0.8, listing[3] * 1.25) for listing in samples]
+    prefixes = [rng.choice(listing[1].split())[:rng.randint(2, 5)] for listing in samples]
+    size = args.page_size
+
+    report("keyword", time_calls(lambda q=q: index.search(q, limit=size) for q in keyword))
+    report("keyword, page 5", time_calls(lambda q=q: index.search(q, limit=size, offset=4 * size)
+                                         for q in keyword))
+    report("keyword + price range", time_calls(lambda p=p: index.search(p[0], limit=size, min_price=p[1],
+                                                                         max_price=p[2]) for p in priced))
+    report("autocomplete", time_calls(lambda p=p: index.suggest(p) for p in prefixes))
+
+    # Writes interleaved with reads, as sales and new listings arrive
+    next_id = len(index) + 1
+    mixed = []
+    for i, q in enumerate(keyword):
+        if i % 10 == 0:
+            victim = rng.randint(1, next_id - 1)
+            mixed.append(lambda v=victim: index.remove(v))
+            mixed.append(lambda n=next_id, q=q: index.add(n, q, "", 10))
+            next_id += 1
+        mixed.append(lambda q=q: index.search(q, limit=size))
+    report("keyword with 10% writes", time_calls(mixed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+This script imports exchange rates from the rate feed into exchange_rates.
+Running app processes pick the new rates up within FX_REFRESH_SECONDS.
+
+The feed is a local CSV (FX_RATES_FILE, extresources/fx_rates.csv by default)
+with base_currency, quote_currency, rate and optional effective_at columns.
+Rows already imported are skipped, so the script can run as often as the
+file is updated.
+
+Example cron entry (every 15 minutes):
+*/15 * * * * /path/to/python /path/to/scripts/import_fx_rates_scheduled.py >> /path/to/logs/fx_rates.log 2>&1
+"""
+import sys
+import logging
+import argparse
+from pathlib import Path
+
+# Add the project root directory to the Python path
+script_dir = Path(__file__).resolve().parent
+project_root = script_dir.parent
+sys.path.insert(0, str(project_root))
+
+from app_factory import create_app
+from core.services.fx_rates import FileRateFeed, fx_rates
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger("fx_rates")
+
+
+def run_import(path=None):
+    """
+    Import the rate feed at path.
+
+    Returns:
+        Tuple of (success: bool, message: str)
+    """
+    app = create_app()
+
+    with app.app_context():
+        feed = FileRateFeed(path)
+        imported = fx_rates.import_feed(feed)
+        matrix = fx_rates.current()
+        summary = (f"Imported {imported} new rates from {feed.path}; "
+                   f"{len(matrix.currencies)} currencies effective as of {matrix.effective_at}")
+        logger.info(summary)
+        return True, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exchange rate import")
+    parser.add_argument(
+        "--file",
+        help="Rate feed CSV (defaults to FX_RATES_FILE or extresources/fx_rates.csv)"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        success, message = run_import(path=args.file)
+        if not success:
+            logger.error(f"Import failed: {message}")
+            sys.exit(1)
+    except Exception as e:
+        logger.exception(f"Error importing exchange rates: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+This script values every user's full position (cash accounts, crypto and
+stock holdings) in one vectorized pass and stores one portfolio_valuations
+row per user.
+
+Schedule it nightly with cron (Linux/macOS) or Task Scheduler (Windows).
+
+Example cron entry (daily at 2am):
+0 2 * * * /path/to/python /path/to/scripts/value_portfolios_scheduled.py >> /path/to/logs/valuation.log 2>&1
+"""
+import sys
+import logging
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+# Add the project root directory to the Python path
+script_dir = Path(__file__).resolve().parent
+project_root = script_dir.parent
+sys.path.insert(0, str(project_root))
+
+from app_factory import create_app
+from core.services.portfolio_valuation import BASE_CURRENCY, save_valuations, value_portfolios
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger("portfolio_valuation")
+
+
+def run_valuation(base_currency=BASE_CURRENCY, dry_run=False):
+    """
+    Value all users and store the results.
+
+    Returns:
+        Tuple of (success: bool, message: str)
+    """
+    app = create_app()
+
+    with app.app_context():
+        start_time = datetime.now()
+        valuation = value_portfolios(base_currency=base_currency)
+        logger.info(f"Valued {len(valuation)} users in {(datetime.now() - start_time).total_seconds():.2f} seconds")
+
+        for code, (native, converted) in sorted(valuation.currency_totals.items()):
+            logger.info(f"Cash in {code}: {native:,.2f} ({'unpriced' if converted is None else f'{converted:,.2f} {base_currency}'})")
+
+        if dry_run:
+            logger.info("[DRY RUN] Would store valuations")
+        else:
+            stored = save_valuations(valuation, valued_at=start_time)
+            logger.info(f"Stored {stored} valuations")
+
+        summary = f"Portfolio valuation completed in {(datetime.now() - start_time).total_seconds():.2f} seconds"
+        logger.info(summary)
+        return True, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nightly portfolio valuation")
+    parser.add_argument(
+        "--base-currency",
+        default=BASE_CURRENCY,
+        help=f"Currency to value portfolios in (default {BASE_CURRENCY})"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Dry run mode - value portfolios but don't store the results"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        success, message = run_valuation(base_currency=args.base_currency, dry_run=args.dry_run)
+        if not success:
+            logger.error(f"Valuation failed: {message}")
+            sys.exit(1)
+    except Exception as e:
+        logger.exception(f"Error running valuation: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
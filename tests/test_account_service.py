@@ -0,0 +1,187 @@
+import grpc
+import pytest
+from flask import Flask
+from unittest.mock import MagicMock
+from utils.extensions import db
+from core.models import User, Account
+from api.grpc import account_service
+from api.grpc.account_service import AccountServicer
+from proto import account_service_pb2
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+    })
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def accounts(app):
+    owner = User(username="owner", email="owner@example.com", password_hash="hashedpassword")
+    other = User(username="other", email="other@example.com", password_hash="hashedpassword")
+    db.session.add_all([owner, other])
+    db.session.commit()
+    checking = Account(account_type="checking", balance=120, currency_code="EUR", user_id=owner.user_id)
+    savings = Account(account_type="savings", balance=80, currency_code="USD", user_id=owner.user_id)
+    foreign = Account(account_type="checking", balance=999, currency_code="EUR", user_id=other.user_id)
+    db.session.add_all([checking, savings, foreign])
+    db.session.commit()
+    return owner.user_id, checking.account_id, savings.account_id, foreign.account_id
+
+
+def test_get_balances_reports_each_requested_id(accounts):
+    user_id, checking, savings, foreign = accounts
+    requested = [str(savings), str(foreign), "999999", "²", "abc", "", f"0{checking}", str(savings)]
+    context = MagicMock()
+
+    response = AccountServicer().GetBalances(
+        account_service_pb2.GetBalancesRequest(account_ids=requested, user_id=user_id), context)
+
+    context.set_code.assert_not_called()
+    assert response.success
+    assert [balance.account_id for balance in response.balances] == requested
+    assert [balance.message for balance in response.balances] == [
+        "Balance retrieved successfully",
+        "Permission denied",
+        "Account not found",
+        "Account not found",
+        "Account not found",
+        "Account not found",
+        "Balance retrieved successfully",
+        "Balance retrieved successfully",
+    ]
+    assert (response.balances[0].balance, response.balances[0].currency) == (80, "USD")
+    assert response.balances[1].balance == 0
+    assert (response.balances[6].balance, response.balances[6].currency) == (120, "EUR")
+    assert response.message == "Retrieved 3 of 8 balances"
+
+
+def test_get_balances_rejects_oversized_batches(accounts, monkeypatch):
+    user_id, checking, _, _ = accounts
+    monkeypatch.setattr(account_service, 'MAX_BATCH_BALANCE_ACCOUNTS', 2)
+    context = MagicMock()
+
+    response = AccountServicer().GetBalances(
+        account_service_pb2.GetBalancesRequest(account_ids=[str(checking)] * 3, user_id=user_id), context)
+
+    context.set_code.assert_called_with(grpc.StatusCode.INVALID_ARGUMENT)
+    assert not response.success
+    assert len(response.balances) == 0
+
+
+@pytest.fixture
+def ledger(accounts):
+    """Ten more accounts across types, currencies, balances and owners."""
+    owner_id = accounts[0]
+    db.session.add_all([
+        Account(account_type="savings" if i % 3 == 0 else "checking", balance=i * 10,
+                currency_code="EUR" if i % 2 else "USD", user_id=owner_id if i < 5 else owner_id + 1)
+        for i in range(10)
+    ])
+    db.session.commit()
+    return db.session.query(Account).order_by(Account.account_id).all()
+
+
+def list_request(**kwargs):
+    return account_service_pb2.ListAllAccountsRequest(**kwargs)
+
+
+def all_pages(servicer, **kwargs):
+    pages, token = [], ""
+    while True:
+        response = servicer.ListAllAccounts(list_request(page_token=token, **kwargs), MagicMock())
+        assert response.success
+        pages.append([account.account_id for account in response.accounts])
+        token = response.next_page_token
+        if not token:
+            return pages
+
+
+def test_list_all_accounts_follows_page_tokens(ledger):
+    servicer = AccountServicer()
+    ids = [str(account.account_id) for account in ledger]
+
+    assert all_pages(servicer, limit=5, ascending=True) == [ids[:5], ids[5:10], ids[10:]]
+    assert all_pages(servicer, limit=4, ascending=True) == [ids[:4], ids[4:8], ids[8:12], ids[12:]]
+    # A full last page has no token, rather than one leading to an empty page
+    assert all_pages(servicer, limit=13, ascending=True) == [ids]
+    assert all_pages(servicer, limit=6) == [ids[::-1][:6], ids[::-1][6:12], ids[::-1][12:]]
+
+
+def test_list_all_accounts_page_details(ledger):
+    servicer = AccountServicer()
+    ids = [str(account.account_id) for account in ledger]
+
+    first = servicer.ListAllAccounts(list_request(limit=5, ascending=True, include_total_count=True), MagicMock())
+    assert (first.total_count, first.limit, first.next_page_token) == (13, 5, ids[4])
+
+    legacy = servicer.ListAllAccounts(list_request(limit=5, ascending=True, page=2), MagicMock())
+    assert [account.account_id for account in legacy.accounts] == ids[5:10]
+    assert legacy.total_count == 0
+
+
+@pytest.mark.parametrize('kwargs, expected', [
+    ({'type_filter': 1}, lambda a: a.account_type == 'savings'),
+    ({'currency_filter': 'eur'}, lambda a: a.currency_code == 'EUR'),
+    ({'min_balance': 30, 'max_balance': 70}, lambda a: 30 <= a.balance <= 70),
+    ({'status_filter': 2}, lambda a: False),
+    ({'search': 'holder'}, lambda a: False),
+])
+def test_list_all_accounts_filters(ledger, kwargs, expected):
+    response = AccountServicer().ListAllAccounts(list_request(limit=100, ascending=True, **kwargs), MagicMock())
+
+    assert [account.account_id for account in response.accounts] == [
+        str(account.account_id) for account in ledger if expected(account)]
+
+
+def test_list_all_accounts_searches_by_account_or_user_id(ledger):
+    owner_id = ledger[0].user_id
+    servicer = AccountServicer()
+
+    by_user = servicer.ListAllAccounts(list_request(limit=100, search=str(owner_id)), MagicMock())
+    by_account = servicer.ListAllAccounts(list_request(limit=100, search=str(ledger[-1].account_id)), MagicMock())
+
+    assert {account.user_id for account in by_user.accounts} == {owner_id}
+    assert len(by_user.accounts) == sum(1 for account in ledger if account.user_id == owner_id)
+    assert [account.account_id for account in by_account.accounts] == [str(ledger[-1].account_id)]
+
+
+@pytest.mark.parametrize('kwargs', [{'sort_by': 'balance'}, {'page_token': 'not-a-token'}])
+def test_list_all_accounts_rejects_bad_requests(ledger, kwargs):
+    context = MagicMock()
+
+    response = AccountServicer().ListAllAccounts(list_request(**kwargs), context)
+
+    context.set_code.assert_called_with(grpc.StatusCode.INVALID_ARGUMENT)
+    assert not response.success
+
+
+@pytest.mark.parametrize('kwargs', [{'ascending': True}, {}, {'ascending': True, 'currency_filter': 'USD'}])
+def test_stream_all_accounts_matches_the_pages(ledger, monkeypatch, kwargs):
+    # Small batches, so the stream crosses several fetches
+    monkeypatch.setattr(account_service, 'STREAM_ACCOUNTS_BATCH_SIZE', 2)
+    servicer = AccountServicer()
+    pages = all_pages(servicer, limit=3, **kwargs)
+
+    streamed = list(servicer.StreamAllAccounts(list_request(**kwargs), MagicMock()))
+
+    assert [account.account_id for account in streamed] == [account_id for page in pages for account_id in page]
+    assert streamed[0] == servicer.ListAllAccounts(list_request(limit=1, **kwargs), MagicMock()).accounts[0]
+
+
+def test_stream_all_accounts_resumes_after_token(ledger):
+    servicer = AccountServicer()
+    ids = [str(account.account_id) for account in ledger]
+
+    resumed = servicer.StreamAllAccounts(list_request(ascending=True, page_token=ids[6]), MagicMock())
+
+    assert [account.account_id for account in resumed] == ids[7:]
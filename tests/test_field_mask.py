@@ -0,0 +1,164 @@
+import grpc
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from flask import Flask
+from google.protobuf.field_mask_pb2 import FieldMask
+from sqlalchemy import inspect
+from utils.extensions import db
+from core.models import User, Account, Transaction
+from grpc_utils.field_mask import FieldProjection
+from api.grpc.account_service import AccountServicer
+from api.grpc.transaction_service import TransactionServicer
+from proto import account_service_pb2, transaction_service_pb2
+
+
+PROJECTION = FieldProjection(
+    dict,
+    {
+        'transaction_id': ((Transaction.transaction_id,), lambda tx: str(tx.transaction_id)),
+        'user_id': ((), lambda tx: ""),
+        'amount': ((Transaction.amount,), lambda tx: str(tx.amount)),
+        'description': ((Transaction.description,), lambda tx: tx.description),
+        'reference_id': ((Transaction.recipient_account_id,), lambda tx: str(tx.recipient_account_id or "")),
+    },
+    always=(Transaction.transaction_id, Transaction.date_posted)
+)
+
+
+def mask(*paths):
+    return SimpleNamespace(paths=list(paths))
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+    })
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def transaction(app):
+    user = User(username="maskuser", email="mask@example.com", password_hash="hashedpassword")
+    db.session.add(user)
+    db.session.commit()
+    account = Account(account_type="checking", balance=100, currency_code="USD", user_id=user.user_id)
+    db.session.add(account)
+    db.session.commit()
+    tx = Transaction(account_id=account.account_id, date_posted=datetime(2025, 1, 1),
+                     description="groceries", amount=12.5, type="payment")
+    db.session.add(tx)
+    db.session.commit()
+    tx_id = tx.transaction_id
+    db.session.expunge_all()
+    return tx_id
+
+
+def test_empty_mask_selects_everything():
+    assert PROJECTION.resolve(mask()) is None
+    assert PROJECTION.resolve(None) is None
+
+
+def test_unknown_path_is_rejected():
+    with pytest.raises(ValueError):
+        PROJECTION.resolve(mask("amount", "balance"))
+
+
+def test_columns_include_cursor_columns_once():
+    columns = PROJECTION.columns({"transaction_id", "amount"})
+    assert [column.key for column in columns] == ["transaction_id", "date_posted", "amount"]
+
+
+def test_load_only_defers_unrequested_columns(transaction):
+    fields = PROJECTION.resolve(mask("amount"))
+    tx = db.session.query(Transaction).options(PROJECTION.load_only(fields)).get(transaction)
+
+    unloaded = inspect(tx).unloaded
+    assert "description" in unloaded
+    assert "amount" not in unloaded
+    assert PROJECTION.to_proto(tx, fields) == {"amount": "12.5"}
+    # Serializing the selected fields must not load the deferred ones
+    assert "description" in inspect(tx).unloaded
+
+
+def test_projected_rows_and_passed_values(transaction):
+    fields = PROJECTION.resolve(mask("transaction_id", "user_id", "reference_id"))
+    row = db.session.query(*PROJECTION.columns(fields)).one()
+
+    assert PROJECTION.to_proto(row, fields, user_id="7") == {
+        "transaction_id": str(transaction),
+        "user_id": "7",
+        "reference_id": "",
+    }
+
+
+def get_accounts(*paths):
+    user_id = db.session.query(User.user_id).scalar()
+    context = MagicMock()
+    response = AccountServicer().GetAccounts(
+        account_service_pb2.GetAccountsRequest(user_id=user_id, read_mask=FieldMask(paths=paths)), context)
+    return response, context
+
+
+def get_history(*paths):
+    user_id, account_id = db.session.query(Account.user_id, Account.account_id).one()
+    context = MagicMock()
+    response = TransactionServicer().GetTransactionHistory(
+        transaction_service_pb2.GetTransactionHistoryRequest(
+            user_id=str(user_id), account_id=str(account_id), read_mask=FieldMask(paths=paths)),
+        context)
+    return response, context
+
+
+def test_get_accounts_populates_only_masked_fields(transaction):
+    account_id = db.session.query(Account.account_id).scalar()
+
+    response, context = get_accounts("account_id", "balance")
+
+    context.set_code.assert_not_called()
+    assert list(response.accounts) == [account_service_pb2.Account(account_id=str(account_id), balance=100)]
+
+
+def test_get_accounts_empty_mask_returns_every_field(transaction):
+    account = db.session.query(Account).one()
+
+    response, _ = get_accounts()
+
+    assert list(response.accounts) == [AccountServicer()._account_to_proto(account)]
+    assert (response.accounts[0].currency, response.accounts[0].user_id) == ("USD", account.user_id)
+
+
+def test_get_transaction_history_populates_only_masked_fields(transaction):
+    user_id = db.session.query(User.user_id).scalar()
+
+    response, context = get_history("amount", "user_id")
+
+    context.set_code.assert_not_called()
+    assert list(response.transactions) == [
+        transaction_service_pb2.Transaction(amount="12.5", user_id=str(user_id))]
+
+
+def test_get_transaction_history_empty_mask_returns_every_field(transaction):
+    response, _ = get_history()
+
+    tx = response.transactions[0]
+    assert (tx.transaction_id, tx.description, tx.amount, tx.transaction_type, tx.status) == (
+        str(transaction), "groceries", "12.5", "payment", "completed")
+    assert tx.date_posted == datetime(2025, 1, 1).isoformat()
+
+
+@pytest.mark.parametrize('call', [get_accounts, get_history])
+def test_unknown_mask_path_is_invalid_argument(transaction, call):
+    response, context = call("amount", "no_such_field")
+
+    context.set_code.assert_called_with(grpc.StatusCode.INVALID_ARGUMENT)
+    assert not response.success
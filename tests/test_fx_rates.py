@@ -0,0 +1,150 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import Flask
+from utils.extensions import db
+from core.models import User, Account, Transaction
+from core.services import fx_rates as fx_module
+from core.services.fx_rates import FileRateFeed, FxRates, RateMatrix, RateUnavailable
+from database.repositories.transaction_repo import process_transfer
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+    })
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+class ListFeed:
+    def __init__(self, rates):
+        self.rates = rates
+
+    def fetch(self):
+        return self.rates
+
+
+@pytest.fixture
+def rates(app, monkeypatch):
+    rates = FxRates(refresh_interval=3600)
+    rates.import_feed(ListFeed([
+        ("USD", "EUR", Decimal("0.92"), datetime(2024, 1, 1)),
+        ("USD", "GBP", Decimal("0.79"), datetime(2024, 1, 1)),
+    ]))
+    monkeypatch.setattr(fx_module, "fx_rates", rates)
+    monkeypatch.setattr("database.repositories.transaction_repo.fx_rates", rates)
+    return rates
+
+
+def test_matrix_has_direct_inverse_and_crossed_rates():
+    matrix = RateMatrix([("USD", "EUR", Decimal("0.8")), ("USD", "GBP", Decimal("0.5")),
+                         ("EUR", "USD", Decimal("1.3"))])
+
+    assert matrix.rate("USD", "EUR") == Decimal("0.8")
+    assert matrix.rate("EUR", "USD") == Decimal("1.3")  # Quoted, not the inverse
+    assert matrix.rate("GBP", "USD") == Decimal("2")
+    assert matrix.rate("GBP", "EUR") == Decimal("1.6")  # Crossed through USD
+    assert matrix.rate("JPY", "JPY") == Decimal("1")
+    with pytest.raises(RateUnavailable):
+        matrix.rate("USD", "JPY")
+
+
+def test_latest_effective_rate_is_used(rates):
+    rates.import_feed(ListFeed([
+        ("USD", "EUR", Decimal("0.95"), datetime(2024, 6, 1)),
+        ("USD", "EUR", Decimal("0.99"), datetime.utcnow() + timedelta(days=1)),
+    ]))
+
+    assert rates.rate("USD", "EUR") == Decimal("0.95")
+    assert rates.current().effective_at == datetime(2024, 6, 1)
+
+
+def test_file_feed_is_imported_once(app, tmp_path):
+    path = tmp_path / "rates.csv"
+    path.write_text(
+        "base_currency,quote_currency,rate,effective_at\n"
+        "usd,jpy,150,2024-01-01T00:00:00\n"
+    )
+    rates = FxRates(refresh_interval=3600)
+
+    assert rates.import_feed(FileRateFeed(str(path))) == 1
+    assert rates.import_feed(FileRateFeed(str(path))) == 0
+    assert rates.convert(Decimal("10"), "USD", "JPY") == (Decimal("1500.00"), Decimal("150"))
+
+
+@pytest.fixture
+def accounts(app):
+    user = User(username="fxuser", email="fxuser@example.com", password_hash="hashedpassword")
+    db.session.add(user)
+    db.session.commit()
+    usd = Account(account_type="checking", balance=100, currency_code="USD", user_id=user.user_id)
+    eur = Account(account_type="savings", balance=0, currency_code="EUR", user_id=user.user_id)
+    jpy = Account(account_type="savings", balance=0, currency_code="JPY", user_id=user.user_id)
+    db.session.add_all([usd, eur, jpy])
+    db.session.commit()
+    return usd.account_id, eur.account_id, jpy.account_id
+
+
+def test_transfer_credits_converted_amount_and_records_rate(rates, accounts):
+    usd, eur, _ = accounts
+
+    success, message, transaction = process_transfer(usd, eur, Decimal("10.50"))
+
+    assert success, message
+    assert db.session.get(Account, usd).balance == Decimal("89.50")
+    assert db.session.get(Account, eur).balance == Decimal("9.66")
+    credit = db.session.query(Transaction).filter_by(account_id=eur).one()
+    assert credit.amount == pytest.approx(9.66)
+    assert transaction.exchange_rate == credit.exchange_rate == Decimal("0.92")
+
+
+def test_transfer_without_rate_is_rejected(rates, accounts):
+    usd, _, jpy = accounts
+
+    success, message, _ = process_transfer(usd, jpy, Decimal("10"))
+
+    assert not success
+    assert message == "No exchange rate from USD to JPY"
+    assert db.session.get(Account, usd).balance == Decimal("100")
+
+
+@pytest.fixture
+def client(app, accounts):
+    from flask_login import LoginManager
+    from api.rest.routes.account_routes import account_api
+
+    app.config["SECRET_KEY"] = "test"
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+    app.register_blueprint(account_api)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(db.session.get(Account, accounts[0]).user_id)
+    return client
+
+
+@pytest.mark.parametrize("amount", ["NaN", "sNaN", "Infinity", "-Infinity", "0", "-5", "ten"])
+def test_transfer_route_rejects_invalid_amounts(rates, accounts, client, amount):
+    usd, eur, _ = accounts
+
+    response = client.post(f"/accounts/{usd}/transfer", json={"amount": amount, "recipient_account_id": eur})
+
+    assert response.status_code == 400
+    assert db.session.get(Account, usd).balance == Decimal("100")
+
+
+def test_transfer_route_converts_valid_amount(rates, accounts, client):
+    usd, eur, _ = accounts
+
+    response = client.post(f"/accounts/{usd}/transfer", json={"amount": "10.50", "recipient_account_id": eur})
+
+    assert response.status_code == 200
+    assert response.get_json()["credited_amount"] == pytest.approx(9.66)
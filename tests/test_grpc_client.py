@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+from concurrent import futures
+
+import grpc
+import pytest
+
+from grpc_client.channels import ChannelPool, build_service_config
+from grpc_client.client import AccountClient
+from grpc_client.hedging import HedgingPolicy
+from proto import account_service_pb2, account_service_pb2_grpc
+
+
+class FakeAccountServicer(account_service_pb2_grpc.AccountServiceServicer):
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+        self.slow_first_call = threading.Event()
+
+    def record(self, name, request):
+        with self.lock:
+            self.calls.append((name, request))
+            return len(self.calls)
+
+    def GetAccount(self, request, context):
+        if self.record('GetAccount', request) == 1:
+            self.slow_first_call.wait(5)
+        return account_service_pb2.AccountResponse(success=True, message=context.peer())
+
+    def GetBalance(self, request, context):
+        self.record('GetBalance', request)
+        time.sleep(1)
+        return account_service_pb2.BalanceResponse(success=True, account_id=request.account_id)
+
+    def GetBalances(self, request, context):
+        self.record('GetBalances', request)
+        return account_service_pb2.GetBalancesResponse(success=True, balances=[
+            account_service_pb2.BalanceResponse(success=True, account_id=account_id, balance=float(account_id))
+            for account_id in request.account_ids
+        ])
+
+
+@pytest.fixture
+def servicer():
+    return FakeAccountServicer()
+
+
+@pytest.fixture
+def target(servicer):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=16))
+    account_service_pb2_grpc.add_AccountServiceServicer_to_server(servicer, server)
+    port = server.add_insecure_port('127.0.0.1:0')
+    server.start()
+    yield f'127.0.0.1:{port}'
+    servicer.slow_first_call.set()
+    server.stop(None)
+
+
+@pytest.fixture
+def pool():
+    pool = ChannelPool()
+    yield pool
+    pool.close()
+
+
+def test_pool_reuses_one_channel_per_target(pool):
+    assert pool.channel('127.0.0.1:1') is pool.channel('127.0.0.1:1')
+    assert pool.channel('127.0.0.1:1') is not pool.channel('127.0.0.1:2')
+
+
+def test_service_config_retries_only_idempotent_methods():
+    config = json.loads(build_service_config())
+    names = config['methodConfig'][0]['name']
+
+    assert {'service': 'banking.account.AccountService', 'method': 'GetBalance'} in names
+    assert {'service': 'banking.TransactionService', 'method': 'ProcessTransfer'} not in names
+    assert 'UNAVAILABLE' in config['methodConfig'][0]['retryPolicy']['retryableStatusCodes']
+
+
+def test_default_deadline_is_applied(target, pool):
+    client = AccountClient(target, pool=pool, deadlines={'GetBalance': 0.2}, batch_window=0)
+
+    with pytest.raises(grpc.RpcError) as error:
+        client.get_balance(1, user_id=1)
+    assert error.value.code() == grpc.StatusCode.DEADLINE_EXCEEDED
+
+
+def test_concurrent_balance_lookups_are_batched(target, pool, servicer):
+    client = AccountClient(target, pool=pool, batch_window=0.1)
+    results = {}
+
+    def lookup(account_id):
+        results[account_id] = client.get_balance(account_id, user_id=7)
+
+    threads = [threading.Thread(target=lookup, args=(i,)) for i in range(1, 11)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [name for name, _ in servicer.calls] == ['GetBalances']
+    assert sorted(servicer.calls[0][1].account_ids, key=int) == [str(i) for i in range(1, 11)]
+    assert all(results[i].balance == float(i) for i in range(1, 11))
+
+
+def test_slow_read_is_hedged(target, pool, servicer):
+    client = AccountClient(target, pool=pool, hedging=HedgingPolicy(delay=0.05))
+
+    start = time.monotonic()
+    response = client.GetAccount(account_service_pb2.GetAccountRequest(account_id='1', user_id=1))
+
+    assert response.success
+    assert time.monotonic() - start < 2
+    assert [name for name, _ in servicer.calls] == ['GetAccount', 'GetAccount']
@@ -0,0 +1,324 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+
+import grpc
+import pytest
+from flask import Flask, current_app, has_app_context
+from unittest.mock import MagicMock
+
+from grpc_utils.interceptors import AppContextInterceptor, MetricsInterceptor, wrap_rpc_handler
+from grpc_utils.metrics import MetricsRegistry
+from grpc_utils.server import GrpcServer
+from utils.extensions import db
+from core.models import User, Account
+from proto import account_service_pb2, account_service_pb2_grpc
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def db_app(tmp_path):
+    # A file database, since stopping a server disposes of the engine
+    app = Flask(__name__)
+    app.config.update({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'grpc.db'}",
+    })
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def holder(db_app):
+    user = User(username="holder", email="holder@example.com", password_hash="hashedpassword",
+                full_name="Ana Holder")
+    db.session.add(user)
+    db.session.commit()
+    account = Account(account_type="checking", balance=250, currency_code="EUR", user_id=user.user_id)
+    db.session.add(account)
+    db.session.commit()
+    return user.user_id, account.account_id
+
+
+def intercept(interceptor, handler, details=None):
+    return interceptor.intercept_service(lambda details: handler, details or MagicMock())
+
+
+def test_unary_call_runs_in_app_context(app):
+    def behavior(request, context):
+        return current_app.name
+
+    handler = grpc.unary_unary_rpc_method_handler(behavior)
+    wrapped = intercept(AppContextInterceptor(app), handler)
+
+    assert not has_app_context()
+    assert wrapped.unary_unary("request", MagicMock()) == app.name
+    assert not has_app_context()
+
+
+def test_streaming_call_keeps_app_context_until_exhausted(app):
+    def behavior(request, context):
+        for i in range(3):
+            yield (i, has_app_context())
+
+    handler = grpc.unary_stream_rpc_method_handler(behavior)
+    wrapped = intercept(AppContextInterceptor(app), handler)
+
+    assert list(wrapped.unary_stream("request", MagicMock())) == [(0, True), (1, True), (2, True)]
+    assert not has_app_context()
+
+
+def test_wrap_rpc_handler_keeps_serializers():
+    deserializer, serializer = MagicMock(), MagicMock()
+    handler = grpc.stream_unary_rpc_method_handler(
+        lambda requests, context: sum(requests),
+        request_deserializer=deserializer,
+        response_serializer=serializer)
+
+    wrapped = wrap_rpc_handler(handler, lambda behavior, streaming: behavior)
+
+    assert wrapped.stream_unary(iter([1, 2, 3]), MagicMock()) == 6
+    assert wrapped.request_deserializer is deserializer
+    assert wrapped.response_serializer is serializer
+
+
+def test_wrap_rpc_handler_passes_through_unknown_method():
+    assert wrap_rpc_handler(None, lambda behavior, streaming: behavior) is None
+
+
+class Message:
+    def __init__(self, size):
+        self.size = size
+
+    def ByteSize(self):
+        return self.size
+
+
+def call_details(method):
+    details = MagicMock()
+    details.method = method
+    details.invocation_metadata = (('authorization', 'Bearer secret'), ('x-request-id', 'abc'))
+    return details
+
+
+def test_metrics_interceptor_records_unary_call():
+    registry = MetricsRegistry()
+    context = MagicMock()
+    context.code.return_value = grpc.StatusCode.NOT_FOUND
+    handler = grpc.unary_unary_rpc_method_handler(lambda request, context: Message(40))
+    wrapped = intercept(MetricsInterceptor(registry, slow_call_threshold=60),
+                        handler, call_details('/svc/Get'))
+
+    wrapped.unary_unary(Message(10), context)
+
+    labels = {'method': '/svc/Get'}
+    assert registry.histogram('grpc_server_handling_seconds', labels).count == 1
+    assert registry.histogram('grpc_server_queue_wait_seconds', labels).count == 1
+    assert registry.histogram('grpc_server_request_bytes', labels).sum == 10
+    assert registry.histogram('grpc_server_response_bytes', labels).sum == 40
+    assert registry.gauge('grpc_server_in_flight', labels).value == 0
+    assert registry.counter('grpc_server_handled_total', {'method': '/svc/Get', 'code': 'NOT_FOUND'}).value == 1
+
+
+def test_metrics_interceptor_tracks_in_flight_streams():
+    registry = MetricsRegistry()
+    labels = {'method': '/svc/Stream'}
+
+    def behavior(request, context):
+        for _ in range(3):
+            yield Message(5)
+
+    handler = grpc.unary_stream_rpc_method_handler(behavior)
+    wrapped = intercept(MetricsInterceptor(registry, slow_call_threshold=60),
+                        handler, call_details('/svc/Stream'))
+
+    stream = wrapped.unary_stream(Message(1), MagicMock())
+    next(stream)
+    assert registry.gauge('grpc_server_in_flight', labels).value == 1
+    stream.close()
+
+    assert registry.gauge('grpc_server_in_flight', labels).value == 0
+    assert registry.histogram('grpc_server_response_bytes', labels).count == 1
+
+
+def test_metrics_interceptor_logs_slow_calls_without_credentials(caplog):
+    handler = grpc.unary_unary_rpc_method_handler(lambda request, context: Message(0))
+    wrapped = intercept(MetricsInterceptor(MetricsRegistry(), slow_call_threshold=0),
+                        handler, call_details('/svc/Slow'))
+
+    with caplog.at_level('WARNING', logger='grpc_utils.interceptors'):
+        wrapped.unary_unary(Message(0), MagicMock())
+
+    assert 'Slow gRPC call /svc/Slow' in caplog.text
+    assert "'x-request-id': 'abc'" in caplog.text
+    assert 'secret' not in caplog.text
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    registry.counter('calls_total', {'method': '/svc/Get'}).inc(2)
+    registry.histogram('latency_seconds', buckets=(0.1, 1.0)).observe(0.5)
+
+    text = registry.render_text()
+
+    assert 'calls_total{method="/svc/Get"} 2' in text
+    assert 'latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 1' in text
+    assert 'latency_seconds_count{} 1' in text
+
+
+class FakeServicer:
+    def Unary(self, request, context):
+        return (request, current_app.name, context.is_active())
+
+    def Stream(self, request, context):
+        first_context = current_app._get_current_object()
+        for i in range(request):
+            yield (i, current_app._get_current_object() is first_context)
+
+
+def run_async(coro_factory):
+    import asyncio
+    return asyncio.run(coro_factory())
+
+
+def test_async_adapter_unary_runs_in_executor_with_app_context(app):
+    from concurrent.futures import ThreadPoolExecutor
+    from grpc_utils.aio_server import AsyncServicerAdapter
+
+    context = MagicMock()
+    context.done.return_value = False
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        adapter = AsyncServicerAdapter(FakeServicer(), app, executor)
+        result = run_async(lambda: adapter.Unary("request", context))
+
+    assert result == ("request", app.name, True)
+
+
+def test_async_adapter_stream_keeps_one_app_context(app):
+    from concurrent.futures import ThreadPoolExecutor
+    from grpc_utils.aio_server import AsyncServicerAdapter
+
+    async def collect(adapter):
+        return [item async for item in adapter.Stream(4, MagicMock())]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        adapter = AsyncServicerAdapter(FakeServicer(), app, executor)
+        result = run_async(lambda: collect(adapter))
+
+    assert result == [(0, True), (1, True), (2, True), (3, True)]
+
+
+def test_server_hosts_default_services(db_app, holder):
+    user_id, account_id = holder
+    server = GrpcServer(address='127.0.0.1:0', max_workers=2, app=db_app).add_default_services()
+    server.start()
+    try:
+        with grpc.insecure_channel(f'127.0.0.1:{server.port}') as channel:
+            stub = account_service_pb2_grpc.AccountServiceStub(channel)
+            response = stub.GetAccountDetails(
+                account_service_pb2.GetAccountDetailsRequest(account_id=str(account_id), user_id=user_id),
+                timeout=10)
+    finally:
+        server.stop(0)
+
+    assert response.success
+    assert response.account_holder_name == "Ana Holder"
+    assert response.account.balance == 250
+    assert response.account.currency == "EUR"
+
+
+def test_async_adapter_cleans_up_stream_cancelled_mid_step(app):
+    import asyncio
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from grpc_utils.aio_server import AsyncServicerAdapter
+
+    started, release = threading.Event(), threading.Event()
+    closed = []
+
+    class SlowServicer:
+        def Stream(self, request, context):
+            try:
+                started.set()
+                release.wait(5)
+                yield 1
+            finally:
+                closed.append(has_app_context())
+
+    async def cancel_mid_step(adapter):
+        step = asyncio.ensure_future(adapter.Stream(None, MagicMock()).__anext__())
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        step.cancel()
+        await asyncio.sleep(0.05)
+        # The worker is still inside the call's context when the cancellation lands
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await step
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        run_async(lambda: cancel_mid_step(AsyncServicerAdapter(SlowServicer(), app, executor)))
+
+    assert closed == [True]
+
+
+def test_aio_server_hosts_default_services(db_app, holder):
+    from grpc_utils.aio_server import AsyncGrpcServer
+
+    user_id, account_id = holder
+
+    async def call():
+        server = AsyncGrpcServer(address='127.0.0.1:0', db_workers=2, app=db_app).add_default_services()
+        await server.start()
+        try:
+            async with grpc.aio.insecure_channel(f'127.0.0.1:{server.port}') as channel:
+                stub = account_service_pb2_grpc.AccountServiceStub(channel)
+                return await stub.GetBalance(
+                    account_service_pb2.GetBalanceRequest(account_id=str(account_id), user_id=user_id),
+                    timeout=10)
+        finally:
+            await server.stop(0)
+
+    response = run_async(call)
+
+    assert response.success
+    assert response.balance == 250
+
+
+def test_prefork_workers_serve_rpcs(db_app, holder):
+    user_id, account_id = holder
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    # A process of its own, as the launcher forks and installs signal handlers
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, DATABASE_URL=db_app.config['SQLALCHEMY_DATABASE_URI'], PYTHONPATH=root)
+    launcher = subprocess.Popen([sys.executable, '-m', 'grpc_utils.prefork', '--workers', '2',
+                                 '--port', str(port), '--threads', '2'], cwd=root, env=env)
+    try:
+        with grpc.insecure_channel(f'127.0.0.1:{port}') as channel:
+            grpc.channel_ready_future(channel).result(timeout=30)
+            stub = account_service_pb2_grpc.AccountServiceStub(channel)
+            response = stub.GetBalance(
+                account_service_pb2.GetBalanceRequest(account_id=str(account_id), user_id=user_id),
+                timeout=10)
+    finally:
+        launcher.send_signal(signal.SIGTERM)
+        launcher.wait(timeout=60)
+
+    assert response.success
+    assert response.balance == 250
+    assert launcher.returncode == 0
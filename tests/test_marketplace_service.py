@@ -0,0 +1,207 @@
+import grpc
+import pytest
+from decimal import Decimal
+from flask import Flask
+from unittest.mock import MagicMock
+from utils.extensions import db
+from core.models import User, Account, MarketplaceItem, MarketplaceTransaction
+from api.grpc.marketplace_service import MarketplaceServicer
+from core.services.marketplace_search import CatalogSearch
+from proto import marketplace_service_pb2
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+    })
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def market(app):
+    seller = User(username="seller", email="seller@example.com", password_hash="hashedpassword")
+    buyer = User(username="buyer", email="buyer@example.com", password_hash="hashedpassword")
+    db.session.add_all([seller, buyer])
+    db.session.commit()
+    account = Account(account_type="checking", balance=150, currency_code="USD", user_id=buyer.user_id)
+    items = [
+        MarketplaceItem(name=f"item {i}", price=100, seller_id=seller.user_id,
+                        status="sold" if i == 2 else "available")
+        for i in range(5)
+    ]
+    db.session.add(account)
+    db.session.add_all(items)
+    db.session.commit()
+    return {
+        'buyer': buyer.user_id,
+        'account': account.account_id,
+        'items': [item.item_id for item in items],
+    }
+
+
+def order_request(market, item_index):
+    return marketplace_service_pb2.CreateOrderRequest(
+        user_id=str(market['buyer']),
+        payment_method=str(market['account']),
+        items=[marketplace_service_pb2.OrderItemRequest(
+            product_id=str(market['items'][item_index]), quantity=1)]
+    )
+
+
+def test_create_order_claims_item_and_debits_account(market):
+    context = MagicMock()
+
+    order = MarketplaceServicer().CreateOrder(order_request(market, 0), context)
+
+    context.set_code.assert_not_called()
+    assert order.total_amount == "100.00"
+    item = db.session.get(MarketplaceItem, market['items'][0])
+    assert (item.status, item.buyer_id) == ("sold", market['buyer'])
+    assert db.session.get(Account, market['account']).balance == Decimal("50")
+
+
+def test_item_cannot_be_sold_twice(market):
+    servicer = MarketplaceServicer()
+    servicer.CreateOrder(order_request(market, 0), MagicMock())
+
+    context = MagicMock()
+    servicer.CreateOrder(order_request(market, 0), context)
+
+    context.set_code.assert_called_with(grpc.StatusCode.FAILED_PRECONDITION)
+    assert db.session.query(MarketplaceTransaction).count() == 1
+
+
+def test_failed_payment_releases_item(market):
+    servicer = MarketplaceServicer()
+    servicer.CreateOrder(order_request(market, 0), MagicMock())
+
+    # 50 left, not enough for a second item
+    context = MagicMock()
+    servicer.CreateOrder(order_request(market, 1), context)
+
+    context.set_code.assert_called_with(grpc.StatusCode.FAILED_PRECONDITION)
+    assert db.session.get(MarketplaceItem, market['items'][1]).status == "available"
+    assert db.session.get(Account, market['account']).balance == Decimal("50")
+
+
+def test_list_products_keyset_pages(market):
+    servicer = MarketplaceServicer()
+    request = marketplace_service_pb2.ListProductsRequest(active_only=True, page_size=2)
+
+    seen = []
+    while True:
+        response = servicer.ListProducts(request, MagicMock())
+        seen.extend(product.product_id for product in response.products)
+        if not response.next_page_token:
+            break
+        request.page_token = response.next_page_token
+
+    expected = [str(item_id) for i, item_id in enumerate(market['items']) if i != 2]
+    assert seen == expected
+
+
+def test_stream_products_matches_listing(market):
+    request = marketplace_service_pb2.ListProductsRequest(active_only=True)
+    context = MagicMock()
+    context.is_active.return_value = True
+
+    streamed = [product.product_id for product in MarketplaceServicer().StreamProducts(request, context)]
+
+    assert streamed == [str(item_id) for i, item_id in enumerate(market['items']) if i != 2]
+
+
+@pytest.fixture
+def catalog(app):
+    seller = User(username="seller", email="seller@example.com", password_hash="hashedpassword")
+    db.session.add(seller)
+    db.session.commit()
+    listings = [
+        ("Red running shoes", "Lightweight shoes for road running", 80),
+        ("Blue suede shoes", "Classic shoes", 120),
+        ("Red wool scarf", "Warm scarf, hand knitted", 25),
+        ("Running watch", "GPS watch for cycling", 200),
+        ("Red shoes", "Sold already", 50),
+    ]
+    items = [MarketplaceItem(name=name, description=description, price=price, seller_id=seller.user_id,
+                             status="sold" if name == "Red shoes" else "available")
+             for name, description, price in listings]
+    db.session.add_all(items)
+    db.session.commit()
+    return {item.name: item.item_id for item in items}
+
+
+def search_products(servicer, **fields):
+    context = MagicMock()
+    response = servicer.ListProducts(marketplace_service_pb2.ListProductsRequest(**fields), context)
+    context.set_code.assert_not_called()
+    return response
+
+
+def test_search_ranks_available_matches(catalog):
+    servicer = MarketplaceServicer(search=CatalogSearch(sync_interval=0))
+
+    response = search_products(servicer, query="red shoes")
+
+    assert [p.name for p in response.products] == ["Red running shoes"]
+    names = [p.name for p in search_products(servicer, query="shoes").products]
+    assert set(names) == {"Red running shoes", "Blue suede shoes"}
+    # Also in the description ranks higher than in the name only
+    ranked = [p.name for p in search_products(servicer, query="running").products]
+    assert ranked == ["Red running shoes", "Running watch"]
+
+
+def test_search_price_filter_and_paging(catalog):
+    servicer = MarketplaceServicer(search=CatalogSearch(sync_interval=0))
+
+    cheap = search_products(servicer, query="red", max_price="30")
+    assert [p.name for p in cheap.products] == ["Red wool scarf"]
+
+    first = search_products(servicer, query="running", page_size=1)
+    second = search_products(servicer, query="running", page_size=1, page_token=first.next_page_token)
+    assert first.next_page_token and not second.next_page_token
+    assert {first.products[0].name, second.products[0].name} == {"Running watch", "Red running shoes"}
+
+
+def test_search_drops_items_sold_elsewhere(catalog):
+    search = CatalogSearch(sync_interval=0)
+    servicer = MarketplaceServicer(search=search)
+    search_products(servicer, query="shoes")
+
+    # Sold by another process, the index has not heard of it
+    db.session.get(MarketplaceItem, catalog["Blue suede shoes"]).status = "sold"
+    db.session.commit()
+
+    assert [p.name for p in search_products(servicer, query="shoes").products] == ["Red running shoes"]
+    assert catalog["Blue suede shoes"] not in search.index
+
+
+def test_search_picks_up_new_listings_and_own_writes(catalog):
+    search = CatalogSearch(sync_interval=0)
+    servicer = MarketplaceServicer(search=search)
+    search_products(servicer, query="scarf")
+
+    # Listed by another process
+    db.session.add(MarketplaceItem(name="Green scarf", price=15, seller_id=1, status="available"))
+    db.session.commit()
+    assert len(search_products(servicer, query="scarf").products) == 2
+
+    servicer.DeleteProduct(marketplace_service_pb2.DeleteProductRequest(
+        product_id=str(catalog["Red wool scarf"])), MagicMock())
+    assert [p.name for p in search_products(servicer, query="scarf").products] == ["Green scarf"]
+
+
+def test_suggest_products_completes_last_word(catalog):
+    servicer = MarketplaceServicer(search=CatalogSearch(sync_interval=0))
+
+    response = servicer.SuggestProducts(
+        marketplace_service_pb2.SuggestProductsRequest(prefix="red ru", limit=5), MagicMock())
+
+    assert list(response.suggestions) == ["red running"]
@@ -0,0 +1,189 @@
+import threading
+import pytest
+from unittest.mock import MagicMock
+from decimal import Decimal
+from flask import Flask
+from utils.extensions import db
+from core.models import User, Account, StockAsset, CryptoAsset, Transaction
+from core.services.order_batching import BUY, SELL, CRYPTO, STOCKS, Order, OrderBatcher
+from core.services.quote_service import QuoteCache, StockQuoteProvider
+
+
+class FakeProvider:
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+
+    def fetch(self, symbols):
+        self.calls.append(sorted(symbols))
+        return {symbol: self.prices[symbol] for symbol in symbols if symbol in self.prices}
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+    })
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def traders(app):
+    users = [User(username=f"trader{i}", email=f"trader{i}@example.com", password_hash="hashedpassword")
+             for i in range(3)]
+    db.session.add_all(users)
+    db.session.commit()
+    accounts = [Account(account_type="checking", balance=1000, currency_code="USD", user_id=user.user_id)
+                for user in users]
+    db.session.add_all(accounts)
+    db.session.add(StockAsset(name="MSFT", symbol="MSFT", shares=5, user_id=users[0].user_id))
+    db.session.commit()
+    return [user.user_id for user in users], [account.account_id for account in accounts]
+
+
+def stock_batcher(prices, window=0.0):
+    provider = FakeProvider(prices)
+    return OrderBatcher(STOCKS, QuoteCache(provider, ttl=60, stale_ttl=0), window=window), provider
+
+
+def test_concurrent_orders_settle_in_one_batch(app, traders):
+    user_ids, account_ids = traders
+    batcher, provider = stock_batcher({"AAPL": Decimal("100"), "MSFT": Decimal("50")}, window=0.5)
+    orders = [Order(user_id, symbol, 2, BUY) for user_id in user_ids for symbol in ("AAPL", "MSFT")]
+    results = {}
+
+    def place(order):
+        with app.app_context():
+            results[order] = batcher.submit(order)
+
+    threads = [threading.Thread(target=place, args=(order,)) for order in orders]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(result["success"] for result in results.values())
+    assert provider.calls == [["AAPL", "MSFT"]]
+    db.session.expire_all()
+    assert [db.session.get(Account, account_id).balance for account_id in account_ids] == [Decimal("700")] * 3
+    holding = db.session.query(StockAsset).filter_by(user_id=user_ids[0], symbol="MSFT").one()
+    assert holding.shares == 7
+    assert db.session.query(Transaction).count() == 6
+
+
+def test_orders_see_earlier_orders_of_the_batch(app, traders):
+    user_ids, account_ids = traders
+    batcher, _ = stock_batcher({"AAPL": Decimal("300"), "MSFT": Decimal("50")})
+    orders = [
+        Order(user_ids[0], "AAPL", 3, BUY),
+        Order(user_ids[0], "AAPL", 1, BUY),  # Only 100 left
+        Order(user_ids[0], "MSFT", 5, SELL),
+        Order(user_ids[0], "MSFT", 1, SELL),  # Already sold out
+        Order(user_ids[1], "AAPL", 1, BUY, account_id=account_ids[0]),  # Not their account
+    ]
+
+    batcher.execute(orders)
+
+    assert [order.result["success"] for order in orders] == [True, False, True, False, False]
+    assert orders[1].result["message"] == "Insufficient balance"
+    assert orders[3].result["message"] == "Insufficient stock balance"
+    assert db.session.get(Account, account_ids[0]).balance == Decimal("350")
+    assert db.session.query(StockAsset).filter_by(user_id=user_ids[0], symbol="MSFT").count() == 0
+
+
+def test_unpriced_orders_are_rejected(app, traders):
+    user_ids, account_ids = traders
+    provider = FakeProvider({"bitcoin": Decimal("20000")})
+    batcher = OrderBatcher(CRYPTO, QuoteCache(provider, ttl=60, stale_ttl=0), window=0.0)
+    orders = [Order(user_ids[0], "bitcoin", Decimal("0.01"), BUY), Order(user_ids[0], "nocoin", Decimal("1"), BUY)]
+
+    batcher.execute(orders)
+
+    assert orders[0].result["success"]
+    assert orders[0].result["total"] == "200.00"
+    assert orders[1].result["status"] == 503
+    asset = db.session.query(CryptoAsset).filter_by(user_id=user_ids[0]).one()
+    assert (asset.symbol, asset.name, asset.balance) == ("bitcoin", "Bitcoin", Decimal("0.01"))
+
+
+class PriceEndpoint:
+    """Session stand-in for StockQuoteProvider: 404 for symbols without a price."""
+
+    def __init__(self, prices):
+        self.prices = prices
+
+    def get(self, url, timeout):
+        symbol = url.split("/")[-2]
+        response = MagicMock()
+        if symbol not in self.prices:
+            response.raise_for_status.side_effect = ConnectionError(f"404 for {symbol}")
+        response.json.return_value = {"price": self.prices.get(symbol)}
+        return response
+
+
+def test_unknown_symbol_fails_only_its_orders(app, traders):
+    user_ids, account_ids = traders
+    provider = StockQuoteProvider(base_url="http://quotes.test/stock")
+    provider.session = PriceEndpoint({"AAPL": 100, "MSFT": 50})
+    batcher = OrderBatcher(STOCKS, QuoteCache(provider, ttl=60, stale_ttl=0), window=0.0)
+    orders = [
+        Order(user_ids[0], "AAPL", 1, BUY),
+        Order(user_ids[1], "BOGUS", 1, BUY),
+        Order(user_ids[2], "MSFT", 2, BUY),
+        Order(user_ids[0], "MSFT", 1, SELL),
+    ]
+
+    batcher.execute(orders)
+
+    assert [order.result["status"] for order in orders] == [200, 503, 200, 200]
+    assert [db.session.get(Account, account_id).balance for account_id in account_ids] == [
+        Decimal("950"), Decimal("1000"), Decimal("900")]
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    from web.transaction.crypto import crypto_routes
+    from web.transaction.stock import stock_routes
+
+    batcher, _ = stock_batcher({"AAPL": Decimal("100")})
+    monkeypatch.setattr("web.transaction.stock.stock_orders", batcher)
+    app.register_blueprint(stock_routes)
+    app.register_blueprint(crypto_routes)
+    return app.test_client()
+
+
+@pytest.mark.parametrize("path, order", [
+    ("/stock/buy", {"symbol": "AAPL", "shares": 1}),
+    ("/crypto/buy", {"symbol": "bitcoin", "amount": "0.1"}),
+])
+@pytest.mark.parametrize("ids, error", [
+    ({}, "user_id must be a positive integer"),
+    ({"user_id": "one"}, "user_id must be a positive integer"),
+    ({"user_id": 0}, "user_id must be a positive integer"),
+    ({"user_id": True}, "user_id must be a positive integer"),
+    ({"user_id": 1, "account_id": "1a"}, "account_id must be a positive integer"),
+    ({"user_id": 1, "account_id": 1.5}, "account_id must be a positive integer"),
+])
+def test_order_routes_reject_malformed_ids(client, path, order, ids, error):
+    response = client.post(path, json={**order, **ids})
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
+
+
+def test_order_routes_accept_string_ids(client, traders):
+    user_ids, account_ids = traders
+
+    response = client.post("/stock/buy", json={
+        "user_id": str(user_ids[0]), "account_id": str(account_ids[0]), "symbol": "AAPL", "shares": 2})
+
+    assert response.status_code == 200
+    assert response.get_json()["total"] == "200.00"
+    assert db.session.get(Account, account_ids[0]).balance == Decimal("800")
@@ -0,0 +1,99 @@
+import pytest
+from decimal import Decimal
+from flask import Flask
+from utils.extensions import db
+from core.models import User, Account, CryptoAsset, StockAsset, PortfolioValuation
+from core.services.portfolio_valuation import portfolio_summary, save_valuations, value_portfolios
+from core.services.quote_service import QuoteCache
+
+
+class FakeProvider:
+    def __init__(self, prices):
+        self.prices = prices
+
+    def fetch(self, symbols):
+        return {symbol: self.prices[symbol] for symbol in symbols if symbol in self.prices}
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+    })
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def quotes():
+    return {
+        'stock_quotes': QuoteCache(FakeProvider({"AAPL": Decimal("200")}), ttl=60, stale_ttl=0),
+        'crypto_quotes': QuoteCache(FakeProvider({"bitcoin": Decimal("50000")}), ttl=60, stale_ttl=0),
+    }
+
+
+@pytest.fixture
+def users(app):
+    alice = User(username="alice", email="alice@example.com", password_hash="hashedpassword")
+    bob = User(username="bob", email="bob@example.com", password_hash="hashedpassword")
+    carol = User(username="carol", email="carol@example.com", password_hash="hashedpassword")
+    db.session.add_all([alice, bob, carol])
+    db.session.commit()
+    db.session.add_all([
+        Account(account_type="checking", balance=1000, currency_code="USD", user_id=alice.user_id),
+        Account(account_type="savings", balance=500, currency_code="EUR", user_id=alice.user_id),
+        CryptoAsset(name="Bitcoin", symbol="bitcoin", balance=Decimal("0.5"), user_id=alice.user_id),
+        StockAsset(name="Apple", symbol="AAPL", shares=10, user_id=alice.user_id),
+        Account(account_type="checking", balance=250, currency_code="USD", user_id=bob.user_id),
+        StockAsset(name="Unlisted", symbol="ZZZZ", shares=3, user_id=bob.user_id),
+    ])
+    db.session.commit()
+    return {'alice': alice.user_id, 'bob': bob.user_id, 'carol': carol.user_id}
+
+
+def test_values_every_asset_class_in_base_currency(users, quotes):
+    valuation = value_portfolios(fx_rates={"EUR": 1.1}, **quotes)
+
+    assert valuation.for_user(users['alice']) == {
+        'user_id': users['alice'],
+        'base_currency': 'USD',
+        'cash': 1550.0,
+        'crypto': 25000.0,
+        'stocks': 2000.0,
+        'total': 28550.0,
+        'unpriced_holdings': 0,
+    }
+    assert valuation.currency_totals["USD"] == (1250.0, 1250.0)
+    assert valuation.currency_totals["EUR"] == (500.0, pytest.approx(550.0))
+
+
+def test_unpriced_holdings_are_counted_not_valued(users, quotes):
+    valuation = value_portfolios(fx_rates={}, **quotes)
+
+    bob = valuation.for_user(users['bob'])
+    assert bob['total'] == 250.0
+    assert bob['unpriced_holdings'] == 1
+    assert valuation.for_user(users['alice'])['unpriced_holdings'] == 1  # No EUR rate
+    assert valuation.missing == ["cash:EUR", "stocks:ZZZZ"]
+
+
+def test_requested_users_without_holdings_value_at_zero(users, quotes):
+    summary = portfolio_summary(users['carol'], fx_rates={}, **quotes)
+
+    assert summary['total'] == 0.0
+    assert value_portfolios([users['bob']], fx_rates={}, **quotes).for_user(users['alice']) is None
+
+
+def test_save_valuations_writes_one_row_per_user(users, quotes):
+    stored = save_valuations(value_portfolios(fx_rates={"EUR": 1.1}, **quotes))
+
+    assert stored == 3
+    row = db.session.query(PortfolioValuation).filter_by(user_id=users['alice']).one()
+    assert row.total == Decimal("28550.00")
+    assert row.base_currency == "USD"
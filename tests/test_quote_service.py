@@ -0,0 +1,196 @@
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+from core.services import quote_service
+from core.services.quote_service import QuoteCache, QuoteUnavailable, StockQuoteProvider
+
+
+class FakeProvider:
+    def __init__(self, prices, delay=None):
+        self.prices = prices
+        self.calls = []
+        self.delay = delay  # Event the fetch blocks on, if set
+        self.fail = False
+
+    def fetch(self, symbols):
+        self.calls.append(list(symbols))
+        if self.delay is not None:
+            self.delay.wait(5)
+        if self.fail:
+            raise ConnectionError("provider down")
+        return {symbol: self.prices[symbol] for symbol in symbols if symbol in self.prices}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_fresh_quotes_are_served_from_memory(clock):
+    provider = FakeProvider({"AAPL": Decimal("190.5")})
+    quotes = QuoteCache(provider, ttl=5, stale_ttl=20, clock=clock)
+
+    assert quotes.get("AAPL") == Decimal("190.5")
+    clock.now = 4
+    assert quotes.get("AAPL") == Decimal("190.5")
+    assert provider.calls == [["AAPL"]]
+
+
+def test_misses_are_fetched_in_one_batch(clock):
+    provider = FakeProvider({"AAPL": Decimal("190"), "MSFT": Decimal("410"), "TSLA": Decimal("250")})
+    quotes = QuoteCache(provider, ttl=5, stale_ttl=20, clock=clock)
+    quotes.get("AAPL")
+
+    prices = quotes.get_many(["AAPL", "MSFT", "TSLA", "MSFT"])
+
+    assert prices == {"AAPL": Decimal("190"), "MSFT": Decimal("410"), "TSLA": Decimal("250")}
+    assert provider.calls == [["AAPL"], ["MSFT", "TSLA"]]
+
+
+def test_concurrent_misses_share_one_fetch(clock):
+    release = threading.Event()
+    provider = FakeProvider({"bitcoin": Decimal("65000")}, delay=release)
+    quotes = QuoteCache(provider, ttl=5, stale_ttl=20, clock=clock)
+    results = []
+
+    def order():
+        results.append(quotes.get("bitcoin"))
+
+    threads = [threading.Thread(target=order) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [Decimal("65000")] * 8
+    assert provider.calls == [["bitcoin"]]
+
+
+def test_stale_quote_is_served_while_it_refreshes(clock):
+    release = threading.Event()
+    provider = FakeProvider({"AAPL": Decimal("190")})
+    quotes = QuoteCache(provider, ttl=5, stale_ttl=20, clock=clock)
+    quotes.get("AAPL")
+
+    provider.prices["AAPL"] = Decimal("191")
+    provider.delay = release
+    clock.now = 10
+    assert quotes.get("AAPL") == Decimal("190")
+    assert quotes.get("AAPL") == Decimal("190")  # Refresh already in flight
+
+    release.set()
+    for _ in range(100):
+        if quotes.get("AAPL") == Decimal("191"):
+            break
+        time.sleep(0.01)
+    assert quotes.get("AAPL") == Decimal("191")
+    assert provider.calls == [["AAPL"], ["AAPL"]]
+
+
+def test_failed_refresh_keeps_stale_quote_until_window_ends(clock):
+    provider = FakeProvider({"AAPL": Decimal("190")})
+    quotes = QuoteCache(provider, ttl=5, stale_ttl=20, clock=clock)
+    quotes.get("AAPL")
+    provider.fail = True
+
+    clock.now = 20
+    assert quotes.get("AAPL") == Decimal("190")
+
+    clock.now = 26
+    with pytest.raises(QuoteUnavailable):
+        quotes.get("AAPL")
+
+
+def test_unknown_symbol_is_unavailable(clock):
+    quotes = QuoteCache(FakeProvider({}), ttl=5, stale_ttl=20, clock=clock)
+
+    with pytest.raises(QuoteUnavailable):
+        quotes.get("NOPE")
+
+
+class FakeResponse:
+    def __init__(self, status, price=None):
+        self.status = status
+        self.price = price
+
+    def raise_for_status(self):
+        if self.status != 200:
+            raise quote_service.requests.HTTPError(f"{self.status} error")
+
+    def json(self):
+        return {"price": self.price}
+
+
+class FakeSession:
+    """Answers /<symbol>/price from prices after delays[symbol] seconds, 404 for unknown symbols."""
+
+    def __init__(self, prices, delays=None):
+        self.prices = prices
+        self.delays = delays or {}
+
+    def get(self, url, timeout):
+        symbol = url.split("/")[-2]
+        time.sleep(self.delays.get(symbol, 0))
+        if symbol not in self.prices:
+            return FakeResponse(404)
+        return FakeResponse(200, self.prices[symbol])
+
+
+def stock_provider(prices, delays=None, timeout=1.0):
+    provider = StockQuoteProvider(base_url="http://quotes.test/stock", timeout=timeout)
+    provider.session = FakeSession(prices, delays)
+    return provider
+
+
+def test_stock_provider_leaves_out_failed_symbols(clock):
+    quotes = QuoteCache(stock_provider({"AAPL": 190.5, "MSFT": 410}), ttl=5, stale_ttl=20, clock=clock)
+
+    assert quotes.get_many(["AAPL", "BOGUS", "MSFT"], partial=True) == {
+        "AAPL": Decimal("190.5"), "MSFT": Decimal("410")}
+    with pytest.raises(QuoteUnavailable):
+        quotes.get_many(["AAPL", "BOGUS"])
+
+
+def test_stock_provider_fetches_in_parallel_within_one_timeout():
+    symbols = [f"S{i}" for i in range(6)]
+    delays = dict.fromkeys(symbols, 0.2)
+    delays["SLOW"] = 2
+    provider = stock_provider(dict.fromkeys(symbols + ["SLOW"], 1), delays, timeout=0.5)
+
+    started = time.monotonic()
+    prices = provider.fetch(symbols + ["SLOW"])
+
+    # Six 0.2 s requests one after another would take 1.2 s
+    assert time.monotonic() - started < 1.0
+    assert sorted(prices) == symbols
+
+
+def test_order_route_rejects_when_no_price(monkeypatch):
+    from web.transaction.crypto import crypto_routes
+
+    provider = FakeProvider({})
+    provider.fail = True
+    monkeypatch.setattr(quote_service.crypto_quotes, "provider", provider)
+    quote_service.crypto_quotes.invalidate()
+
+    app = Flask(__name__)
+    app.register_blueprint(crypto_routes)
+    response = app.test_client().post(
+        "/crypto/buy", json={"user_id": 1, "symbol": "bitcoin", "amount": "1.0"}
+    )
+
+    assert response.status_code == 503
+    assert provider.calls == [["bitcoin"]]
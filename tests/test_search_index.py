@@ -0,0 +1,121 @@
+import random
+
+import pytest
+
+import utils.search_index as search_index
+from utils.search_index import InvertedIndex
+
+
+@pytest.fixture
+def index():
+    index = InvertedIndex()
+    index.bulk_load([
+        (1, "Red shoes", "Comfortable running shoes", 50),
+        (2, "Blue shirt", "Cotton shirt", 20),
+        (3, "Red shirt", "Red cotton shirt", 25),
+    ])
+    return index
+
+
+def ids(hits):
+    return [doc_id for doc_id, _ in hits]
+
+
+def test_search_requires_every_term_and_ranks_by_weight(index):
+    assert ids(index.search("red")) == [3, 1]
+    assert ids(index.search("red shirt")) == [3]
+    assert index.search("red hat") == []
+
+
+def test_price_filter(index):
+    assert ids(index.search("shirt", min_price=21)) == [3]
+    assert ids(index.search("shirt", max_price="20.00")) == [2]
+
+
+def test_remove_and_readd(index):
+    index.remove(3)
+    assert ids(index.search("red")) == [1]
+    assert 3 not in index
+
+    index.add(3, "Green shirt", "", 25)
+    assert ids(index.search("red")) == [1]
+    assert ids(index.search("green")) == [3]
+    assert len(index) == 3
+
+
+def test_suggest_completes_last_word_by_frequency(index):
+    index.add(4, "Shiny shirt", "", 10)
+
+    # Ties in alphabetical order
+    assert index.suggest("sh") == ["shirt", "shiny", "shoes"]
+    assert index.suggest("red sho") == ["red shoes"]
+    assert index.suggest("red ") == []
+
+
+def test_non_ascii_terms():
+    index = InvertedIndex()
+    index.bulk_load([
+        (1, "Čokolada za đake", "Mlečna čokolada", 3),
+        (2, "Vuneni šal", "Topao šal", 12),
+        (3, "Šal i kapa", "", 20),
+    ])
+
+    assert search_index.tokenize("Čokolada za đake") == ["čokolada", "za", "đake"]
+    assert ids(index.search("čokolada")) == [1]
+    assert ids(index.search("ČOKOLADA đake")) == [1]
+    assert ids(index.search("šal")) == [2, 3]
+    assert index.search("sal") == []
+    # Decomposed input (s + combining caron) matches the precomposed title
+    assert ids(index.search("s\u030cal")) == [2, 3]
+    assert index.suggest("đa") == ["đake"]
+    assert index.suggest("čok") == ["čokolada"]
+
+
+def brute_force(docs, query, limit, offset, min_price, max_price):
+    terms = list(dict.fromkeys(search_index.tokenize(query)))
+    analyzed = {doc_id: search_index._analyze(name, description)
+                for doc_id, (name, description, _) in docs.items()}
+    df = {term: sum(term in a for a in analyzed.values()) for term in terms}
+    scored = []
+    for doc_id, weights in analyzed.items():
+        price = docs[doc_id][2]
+        if all(term in weights for term in terms) and min_price <= price <= max_price:
+            score = sum(
+                weights[term] * search_index.math.log(1 + (len(docs) - df[term] + 0.5) / (df[term] + 0.5))
+                for term in terms
+            )
+            scored.append((-round(score, 4), doc_id))
+    return [doc_id for _, doc_id in sorted(scored)[offset:offset + limit]]
+
+
+def test_best_first_walk_matches_exhaustive_scoring(monkeypatch):
+    # Walk every term best-first, in small chunks, across many removals and updates
+    monkeypatch.setattr(search_index, "IMPACT_ORDER_MIN_DF", 1)
+    monkeypatch.setattr(search_index, "FIRST_CHUNK", 4)
+    rng = random.Random(7)
+    words = [f"w{i}" for i in range(20)]
+    frequencies = [1 / (rank + 1) for rank in range(len(words))]
+
+    def listing():
+        return (" ".join(rng.choices(words, frequencies, k=rng.randint(1, 3))),
+                " ".join(rng.choices(words, frequencies, k=rng.randint(2, 8))),
+                rng.randint(1, 100))
+
+    docs = {doc_id: listing() for doc_id in range(1, 500)}
+    index = InvertedIndex()
+    index.bulk_load((doc_id,) + doc for doc_id, doc in docs.items())
+    for _ in range(300):
+        doc_id = rng.randint(1, 600)
+        if doc_id in docs and rng.random() < 0.5:
+            index.remove(doc_id)
+            del docs[doc_id]
+        else:
+            docs[doc_id] = listing()
+            index.add(doc_id, *docs[doc_id])
+
+    for _ in range(100):
+        query = " ".join(rng.sample(words[:8], rng.randint(1, 3)))
+        low, high = rng.choice([(0, 100), (20, 60)])
+        offset = rng.choice([0, 5])
+        hits = index.search(query, limit=10, offset=offset, min_price=low, max_price=high)
+        assert ids(hits) == brute_force(docs, query, 10, offset, low, high)
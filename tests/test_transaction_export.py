@@ -0,0 +1,54 @@
+import csv
+import gzip
+import io
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from api.rest.routes.transaction_routes import (
+    EXPORT_BATCH_SIZE,
+    EXPORT_FIELDS,
+    _csv_chunks,
+    _gzip_chunks,
+    _ndjson_chunks,
+)
+
+Row = namedtuple("Row", EXPORT_FIELDS)
+
+
+def make_rows(count):
+    return (
+        Row(i, 1, float(i), "deposit", f"tx {i}", datetime(2025, 1, 1, 12, 0, 0), None)
+        for i in range(count)
+    )
+
+
+def test_ndjson_export_one_line_per_row():
+    body = "".join(_ndjson_chunks(make_rows(EXPORT_BATCH_SIZE + 5)))
+    lines = body.splitlines()
+    assert len(lines) == EXPORT_BATCH_SIZE + 5
+    assert json.loads(lines[0])["date_posted"] == "2025-01-01T12:00:00"
+
+
+def test_ndjson_export_is_chunked_per_batch():
+    chunks = list(_ndjson_chunks(make_rows(EXPORT_BATCH_SIZE * 2 + 1)))
+    assert len(chunks) == 3
+
+
+def test_csv_export_has_header_and_rows():
+    body = "".join(_csv_chunks(make_rows(3)))
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0] == EXPORT_FIELDS
+    assert len(rows) == 4
+    assert rows[1][0] == "0"
+
+
+def test_csv_export_empty_still_has_header():
+    body = "".join(_csv_chunks(make_rows(0)))
+    assert body.strip() == ",".join(EXPORT_FIELDS)
+
+
+def test_gzip_export_round_trip():
+    body = "".join(_ndjson_chunks(make_rows(10)))
+    compressed = b"".join(_gzip_chunks(_ndjson_chunks(make_rows(10))))
+    assert gzip.decompress(compressed).decode("utf-8") == body
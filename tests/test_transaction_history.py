@@ -0,0 +1,165 @@
+import grpc
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from flask import Flask
+from utils.extensions import db
+from core.models import User, Account, Transaction
+from database.repositories.transaction_repo import apply_keyset, encode_cursor, decode_cursor
+from api.grpc.transaction_service import TransactionServicer
+from proto import transaction_service_pb2
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+    })
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def accounts(app):
+    user = User(username="historyuser", email="history@example.com", password_hash="hashedpassword")
+    db.session.add(user)
+    db.session.commit()
+    own = Account(account_type="checking", balance=1000, currency_code="USD", user_id=user.user_id)
+    other = Account(account_type="checking", balance=1000, currency_code="USD", user_id=user.user_id + 1)
+    db.session.add_all([own, other])
+    db.session.commit()
+
+    # Several transactions share a timestamp so the tie-breaker on ID is exercised
+    base = datetime(2025, 1, 1, 12, 0, 0)
+    for i in range(10):
+        db.session.add(Transaction(
+            account_id=own.account_id,
+            date_posted=base + timedelta(minutes=i // 2),
+            description=f"tx {i}",
+            amount=float(i),
+            type="deposit"
+        ))
+    db.session.add(Transaction(
+        account_id=other.account_id,
+        recipient_account_id=own.account_id,
+        date_posted=base + timedelta(hours=1),
+        description="incoming",
+        amount=5.0,
+        type="transfer"
+    ))
+    db.session.commit()
+    return own, other
+
+
+def test_cursor_round_trip():
+    posted = datetime(2025, 4, 21, 12, 30, 15)
+    assert decode_cursor(encode_cursor(posted, 42)) == (posted, 42)
+
+
+def test_decode_cursor_invalid():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_pages_cover_history_without_overlap(app, accounts):
+    own, _ = accounts
+    base_query = db.session.query(Transaction.transaction_id, Transaction.date_posted).filter(
+        db.or_(Transaction.account_id == own.account_id,
+               Transaction.recipient_account_id == own.account_id)
+    )
+
+    seen = []
+    before = None
+    while True:
+        page = apply_keyset(base_query, before).limit(3).all()
+        if not page:
+            break
+        seen.extend(row.transaction_id for row in page)
+        before = encode_cursor(page[-1].date_posted, page[-1].transaction_id)
+
+    expected = [row.transaction_id for row in apply_keyset(base_query).all()]
+    assert seen == expected
+    assert len(seen) == len(set(seen)) == 11
+
+
+def stream(context=None, **kwargs):
+    request = transaction_service_pb2.StreamTransactionHistoryRequest(**kwargs)
+    return list(TransactionServicer().StreamTransactionHistory(request, context or MagicMock()))
+
+
+def newest_first(*conditions):
+    query = db.session.query(Transaction.transaction_id, Transaction.date_posted).filter(*conditions)
+    return [str(row.transaction_id) for row in apply_keyset(query)]
+
+
+def ids(batches):
+    return [tx.transaction_id for batch in batches for tx in batch.transactions]
+
+
+@pytest.mark.parametrize('batch_size, sizes', [(4, [4, 4, 2]), (5, [5, 5]), (20, [10])])
+def test_stream_batches_and_flags_the_last_one(accounts, batch_size, sizes):
+    own, _ = accounts
+
+    batches = stream(user_id=str(own.user_id), account_id=str(own.account_id), batch_size=batch_size)
+
+    assert [len(batch.transactions) for batch in batches] == sizes
+    # Look-ahead flags the final batch, also when the rows divide evenly
+    assert [batch.last_batch for batch in batches] == [False] * (len(sizes) - 1) + [True]
+    assert ids(batches) == newest_first(Transaction.account_id == own.account_id)
+
+
+def test_stream_without_account_covers_incoming_transfers(accounts):
+    own, other = accounts
+
+    batches = stream(user_id=str(own.user_id), batch_size=3)
+
+    assert ids(batches) == newest_first(db.or_(Transaction.account_id == own.account_id,
+                                               Transaction.recipient_account_id == own.account_id))
+    assert len(ids(batches)) == 11
+
+
+def test_stream_resumes_after_cursor_without_gaps_or_duplicates(accounts):
+    own, _ = accounts
+    request = {'user_id': str(own.user_id), 'account_id': str(own.account_id), 'batch_size': 3}
+    expected = stream(**request)
+
+    received, cursor = [], ""
+    while True:
+        # Take only the first batch of each call, as if the connection dropped after it
+        batch = stream(resume_cursor=cursor, **request)[0]
+        received.extend(tx.transaction_id for tx in batch.transactions)
+        cursor = batch.next_cursor
+        if batch.last_batch:
+            break
+
+    # Batches of three split the pairs of transactions sharing a timestamp
+    assert received == ids(expected)
+    assert len(received) == len(set(received)) == 10
+
+
+@pytest.mark.parametrize('account, code', [
+    (lambda own, other: other.account_id, grpc.StatusCode.PERMISSION_DENIED),
+    (lambda own, other: other.account_id + 100, grpc.StatusCode.NOT_FOUND),
+])
+def test_stream_refuses_foreign_and_missing_accounts(accounts, account, code):
+    own, other = accounts
+    context = MagicMock()
+
+    batches = stream(context, user_id=str(own.user_id), account_id=str(account(own, other)))
+
+    assert batches == []
+    context.set_code.assert_called_with(code)
+
+
+def test_stream_rejects_invalid_resume_cursor(accounts):
+    own, _ = accounts
+    context = MagicMock()
+
+    assert stream(context, user_id=str(own.user_id), resume_cursor="not-a-cursor") == []
+    context.set_code.assert_called_with(grpc.StatusCode.INVALID_ARGUMENT)
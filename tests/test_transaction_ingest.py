@@ -0,0 +1,99 @@
+import pytest
+from decimal import Decimal
+from flask import Flask
+from utils.extensions import db
+from core.models import User, Account, Transaction
+from database.repositories.transaction_repo import apply_transaction_batch
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+    })
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def accounts(app):
+    user = User(username="ingestuser", email="ingest@example.com", password_hash="hashedpassword")
+    db.session.add(user)
+    db.session.commit()
+    checking = Account(account_type="checking", balance=100, currency_code="USD", user_id=user.user_id)
+    savings = Account(account_type="savings", balance=0, currency_code="USD", user_id=user.user_id)
+    foreign = Account(account_type="checking", balance=500, currency_code="USD", user_id=user.user_id + 1)
+    db.session.add_all([checking, savings, foreign])
+    db.session.commit()
+    return user.user_id, checking.account_id, savings.account_id, foreign.account_id
+
+
+def item(user_id, account_id, type, amount, to_account_id=None):
+    return {'user_id': user_id, 'account_id': account_id, 'type': type,
+            'amount': Decimal(amount), 'description': '', 'to_account_id': to_account_id}
+
+
+def test_batch_applies_items_in_order(accounts):
+    user_id, checking, savings, _ = accounts
+
+    results = apply_transaction_batch([
+        item(user_id, checking, 'withdraw', '150'),
+        item(user_id, checking, 'deposit', '100'),
+        item(user_id, checking, 'withdraw', '150'),
+        item(user_id, checking, 'transfer', '30', to_account_id=savings),
+    ])
+    db.session.commit()
+
+    assert [success for success, _, _ in results] == [False, True, True, True]
+    assert results[0][1] == "Insufficient funds"
+    assert db.session.get(Account, checking).balance == Decimal('20')
+    assert db.session.get(Account, savings).balance == Decimal('30')
+    # Two deposits/withdrawals and both legs of the transfer
+    assert db.session.query(Transaction).count() == 4
+
+
+def test_rejected_items_change_nothing(accounts):
+    user_id, checking, savings, foreign = accounts
+
+    results = apply_transaction_batch([
+        item(user_id, foreign, 'withdraw', '10'),
+        item(user_id, checking, 'deposit', '-5'),
+        item(user_id, checking, 'transfer', '10', to_account_id=999999),
+        item(user_id, checking, 'refund', '10'),
+    ])
+    db.session.commit()
+
+    assert not any(success for success, _, _ in results)
+    assert results[0][1] == "Permission denied"
+    assert db.session.get(Account, checking).balance == Decimal('100')
+    assert db.session.get(Account, foreign).balance == Decimal('500')
+    assert db.session.query(Transaction).count() == 0
+
+
+def test_read_ahead_keeps_order_and_sequence():
+    from api.grpc.transaction_service import _read_ahead
+
+    batches = list(_read_ahead(iter("abcdefg"), batch_size=3, depth=1))
+
+    assert batches == [
+        [(0, "a"), (1, "b"), (2, "c")],
+        [(3, "d"), (4, "e"), (5, "f")],
+        [(6, "g")],
+    ]
+
+
+def test_read_ahead_reraises_stream_errors():
+    from api.grpc.transaction_service import _read_ahead
+
+    def messages():
+        yield "a"
+        raise RuntimeError("stream reset")
+
+    with pytest.raises(RuntimeError):
+        list(_read_ahead(messages(), batch_size=1, depth=1))
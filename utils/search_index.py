@@ -0,0 +1,459 @@
+"""
+In-memory inverted index with ranked keyword search, price filters and
+prefix autocomplete.
+
+Built for a catalog of around a million short documents (a name and a
+description) served from one process. Every per-document and per-posting
+value lives in NumPy arrays, so answering a query is a handful of
+vectorized operations over the postings of its terms rather than a Python
+loop over matching documents:
+
+* Each term's postings are two parallel arrays, the IDs of the documents
+  containing it in ascending order and the term's weight in each. A
+  multi-term query starts from the rarest term and narrows the candidates
+  with a binary search into each other term's postings.
+* A term found in a large share of the catalog also keeps its postings
+  ordered by weight, so a query led by it visits the best candidates first
+  and stops once no unvisited document could make the top k.
+* Liveness and prices are arrays indexed by document ID, so availability
+  and price filters are a gather and a comparison.
+* Each document's term IDs are kept in one flat array, so a removed or
+  edited document can be taken out of exactly the postings it is in.
+
+Document IDs index those arrays directly, which suits auto-increment
+primary keys: memory grows with the highest ID, not with the count of live
+documents. Removing a document only clears its live flag; its postings are
+dropped once dead entries outnumber live ones in a term. New documents
+normally have the highest ID yet, so their postings are appended in
+batches instead of being inserted one by one.
+"""
+
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+
+# Name matches count this many times as much as description matches
+NAME_BOOST = 3
+# BM25 term saturation and length normalization
+K1 = 1.2
+B = 0.75
+AVERAGE_DOC_LENGTH = 24
+
+# Pending appends folded into a term's arrays at once
+MAX_PENDING = 4096
+
+# Terms with more postings than this are walked best-first; see search()
+IMPACT_ORDER_MIN_DF = 32768
+FIRST_CHUNK = 4096
+
+# Intersect through a dense scratch array rather than binary searches once
+# the candidates number more than 1/SCATTER_RATIO of the other term's postings
+SCATTER_RATIO = 16
+
+# Runs of letters and digits in any script; underscores separate terms
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+_EMPTY_IDS = np.empty(0, dtype=np.int64)
+_EMPTY_WEIGHTS = np.empty(0, dtype=np.float32)
+
+
+def tokenize(text):
+    """
+    Split text into case-folded terms of letters and digits. Text is put in
+    NFC first, so precomposed and combining accents give the same term.
+    Documents and queries both go through here.
+    """
+    return TOKEN_PATTERN.findall(unicodedata.normalize("NFC", text).casefold()) if text else []
+
+
+def _to_cents(price):
+    return int(round(float(price) * 100))
+
+
+def _analyze(name, description):
+    """Return {term: weight} for a document, BM25-saturated and length-normalized."""
+    counts = {}
+    for term in tokenize(name):
+        counts[term] = counts.get(term, 0) + NAME_BOOST
+    description_terms = tokenize(description)
+    for term in description_terms:
+        counts[term] = counts.get(term, 0) + 1
+
+    length = len(counts) + len(description_terms)
+    norm = K1 * (1 - B + B * length / AVERAGE_DOC_LENGTH)
+    return {term: tf * (K1 + 1) / (tf + norm) for term, tf in counts.items()}
+
+
+class InvertedIndex:
+    """Thread-safe inverted index over (doc_id, name, description, price).
+
+    Document IDs must be non-negative integers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._term_ids = {}    # term -> term ID
+        self._vocabulary = []  # every term seen, sorted, for prefix lookups
+        self._ids = []         # term ID -> array of doc IDs, ascending
+        self._weights = []     # term ID -> array of weights, parallel to _ids
+        self._pending = {}     # term ID -> (doc IDs, weights) waiting to be appended
+        self._df = array('q')  # term ID -> live documents containing the term
+        self._dead = array('q')  # term ID -> postings of removed documents
+        self._max_weight = array('d')  # term ID -> upper bound on its weights
+        self._impact = {}      # term ID -> (positions by weight descending, postings covered)
+        self._count = 0
+        # Indexed by doc ID
+        self._alive = np.zeros(0, dtype=bool)
+        self._cents = np.zeros(0, dtype=np.int64)
+        self._term_start = np.zeros(0, dtype=np.int64)
+        self._term_count = np.zeros(0, dtype=np.int32)
+        self._scratch = np.zeros(0, dtype=np.float32)  # all zero between searches
+        # Term IDs of every document version, referenced by _term_start/_term_count
+        self._doc_terms = array('i')
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, doc_id):
+        return 0 <= doc_id < len(self._alive) and bool(self._alive[doc_id])
+
+    def bulk_load(self, rows):
+        """Replace the contents with rows of (doc_id, name, description, price).
+
+        Builds every array in one pass instead of adding rows one at a
+        time, so loading a full catalog takes seconds rather than minutes.
+        """
+        term_ids = {}
+        ids, weights = [], []
+        doc_ids, cents, starts, counts = array('q'), array('q'), array('q'), array('i')
+        doc_terms = array('i')
+        for doc_id, name, description, price in rows:
+            analyzed = _analyze(name, description)
+            doc_ids.append(doc_id)
+            cents.append(_to_cents(price))
+            starts.append(len(doc_terms))
+            counts.append(len(analyzed))
+            for term, weight in analyzed.items():
+                tid = term_ids.get(term)
+                if tid is None:
+                    tid = term_ids[term] = len(ids)
+                    ids.append(array('q'))
+                    weights.append(array('f'))
+                ids[tid].append(doc_id)
+                weights[tid].append(weight)
+                doc_terms.append(tid)
+
+        ids = [np.frombuffer(a, dtype=np.int64) for a in ids]
+        weights = [np.frombuffer(a, dtype=np.float32) for a in weights]
+        for tid, term_docs in enumerate(ids):
+            if len(term_docs) > 1 and not (term_docs[1:] > term_docs[:-1]).all():
+                order = np.argsort(term_docs, kind='stable')
+                ids[tid], weights[tid] = term_docs[order], weights[tid][order]
+
+        doc_ids = np.frombuffer(doc_ids, dtype=np.int64) if len(doc_ids) else _EMPTY_IDS
+        size = int(doc_ids.max()) + 1 if len(doc_ids) else 0
+        alive = np.zeros(size, dtype=bool)
+        price_array = np.zeros(size, dtype=np.int64)
+        term_start = np.zeros(size, dtype=np.int64)
+        term_count = np.zeros(size, dtype=np.int32)
+        if size:
+            alive[doc_ids] = True
+            price_array[doc_ids] = np.frombuffer(cents, dtype=np.int64)
+            term_start[doc_ids] = np.frombuffer(starts, dtype=np.int64)
+            term_count[doc_ids] = np.frombuffer(counts, dtype=np.int32)
+
+        with self._lock:
+            self._term_ids = term_ids
+            self._vocabulary = sorted(term_ids)
+            self._ids = ids
+            self._weights = weights
+            self._pending = {}
+            self._df = array('q', (len(a) for a in ids))
+            self._dead = array('q', bytes(8 * len(ids)))
+            self._max_weight = array('d', (float(w.max()) for w in weights))
+            self._impact = {}
+            self._count = int(alive.sum())
+            self._alive = alive
+            self._cents = price_array
+            self._term_start = term_start
+            self._term_count = term_count
+            self._scratch = np.zeros(size, dtype=np.float32)
+            self._doc_terms = doc_terms
+            for tid, term_docs in enumerate(ids):
+                if len(term_docs) >= IMPACT_ORDER_MIN_DF:
+                    self._impact_order(tid)
+
+    def add(self, doc_id, name, description, price):
+        """Index a document, replacing any earlier version of it."""
+        analyzed = _analyze(name, description)
+        with self._lock:
+            self._ensure_capacity(doc_id + 1)
+            if self._alive[doc_id]:
+                self._remove(doc_id)
+            # Postings of the earlier version are dead now; reuse or drop them
+            old_terms = set(self._terms_of(doc_id))
+
+            new_terms = []
+            for term, weight in analyzed.items():
+                tid = self._term_ids.get(term)
+                if tid is None:
+                    tid = self._new_term(term)
+                new_terms.append(tid)
+                self._add_posting(tid, doc_id, weight)
+                self._df[tid] += 1
+            for tid in old_terms.difference(new_terms):
+                self._drop_posting(tid, doc_id)
+
+            self._term_start[doc_id] = len(self._doc_terms)
+            self._term_count[doc_id] = len(new_terms)
+            self._doc_terms.extend(new_terms)
+            self._cents[doc_id] = _to_cents(price)
+            self._alive[doc_id] = True
+            self._count += 1
+
+    def remove(self, doc_id):
+        """Drop a document; unknown IDs are ignored."""
+        with self._lock:
+            if doc_id in self:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        self._alive[doc_id] = False
+        self._count -= 1
+        for tid in self._terms_of(doc_id):
+            self._df[tid] -= 1
+            self._dead[tid] += 1
+            if self._dead[tid] > self._df[tid]:
+                self._compact(tid)
+
+    def _terms_of(self, doc_id):
+        if doc_id >= len(self._term_count) or not self._term_count[doc_id]:
+            return []
+        start = int(self._term_start[doc_id])
+        return self._doc_terms[start:start + int(self._term_count[doc_id])]
+
+    def _new_term(self, term):
+        tid = self._term_ids[term] = len(self._ids)
+        self._ids.append(_EMPTY_IDS)
+        self._weights.append(_EMPTY_WEIGHTS)
+        self._df.append(0)
+        self._dead.append(0)
+        self._max_weight.append(0.0)
+        self._vocabulary.insert(bisect_left(self._vocabulary, term), term)
+        return tid
+
+    def _ensure_capacity(self, size):
+        if size <= len(self._alive):
+            return
+        size = max(size, 2 * len(self._alive), 1024)
+        for name in ('_alive', '_cents', '_term_start', '_term_count', '_scratch'):
+            old = getattr(self, name)
+            grown = np.zeros(size, dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def _postings(self, tid):
+        """Return (doc IDs, weights) for a term, folding in pending appends."""
+        pending = self._pending.pop(tid, None)
+        if pending:
+            self._ids[tid] = np.concatenate([self._ids[tid], np.array(pending[0], dtype=np.int64)])
+            self._weights[tid] = np.concatenate([self._weights[tid], np.array(pending[1], dtype=np.float32)])
+        return self._ids[tid], self._weights[tid]
+
+    def _add_posting(self, tid, doc_id, weight):
+        self._max_weight[tid] = max(self._max_weight[tid], weight)
+        pending = self._pending.get(tid)
+        if pending:
+            last = pending[0][-1]
+        else:
+            last = self._ids[tid][-1] if len(self._ids[tid]) else -1
+        if doc_id > last:
+            # The usual case for a new listing: after every existing ID
+            if pending is None:
+                pending = self._pending[tid] = ([], [])
+            pending[0].append(doc_id)
+            pending[1].append(weight)
+            if len(pending[0]) >= MAX_PENDING:
+                self._postings(tid)
+            return
+
+        ids, weights = self._postings(tid)
+        i = int(np.searchsorted(ids, doc_id))
+        if i < len(ids) and ids[i] == doc_id:
+            # Dead posting left by the earlier version of the document
+            weights = weights.copy()
+            weights[i] = weight
+            self._weights[tid] = weights
+            self._dead[tid] -= 1
+        else:
+            self._ids[tid] = np.insert(ids, i, doc_id)
+            self._weights[tid] = np.insert(weights, i, weight)
+        self._impact.pop(tid, None)
+
+    def _drop_posting(self, tid, doc_id):
+        ids, weights = self._postings(tid)
+        i = int(np.searchsorted(ids, doc_id))
+        if i < len(ids) and ids[i] == doc_id:
+            self._ids[tid] = np.delete(ids, i)
+            self._weights[tid] = np.delete(weights, i)
+            self._dead[tid] -= 1
+            self._impact.pop(tid, None)
+
+    def _compact(self, tid):
+        ids, weights = self._postings(tid)
+        keep = self._alive[ids]
+        self._ids[tid], self._weights[tid] = ids[keep], weights[keep]
+        self._dead[tid] = 0
+        self._max_weight[tid] = float(self._weights[tid].max()) if keep.any() else 0.0
+        self._impact.pop(tid, None)
+
+    def _impact_order(self, tid):
+        """Return (positions of the term's postings by weight descending, postings covered).
+
+        Appends leave existing positions in place, so the order stays valid
+        for the postings it covers and is only recomputed once the postings
+        appended since outgrow an eighth of them.
+        """
+        ids, weights = self._postings(tid)
+        cached = self._impact.get(tid)
+        if cached is None or (len(ids) - cached[1]) * 8 > cached[1]:
+            # Stable, so equal weights stay in doc ID order
+            cached = self._impact[tid] = (np.argsort(-weights, kind='stable'), len(ids))
+        return cached
+
+    def search(self, query, limit=20, offset=0, min_price=None, max_price=None):
+        """Rank live documents containing every term of the query.
+
+        Scores are BM25: the sum over query terms of the term's IDF times
+        its saturated, length-normalized weight in the document. Ties go to
+        the lower doc_id, so paging through results is stable.
+
+        Returns:
+            A list of (doc_id, score), best first, for ranks offset to
+            offset + limit
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        k = offset + limit
+        if not terms or limit <= 0:
+            return []
+
+        with self._lock:
+            tids = [self._term_ids.get(term) for term in terms]
+            if any(tid is None or self._df[tid] == 0 for tid in tids):
+                return []
+            n = self._count
+            tids.sort(key=self._df.__getitem__)
+            idfs = [math.log(1 + (n - self._df[t] + 0.5) / (self._df[t] + 0.5)) for t in tids]
+
+            ids, weights = self._postings(tids[0])
+            cents = (_to_cents(min_price) if min_price is not None else None,
+                     _to_cents(max_price) if max_price is not None else None)
+            if len(ids) < IMPACT_ORDER_MIN_DF:
+                ids, scores = self._match(ids, weights * np.float32(idfs[0]), tids[1:], idfs[1:], cents)
+            else:
+                ids, scores = self._match_best_first(tids, idfs, cents, k)
+
+        if len(ids) > k:
+            # Everything scoring at least the k-th best, then an exact sort of that
+            threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+            top = scores >= threshold
+            ids, scores = ids[top], scores[top]
+        order = np.lexsort((ids, -scores))[offset:k]
+        return [(int(doc_id), float(score)) for doc_id, score in zip(ids[order], scores[order])]
+
+    def _match(self, ids, scores, tids, idfs, cents):
+        """Narrow candidates to live documents with every term, in the price range."""
+        for tid, idf in zip(tids, idfs):
+            other_ids, other_weights = self._postings(tid)
+            if len(ids) * SCATTER_RATIO > len(other_ids):
+                # Many candidates: spread the term's weights over a dense
+                # array and gather, instead of a binary search per candidate
+                self._scratch[other_ids] = other_weights
+                matched = self._scratch[ids]
+                self._scratch[other_ids] = 0
+                hit = matched > 0
+                ids, scores = ids[hit], scores[hit] + matched[hit] * np.float32(idf)
+            else:
+                pos = np.searchsorted(other_ids, ids)
+                np.minimum(pos, len(other_ids) - 1, out=pos)
+                hit = other_ids[pos] == ids
+                ids, scores = ids[hit], scores[hit] + other_weights[pos[hit]] * np.float32(idf)
+
+        keep = self._alive[ids]
+        low, high = cents
+        if low is not None or high is not None:
+            doc_cents = self._cents[ids]
+            if low is not None:
+                keep &= doc_cents >= low
+            if high is not None:
+                keep &= doc_cents <= high
+        return ids[keep], scores[keep]
+
+    def _match_best_first(self, tids, idfs, cents, k):
+        """Match a common rarest term's postings from the highest weight down.
+
+        Chunks double in size, and the walk stops once the k-th best score
+        found beats the best score any unvisited posting could reach: its
+        own weight plus the highest weights the other terms have.
+        """
+        driver, idf = tids[0], np.float32(idfs[0])
+        ids, weights = self._postings(driver)
+        order, covered = self._impact_order(driver)
+        rest_bound = sum(i * self._max_weight[t] for t, i in zip(tids[1:], idfs[1:]))
+
+        found_ids, found_scores = [], []
+        found = 0
+        start, size = 0, FIRST_CHUNK
+        while True:
+            positions = order[start:start + size]
+            if start == 0 and covered < len(ids):
+                # Postings appended since the order was computed
+                positions = np.concatenate([positions, np.arange(covered, len(ids))])
+            chunk_ids, chunk_scores = self._match(
+                ids[positions], weights[positions] * idf, tids[1:], idfs[1:], cents)
+            found_ids.append(chunk_ids)
+            found_scores.append(chunk_scores)
+            found += len(chunk_ids)
+
+            start, size = start + size, size * 2
+            if start >= covered:
+                break
+            if found >= k:
+                scores = np.concatenate(found_scores)
+                kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+                # Margin for float32 rounding in the accumulated scores
+                if kth > (idf * weights[order[start]] + rest_bound) * 1.0001:
+                    break
+
+        return np.concatenate(found_ids), np.concatenate(found_scores)
+
+    def suggest(self, prefix, limit=10, max_scan=20000):
+        """Complete the last word of prefix with the most common indexed terms.
+
+        Earlier words are kept as typed, so "red sh" may complete to
+        "red shoes" and "red shirt". Equally common terms come in
+        alphabetical order.
+        """
+        words = tokenize(prefix)
+        if not words or prefix[-1:].isspace() or limit <= 0:
+            return []
+        head, partial = words[:-1], words[-1]
+
+        with self._lock:
+            start = bisect_left(self._vocabulary, partial)
+            candidates = []
+            for term in self._vocabulary[start:start + max_scan]:
+                if not term.startswith(partial):
+                    break
+                df = self._df[self._term_ids[term]]
+                if df:
+                    candidates.append((df, term))
+            best = heapq.nlargest(limit, candidates, key=lambda candidate: candidate[0])
+
+        return [" ".join(head + [term]) for _, term in best]
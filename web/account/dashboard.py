@@ -6,6 +6,7 @@ from utils.extensions import db  # Add SQLAlchemy import
 from .forms import TransferForm
 # Removed old imports
 from core.models import Account, User, Transaction  # Add model imports
+from core.services.portfolio_valuation import portfolio_summary
 import requests
 import json
 import logging
@@ -52,6 +53,7 @@ def dashboard():
     selected_account = None
     transactions = []
     balance = 0.00
+    portfolio = None
     transfer_form = TransferForm()
     search_results = []  # Initialize search results
 
@@ -83,6 +85,12 @@ def dashboard():
                         'currency_code': 'USD'
                     }
                 ]
+
+            # Total value of cash, crypto and stock holdings
+            try:
+                portfolio = portfolio_summary(int(user_id))
+            except Exception as e:
+                logger.error(f"Error valuing portfolio: {e}")
         else:
             # In emergency mode, create dummy account data
             logger.warning("Using dummy account data in emergency mode")
@@ -349,6 +357,7 @@ def dashboard():
         transfer_form=transfer_form,
         search_results=search_results,
         recipient_username=transfer_form.recipient.data,  # Add this line to pass the recipient username
+        portfolio=portfolio,
         is_emergency_mode=is_emergency_mode,  # Pass emergency mode flag to template
         username=session.get('username', 'User')  # Pass username to template
     )
@@ -1,67 +1,122 @@
-from flask import render_template, current_app
+from flask import render_template, current_app, request, jsonify, Response, stream_with_context
 from flask_login import current_user
+from sqlalchemy import or_
 from utils.extensions import db
 from core.models import Transaction, Account
+from database.repositories.transaction_repo import apply_keyset, encode_cursor
 from . import transaction_routes
+import json
 import logging
 
+# Page size limits for the paginated (non-streaming) mode
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Rows fetched per round trip from the server-side cursor in streaming mode
+STREAM_BATCH_SIZE = 1000
+
+# Only the columns the response needs, so rows are never hydrated into ORM objects
+HISTORY_COLUMNS = (
+    Transaction.transaction_id,
+    Transaction.date_posted,
+    Transaction.account_id,
+    Transaction.description,
+    Transaction.amount,
+    Transaction.type,
+    Transaction.recipient_account_id,
+)
+
+
+def _history_query(account_ids, before=None):
+    """Build one query covering transactions sent from or received by the given accounts."""
+    query = db.session.query(*HISTORY_COLUMNS).filter(or_(
+        Transaction.account_id.in_(account_ids),
+        Transaction.recipient_account_id.in_(account_ids)
+    ))
+    return apply_keyset(query, before)
+
+
+def _row_to_dict(row, account_ids):
+    """Convert a projected row into the response shape, seen from the user's side."""
+    if row.account_id in account_ids:
+        # Sent from one of the user's accounts (this includes transfers
+        # between two of the user's own accounts)
+        return {
+            'transaction_id': row.transaction_id,
+            'date_posted': row.date_posted,
+            'account_id': row.account_id,
+            'description': row.description,
+            'amount': row.amount,
+            'type': row.type,
+            'recipient_account_id': row.recipient_account_id,
+            'transaction_direction': 'Sent'
+        }
+    return {
+        'transaction_id': row.transaction_id,
+        'date_posted': row.date_posted,
+        'account_id': row.recipient_account_id,
+        'description': row.description,
+        'amount': row.amount,
+        'type': row.type,
+        'recipient_account_id': row.account_id,
+        'transaction_direction': 'Received'
+    }
+
+
 @transaction_routes.route("/transaction_history", methods=["GET"], endpoint="transaction_history")
 def transaction_history():
+    """
+    Transaction history for the current user, newest first.
+
+    Optional query parameters:
+    - limit: page size (default 50, max 500)
+    - before: cursor returned in the X-Next-Cursor header of the previous page
+    - stream: if true, stream the full history as NDJSON instead of a page
+    """
     user_id = current_user.get_id()  # Get user_id from current_user
-    
+
     # Check if we're in test mode
     if current_app.config.get('TESTING', False):
         # Just return an empty list for testing
         return []
-    
-    # Use SQLAlchemy ORM to fetch transactions
-    # First, get all accounts belonging to the user
-    user_accounts = Account.query.filter_by(user_id=user_id).all()
-    account_ids = [account.account_id for account in user_accounts]
-    
-    # Now get all transactions where these accounts are involved
-    sent_transactions = Transaction.query.filter(
-        Transaction.account_id.in_(account_ids)
-    ).all()
-    
-    received_transactions = Transaction.query.filter(
-        Transaction.recipient_account_id.in_(account_ids)
-    ).all()
-    
-    # Combine sent and received transactions
-    transactions = []
-    
-    for tx in sent_transactions:
-        tx_data = {
-            'transaction_id': tx.transaction_id,
-            'date_posted': tx.date_posted,
-            'account_id': tx.account_id,
-            'description': tx.description,
-            'amount': tx.amount,
-            'type': tx.type,
-            'recipient_account_id': tx.recipient_account_id,
-            'transaction_direction': 'Sent'
-        }
-        transactions.append(tx_data)
-    
-    for tx in received_transactions:
-        # Skip if this transaction is already included as a "sent" transaction
-        # from one of the user's accounts to another of their accounts
-        if tx.account_id in account_ids:
-            continue
-            
-        tx_data = {
-            'transaction_id': tx.transaction_id,
-            'date_posted': tx.date_posted,
-            'account_id': tx.recipient_account_id,
-            'description': tx.description,
-            'amount': tx.amount,
-            'type': tx.type,
-            'recipient_account_id': tx.account_id,
-            'transaction_direction': 'Received'
-        }
-        transactions.append(tx_data)
-    
+
+    # Only the account IDs are needed, a user has a handful of accounts
+    account_ids = {
+        account_id for (account_id,) in
+        db.session.query(Account.account_id).filter_by(user_id=user_id)
+    }
+    if not account_ids:
+        return []
+
+    before = request.args.get('before')
+    try:
+        query = _history_query(account_ids, before)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        def generate():
+            for row in query.yield_per(STREAM_BATCH_SIZE):
+                yield json.dumps(_row_to_dict(row, account_ids), default=str) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid limit. Must be an integer"}), 400
+    if limit <= 0:
+        return jsonify({"error": "Invalid limit. Must be positive"}), 400
+
+    # Fetch one extra row to find out whether another page exists
+    rows = query.limit(limit + 1).all()
+    transactions = [_row_to_dict(row, account_ids) for row in rows[:limit]]
+
     logging.debug("Query result: %s", transactions)
-    
-    return transactions  # Return transactions instead of rendering a template
\ No newline at end of file
+
+    headers = {}
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        headers['X-Next-Cursor'] = encode_cursor(last.date_posted, last.transaction_id)
+
+    return transactions, 200, headers  # Return transactions instead of rendering a template